@@ -0,0 +1,7 @@
+from . import system_actions
+from . import file_search
+from . import file_hash
+from . import port_check
+from . import log_tail
+from . import process_pool
+from . import execution_history
@@ -0,0 +1,173 @@
+""" Module for defining the registry of native actions run inside the agent process. """
+
+from typing import Any, Awaitable, Callable, Dict, List
+
+import asyncio
+import inspect
+import logging
+import os
+from config_module.config_io import get_data_directory
+
+ActionFunction = Callable[[Dict[str, Any], "ActionContext"], Any | Awaitable[Any]]
+
+# Registered native actions by name
+ACTIONS: Dict[str, ActionFunction] = {}
+
+
+class ActionError(Exception):
+    """ Error raised by native actions for invalid parameters or failures """
+    pass
+
+
+class ActionContext:
+    """
+    Context of a native action invocation.
+    """
+
+    def __init__(self, config_data: Dict[str, Any] = None,
+                 send_page: Callable[[Any], Awaitable[None]] = None,
+                 data_directory: str = None, execution_journal: Any = None,
+                 leave_slot: Callable[[], Awaitable[None]] = None) -> None:
+        """Constructs a new action context instance.
+
+        Args:
+            config_data (Dict[str, Any], optional): Configuration data of the agent. Defaults to None.
+            send_page (Callable[[Any], Awaitable[None]], optional): Coroutine function sending a partial
+                result back to Rewst before the action completes. Defaults to None.
+            data_directory (str, optional): Directory to keep action state in. Defaults to the
+                data directory of the organization.
+            execution_journal (ExecutionJournal, optional): Journal of the jobs executed by the agent.
+                Defaults to None.
+            leave_slot (Callable[[], Awaitable[None]], optional): Coroutine function giving back the
+                running slot of the action. Defaults to None.
+        """
+        self.config_data = config_data or {}
+        self.execution_journal = execution_journal
+        self.__send_page = send_page
+        self.__data_directory = data_directory
+        self.__leave_slot = leave_slot
+        self.__pages_sent = 0
+
+    @property
+    def streaming(self) -> bool:
+        """
+        Whether partial results can be sent before the action completes.
+
+        Returns:
+            bool: True if streaming is possible, otherwise False.
+        """
+        return self.__send_page is not None
+
+    @property
+    def pages_sent(self) -> int:
+        """
+        Number of partial results sent.
+
+        Returns:
+            int: Number of pages.
+        """
+        return self.__pages_sent
+
+    async def send_page(self, page: Any) -> None:
+        """
+        Send a partial result back to Rewst. Does nothing if streaming is not possible.
+
+        Args:
+            page (Any): JSON serializable partial result.
+        """
+        if self.__send_page is None:
+            return
+        self.__pages_sent += 1
+        await self.__send_page(page)
+
+    async def leave_slot(self) -> None:
+        """
+        Give back the running slot of the action before waiting on external events for long,
+        so scripts can run meanwhile. The action still counts as a pending job.
+        """
+        if self.__leave_slot is not None:
+            await self.__leave_slot()
+
+    def get_data_path(self, name: str) -> str:
+        """
+        Get a directory to keep action state in.
+
+        Args:
+            name (str): Name of the directory.
+
+        Raises:
+            ActionError: If there is no data directory available.
+
+        Returns:
+            str: Directory path.
+        """
+        if self.__data_directory:
+            data_dir = os.path.join(self.__data_directory, name)
+            os.makedirs(data_dir, exist_ok=True)
+            return data_dir
+
+        org_id = self.config_data.get("rewst_org_id")
+        if not org_id:
+            raise ActionError("No data directory available")
+        return get_data_directory(org_id, name)
+
+
+def register_action(name: str) -> Callable[[ActionFunction], ActionFunction]:
+    """
+    Decorator to register a function as a native action.
+
+    Synchronous functions are run in a worker thread, coroutine functions on the event loop.
+
+    Args:
+        name (str): Name of the action used in the `action` field of messages.
+
+    Returns:
+        Callable[[ActionFunction], ActionFunction]: Decorator of the action function.
+    """
+    def decorator(function: ActionFunction) -> ActionFunction:
+        ACTIONS[name] = function
+        return function
+
+    return decorator
+
+
+def list_actions() -> List[str]:
+    """
+    List the names of the registered native actions.
+
+    Returns:
+        List[str]: Sorted names of the actions.
+    """
+    return sorted(ACTIONS)
+
+
+async def run_action(name: str, parameters: Dict[str, Any] = None, context: ActionContext = None) -> Any:
+    """
+    Run a registered native action.
+
+    Args:
+        name (str): Name of the action.
+        parameters (Dict[str, Any], optional): Parameters of the action. Defaults to None.
+        context (ActionContext, optional): Context of the invocation. Defaults to None.
+
+    Raises:
+        ActionError: If the action is not registered or the parameters are invalid.
+
+    Returns:
+        Any: JSON serializable result of the action.
+    """
+    function = ACTIONS.get(name)
+    if function is None:
+        raise ActionError(f"Unknown action: {name}")
+
+    if parameters is None:
+        parameters = {}
+    if not isinstance(parameters, dict):
+        raise ActionError("Action parameters must be a JSON object")
+
+    context = context or ActionContext()
+
+    logging.info("Running native action %s", name)
+    if inspect.iscoroutinefunction(function):
+        return await function(parameters, context)
+    return await asyncio.to_thread(function, parameters, context)
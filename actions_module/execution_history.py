@@ -0,0 +1,47 @@
+""" Module for defining the native action querying the local journal of executed jobs. """
+
+from typing import Any, Dict
+
+import time
+from actions_module.action_registry import ActionContext, ActionError, register_action
+
+DEFAULT_LIMIT = 100
+
+
+@register_action("execution_history")
+def execution_history(parameters: Dict[str, Any], context: ActionContext) -> Dict[str, Any]:
+    """
+    Get the recent executions of the agent, or statistics of them.
+
+    Args:
+        parameters (Dict[str, Any]): `hours` to look back or `since` UNIX timestamp, `limit`, filters on
+            `kind`, `name`, `script_hash`, `interpreter` and `exit_code`, and `group_by` one of these
+            columns to get statistics instead of executions.
+        context (ActionContext): Context of the invocation.
+
+    Raises:
+        ActionError: If the journal is not available or the parameters are invalid.
+
+    Returns:
+        Dict[str, Any]: Recent executions or statistics.
+    """
+    journal = context.execution_journal
+    if journal is None:
+        raise ActionError("Execution journal is not available")
+
+    since = parameters.get("since")
+    if parameters.get("hours") is not None:
+        since = time.time() - float(parameters["hours"]) * 3600
+
+    filters = {
+        column: parameters[column]
+        for column in ("kind", "name", "script_hash", "interpreter", "exit_code")
+        if parameters.get(column) is not None
+    }
+
+    try:
+        if parameters.get("group_by"):
+            return {"aggregates": journal.aggregate(parameters["group_by"], since, filters)}
+        return {"executions": journal.query(since, int(parameters.get("limit", DEFAULT_LIMIT)), filters)}
+    except ValueError as e:
+        raise ActionError(str(e)) from e
@@ -0,0 +1,258 @@
+""" Module for defining the native action hashing many files in parallel. """
+
+from typing import Any, Dict, List, Tuple
+
+import asyncio
+import concurrent.futures
+import glob
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from actions_module.action_registry import ActionContext, ActionError, register_action
+from actions_module.process_pool import SharedProcessPool, get_process_pool
+
+DEFAULT_ALGORITHM = "sha256"
+DEFAULT_PAGE_SIZE = 500
+DEFAULT_MAX_WORKERS = min(8, os.cpu_count() or 1)
+CACHE_DIRECTORY = "hash_cache"
+MAX_CACHE_ENTRIES = 200000
+
+# Large reads keep the time spent in hashlib with the GIL released high
+READ_BUFFER_SIZE = 1024 * 1024
+
+
+def expand_paths(patterns: List[str]) -> List[str]:
+    """
+    Expand the paths and glob patterns to hash into a list of unique file paths.
+
+    Args:
+        patterns (List[str]): File paths or glob patterns.
+
+    Returns:
+        List[str]: File paths in the order of the patterns.
+    """
+    paths = {}
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern, recursive=True))
+        else:
+            matches = [pattern]
+        for path in matches:
+            if not os.path.isdir(path):
+                paths[path] = None
+    return list(paths)
+
+
+def hash_file(path: str, algorithm: str) -> Tuple[str, os.stat_result]:
+    """
+    Hash the content of a file.
+
+    Args:
+        path (str): File path.
+        algorithm (str): Name of the hashlib algorithm.
+
+    Returns:
+        Tuple[str, os.stat_result]: Hexadecimal digest and status of the file before hashing.
+    """
+    hasher = hashlib.new(algorithm)
+    buffer = bytearray(READ_BUFFER_SIZE)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as f:
+        file_stat = os.fstat(f.fileno())
+        while size := f.readinto(buffer):
+            hasher.update(view[:size])
+    return hasher.hexdigest(), file_stat
+
+
+def get_cache_key(file_stat: os.stat_result) -> str:
+    """
+    Get the key identifying an unchanged file in the hash cache.
+
+    Args:
+        file_stat (os.stat_result): Status of the file.
+
+    Returns:
+        str: Cache key made of the device, inode, size and modification time.
+    """
+    return f"{file_stat.st_dev}:{file_stat.st_ino}:{file_stat.st_size}:{file_stat.st_mtime_ns}"
+
+
+class HashCache:
+    """
+    Cache of file digests keyed on inode, size and modification time.
+    """
+
+    def __init__(self, cache_path: str) -> None:
+        """Constructs a new hash cache backed by a file.
+
+        Args:
+            cache_path (str): Cache file path.
+        """
+        self.cache_path = cache_path
+        self.entries: Dict[str, str] = {}
+        self.__lock = threading.Lock()
+        try:
+            with open(cache_path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logging.warning("Ignoring invalid hash cache %s: %s", cache_path, e)
+
+    def lookup(self, path: str) -> Tuple[str | None, os.stat_result]:
+        """
+        Look up the digest of a file if it did not change.
+
+        Args:
+            path (str): File path.
+
+        Returns:
+            Tuple[str | None, os.stat_result]: Cached digest or None, and status of the file.
+        """
+        file_stat = os.stat(path)
+        return self.entries.get(get_cache_key(file_stat)), file_stat
+
+    def store(self, file_stat: os.stat_result, digest: str) -> None:
+        """
+        Store the digest of a file.
+
+        Args:
+            file_stat (os.stat_result): Status of the file when it was hashed.
+            digest (str): Hexadecimal digest of the file.
+        """
+        key = get_cache_key(file_stat)
+        with self.__lock:
+            self.entries.pop(key, None)
+            self.entries[key] = digest
+
+    def save(self) -> None:
+        """
+        Save the cache atomically, dropping the oldest entries above the size limit.
+        """
+        with self.__lock:
+            if len(self.entries) > MAX_CACHE_ENTRIES:
+                self.entries = dict(list(self.entries.items())[-MAX_CACHE_ENTRIES:])
+            entries = dict(self.entries)
+
+        # A unique temporary file keeps concurrent invocations from mixing their writes
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(self.cache_path), suffix=".tmp")
+        try:
+            with open(fd, "w", encoding="utf-8") as f:
+                json.dump(entries, f, separators=(",", ":"))
+            os.replace(temp_path, self.cache_path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+
+def hash_path(path: str, algorithm: str, cache: HashCache | None,
+              pool: SharedProcessPool = None) -> Dict[str, Any]:
+    """
+    Hash a file, using the cache if possible.
+
+    Args:
+        path (str): File path.
+        algorithm (str): Name of the hashlib algorithm.
+        cache (HashCache | None): Hash cache, or None.
+        pool (SharedProcessPool, optional): Process pool to hash the file in. Defaults to hashing
+            in the calling thread.
+
+    Returns:
+        Dict[str, Any]: Digest and size of the file, or the error hashing it.
+    """
+    try:
+        if cache is not None:
+            digest, file_stat = cache.lookup(path)
+            if digest:
+                return {"path": path, "digest": digest, "size": file_stat.st_size, "cached": True}
+
+        if pool is not None:
+            digest, file_stat = pool.submit(hash_file, path, algorithm).result()
+        else:
+            digest, file_stat = hash_file(path, algorithm)
+        if cache is not None:
+            cache.store(file_stat, digest)
+        return {"path": path, "digest": digest, "size": file_stat.st_size, "cached": False}
+    except OSError as e:
+        return {"path": path, "error": str(e)}
+
+
+@register_action("file_hash")
+async def file_hash(parameters: Dict[str, Any], context: ActionContext) -> Dict[str, Any]:
+    """
+    Hash files in parallel.
+
+    Results are streamed back in pages of `page_size` as they complete if possible, the last page is returned.
+
+    Args:
+        parameters (Dict[str, Any]): `paths` to hash as file paths or glob patterns, `algorithm`,
+            `use_cache`, `use_processes` to hash in the shared process pool, `page_size` and `max_workers`.
+        context (ActionContext): Context of the invocation.
+
+    Raises:
+        ActionError: If no paths are given or the algorithm is not supported.
+
+    Returns:
+        Dict[str, Any]: Last page of results and statistics of the hashing.
+    """
+    patterns = parameters.get("paths")
+    if isinstance(patterns, str):
+        patterns = [patterns]
+    if not patterns:
+        raise ActionError("Missing paths to hash")
+
+    algorithm = parameters.get("algorithm", DEFAULT_ALGORITHM).lower()
+    # Variable length digests of the shake algorithms are not supported
+    if algorithm not in hashlib.algorithms_guaranteed or algorithm.startswith("shake_"):
+        raise ActionError(f"Unsupported hash algorithm: {algorithm}")
+
+    page_size = max(1, int(parameters.get("page_size", DEFAULT_PAGE_SIZE)))
+    max_workers = max(1, int(parameters.get("max_workers", DEFAULT_MAX_WORKERS)))
+    pool = get_process_pool() if parameters.get("use_processes") else None
+
+    cache = None
+    if parameters.get("use_cache"):
+        cache_path = os.path.join(context.get_data_path(CACHE_DIRECTORY), f"{algorithm}.json")
+        cache = await asyncio.to_thread(HashCache, cache_path)
+
+    paths = await asyncio.to_thread(expand_paths, patterns)
+
+    page = []
+    statistics = {"files": len(paths), "hashed": 0, "cached": 0, "errors": 0}
+    loop = asyncio.get_running_loop()
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+    futures = [loop.run_in_executor(executor, hash_path, path, algorithm, cache, pool) for path in paths]
+    try:
+        for future in asyncio.as_completed(futures):
+            result = await future
+            if "error" in result:
+                statistics["errors"] += 1
+            elif result["cached"]:
+                statistics["cached"] += 1
+            else:
+                statistics["hashed"] += 1
+
+            page.append(result)
+            if len(page) >= page_size and context.streaming:
+                await context.send_page(page)
+                page = []
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        # Never wait on the event loop for the files being hashed, the queued ones are dropped
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    executor.shutdown(wait=False)
+
+    if cache is not None:
+        await asyncio.to_thread(cache.save)
+
+    return {
+        "results": page,
+        "algorithm": algorithm,
+        "pages_sent": context.pages_sent,
+        **statistics,
+    }
@@ -0,0 +1,369 @@
+""" Module for defining the native action searching files by name, size and modification time. """
+
+from typing import Any, Callable, Dict, List, Tuple
+
+import asyncio
+import concurrent.futures
+import fnmatch
+import hashlib
+import json
+import logging
+import os
+import stat
+import tempfile
+import threading
+import time
+from actions_module.action_registry import ActionContext, ActionError, register_action
+
+DEFAULT_PAGE_SIZE = 500
+DEFAULT_MAX_RESULTS = 10000
+DEFAULT_MAX_WORKERS = min(16, (os.cpu_count() or 1) * 2)
+INDEX_DIRECTORY = "file_index"
+
+# Files rewritten in place keep their directory's modification time, an index older than this is rebuilt
+DEFAULT_MAX_INDEX_AGE = 3600
+
+# Number of matches handed over from a walker thread at once
+EMIT_BATCH_SIZE = 100
+
+# Index entries are [name, is_dir, size, mtime]
+IndexEntry = List[Any]
+Index = Dict[str, Tuple[float, List[IndexEntry]]]
+
+
+class SearchFilter:
+    """
+    Filters of the file search on name, extension, size and modification time.
+    """
+
+    def __init__(self, parameters: Dict[str, Any]) -> None:
+        """Constructs a new search filter from the action parameters.
+
+        Args:
+            parameters (Dict[str, Any]): Parameters of the file search action.
+        """
+        self.case_sensitive = bool(parameters.get("case_sensitive", False))
+        self.name = parameters.get("name")
+        if self.name and not self.case_sensitive:
+            self.name = self.name.lower()
+        self.extensions = tuple(
+            (extension if extension.startswith(".") else f".{extension}").lower()
+            for extension in parameters.get("extensions") or []
+        )
+        self.min_size = parameters.get("min_size")
+        self.max_size = parameters.get("max_size")
+        self.modified_after = parameters.get("modified_after")
+        self.modified_before = parameters.get("modified_before")
+        self.include_dirs = bool(parameters.get("include_dirs", False))
+
+    def matches(self, name: str, is_dir: bool, size: int, mtime: float) -> bool:
+        """
+        Checks whether a directory entry matches the filters.
+
+        Args:
+            name (str): Name of the entry.
+            is_dir (bool): Whether the entry is a directory.
+            size (int): Size of the entry in bytes.
+            mtime (float): Modification time of the entry as a POSIX timestamp.
+
+        Returns:
+            bool: True if the entry matches, otherwise False.
+        """
+        if is_dir and not self.include_dirs:
+            return False
+        if self.extensions and not name.lower().endswith(self.extensions):
+            return False
+        if self.name and not fnmatch.fnmatchcase(name if self.case_sensitive else name.lower(), self.name):
+            return False
+        if not is_dir:
+            if self.min_size is not None and size < self.min_size:
+                return False
+            if self.max_size is not None and size > self.max_size:
+                return False
+        if self.modified_after is not None and mtime < self.modified_after:
+            return False
+        if self.modified_before is not None and mtime > self.modified_before:
+            return False
+        return True
+
+
+def scan_directory(path: str, mtime: float, index: Index | None, new_index: Index | None,
+                   statistics: Dict[str, int]) -> List[IndexEntry]:
+    """
+    List the entries of a directory, reusing the indexed listing if the directory did not change.
+
+    Indexed entries are not stat'ed again, so files rewritten in place, which keep their directory's
+    modification time, are only picked up once the index is rebuilt.
+
+    Args:
+        path (str): Path of the directory.
+        mtime (float): Current modification time of the directory.
+        index (Index | None): Previous index of the root, or None.
+        new_index (Index | None): Index being built, or None if not indexing.
+        statistics (Dict[str, int]): Counters of the walk to update.
+
+    Returns:
+        List[IndexEntry]: Entries of the directory.
+    """
+    cached = index.get(path) if index else None
+    if cached and cached[0] == mtime:
+        statistics["directories_from_index"] += 1
+        entries = cached[1]
+    else:
+        statistics["directories_scanned"] += 1
+        entries = []
+        with os.scandir(path) as iterator:
+            for entry in iterator:
+                try:
+                    entry_stat = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                is_dir = stat.S_ISDIR(entry_stat.st_mode)
+                entries.append([entry.name, is_dir, 0 if is_dir else entry_stat.st_size, entry_stat.st_mtime])
+
+    if new_index is not None:
+        new_index[path] = (mtime, entries)
+    return entries
+
+
+def walk_subtree(path: str, search_filter: SearchFilter, index: Index | None,
+                 emit: Callable[[List[Dict[str, Any]]], None], stop_event: threading.Event) -> Tuple[Index, Dict[str, int]]:
+    """
+    Walk a directory tree and emit the matching entries in batches.
+
+    Args:
+        path (str): Path of the top directory of the subtree.
+        search_filter (SearchFilter): Filters of the search.
+        index (Index | None): Previous index of the root, or None if not indexing.
+        emit (Callable[[List[Dict[str, Any]]], None]): Function receiving batches of matches.
+        stop_event (threading.Event): Event set to stop walking early.
+
+    Returns:
+        Tuple[Index, Dict[str, int]]: Index of the subtree and counters of the walk.
+    """
+    new_index = {} if index is not None else None
+    statistics = {"directories_scanned": 0, "directories_from_index": 0, "errors": 0}
+    batch = []
+    stack = [path]
+
+    while stack and not stop_event.is_set():
+        directory = stack.pop()
+        try:
+            # Only directories are stat'ed again, the mtime of an indexed listing may be outdated
+            entries = scan_directory(directory, os.stat(directory).st_mtime, index, new_index, statistics)
+        except OSError as e:
+            logging.debug("Skipping directory %s: %s", directory, e)
+            statistics["errors"] += 1
+            continue
+
+        for name, is_dir, size, entry_mtime in entries:
+            entry_path = os.path.join(directory, name)
+            if search_filter.matches(name, is_dir, size, entry_mtime):
+                batch.append({"path": entry_path, "is_dir": is_dir, "size": size, "mtime": entry_mtime})
+                if len(batch) >= EMIT_BATCH_SIZE:
+                    emit(batch)
+                    batch = []
+            if is_dir:
+                stack.append(entry_path)
+
+    if batch:
+        emit(batch)
+    return new_index, statistics
+
+
+def get_index_path(index_directory: str, root: str) -> str:
+    """
+    Get the path of the index file of a search root.
+
+    Args:
+        index_directory (str): Directory of the index files.
+        root (str): Search root.
+
+    Returns:
+        str: Index file path.
+    """
+    digest = hashlib.sha256(os.path.abspath(root).encode("utf-8")).hexdigest()[:32]
+    return os.path.join(index_directory, f"{digest}.json")
+
+
+def load_index(index_path: str, max_age: float = None) -> Index:
+    """
+    Load the index of a search root.
+
+    Args:
+        index_path (str): Index file path.
+        max_age (float, optional): Age in seconds after which the index is rebuilt. Defaults to no limit.
+
+    Returns:
+        Index: Index of the root, empty if missing, invalid or too old.
+    """
+    try:
+        if max_age is not None and time.time() - os.stat(index_path).st_mtime > max_age:
+            return {}
+        with open(index_path, encoding="utf-8") as f:
+            return {path: tuple(value) for path, value in json.load(f).items()}
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logging.warning("Ignoring invalid file index %s: %s", index_path, e)
+        return {}
+
+
+def save_index(index_path: str, index: Index) -> None:
+    """
+    Save the index of a search root atomically.
+
+    Args:
+        index_path (str): Index file path.
+        index (Index): Index of the root.
+    """
+    # A unique temporary file keeps concurrent searches of the same root from mixing their writes
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(index_path), suffix=".tmp")
+    try:
+        with open(fd, "w", encoding="utf-8") as f:
+            # Encoding in one go is much faster than streaming json.dump() chunks
+            f.write(json.dumps(index, separators=(",", ":")))
+        os.replace(temp_path, index_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def search_root(root: str, search_filter: SearchFilter, index_directory: str | None, max_workers: int,
+                emit: Callable[[List[Dict[str, Any]]], None], stop_event: threading.Event,
+                max_index_age: float = DEFAULT_MAX_INDEX_AGE) -> Dict[str, int]:
+    """
+    Search a root directory, with one worker per top-level subtree.
+
+    Args:
+        root (str): Search root.
+        search_filter (SearchFilter): Filters of the search.
+        index_directory (str | None): Directory of the index files, or None if not indexing.
+        max_workers (int): Maximum number of walker threads.
+        emit (Callable[[List[Dict[str, Any]]], None]): Function receiving batches of matches.
+        stop_event (threading.Event): Event set to stop walking early.
+        max_index_age (float, optional): Age in seconds after which the index is rebuilt. Defaults to
+            DEFAULT_MAX_INDEX_AGE.
+
+    Returns:
+        Dict[str, int]: Counters of the search.
+    """
+    index_path = get_index_path(index_directory, root) if index_directory else None
+    index = load_index(index_path, max_index_age) if index_path else None
+    new_index = {} if index is not None else None
+    statistics = {"directories_scanned": 0, "directories_from_index": 0, "errors": 0}
+
+    try:
+        entries = scan_directory(root, os.stat(root).st_mtime, index, new_index, statistics)
+    except OSError as e:
+        raise ActionError(f"Failed to search {root}: {e}") from e
+
+    batch = []
+    subtrees = []
+    for name, is_dir, size, mtime in entries:
+        path = os.path.join(root, name)
+        if search_filter.matches(name, is_dir, size, mtime):
+            batch.append({"path": path, "is_dir": is_dir, "size": size, "mtime": mtime})
+        if is_dir:
+            subtrees.append(path)
+    if batch:
+        emit(batch)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(walk_subtree, path, search_filter, index, emit, stop_event)
+            for path in subtrees
+        ]
+        for future in concurrent.futures.as_completed(futures):
+            subtree_index, subtree_statistics = future.result()
+            if new_index is not None:
+                new_index.update(subtree_index)
+            for key, value in subtree_statistics.items():
+                statistics[key] += value
+
+    # A partial walk would drop the unvisited directories from the index, an unchanged index is kept as is
+    unchanged = statistics["directories_scanned"] == 0 and new_index.keys() == index.keys() if index else False
+    if index_path and not stop_event.is_set() and not unchanged:
+        save_index(index_path, new_index)
+
+    return statistics
+
+
+@register_action("file_search")
+async def file_search(parameters: Dict[str, Any], context: ActionContext) -> Dict[str, Any]:
+    """
+    Search files by name, extension, size and modification time.
+
+    Matches are streamed back in pages of `page_size` if possible, the last page is returned.
+
+    Args:
+        parameters (Dict[str, Any]): `root` or `roots` to search, filters `name` (glob), `extensions`,
+            `min_size`, `max_size`, `modified_after`, `modified_before` (POSIX timestamps), `include_dirs`,
+            `case_sensitive`, and `page_size`, `max_results`, `max_workers`, `use_index`, `max_index_age`
+            (seconds after which the index is rebuilt to pick up files rewritten in place).
+        context (ActionContext): Context of the invocation.
+
+    Raises:
+        ActionError: If no root is given or a root cannot be searched.
+
+    Returns:
+        Dict[str, Any]: Last page of matches and statistics of the search.
+    """
+    roots = parameters.get("roots") or ([parameters["root"]] if parameters.get("root") else [])
+    if not roots:
+        raise ActionError("Missing root to search")
+
+    search_filter = SearchFilter(parameters)
+    page_size = max(1, int(parameters.get("page_size", DEFAULT_PAGE_SIZE)))
+    max_results = int(parameters.get("max_results", DEFAULT_MAX_RESULTS))
+    max_workers = max(1, int(parameters.get("max_workers", DEFAULT_MAX_WORKERS)))
+    index_directory = context.get_data_path(INDEX_DIRECTORY) if parameters.get("use_index") else None
+    max_index_age = float(parameters.get("max_index_age", DEFAULT_MAX_INDEX_AGE))
+
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    stop_event = threading.Event()
+
+    def emit(batch: List[Dict[str, Any]]) -> None:
+        loop.call_soon_threadsafe(queue.put_nowait, batch)
+
+    def search_roots() -> Dict[str, int]:
+        totals = {"directories_scanned": 0, "directories_from_index": 0, "errors": 0}
+        for root in roots:
+            for key, value in search_root(root, search_filter, index_directory, max_workers,
+                                          emit, stop_event, max_index_age).items():
+                totals[key] += value
+        return totals
+
+    search_task = asyncio.ensure_future(asyncio.to_thread(search_roots))
+    search_task.add_done_callback(lambda _: queue.put_nowait(None))
+
+    page = []
+    total_matches = 0
+    truncated = False
+    try:
+        while (batch := await queue.get()) is not None:
+            for match in batch:
+                if total_matches >= max_results:
+                    truncated = True
+                    stop_event.set()
+                    break
+                page.append(match)
+                total_matches += 1
+                if len(page) >= page_size and context.streaming:
+                    await context.send_page(page)
+                    page = []
+    except BaseException:
+        # Stop the walkers if sending a page failed or the action got cancelled
+        stop_event.set()
+        raise
+
+    statistics = await search_task
+
+    return {
+        "matches": page,
+        "total_matches": total_matches,
+        "truncated": truncated,
+        "pages_sent": context.pages_sent,
+        **statistics,
+    }
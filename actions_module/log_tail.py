@@ -0,0 +1,236 @@
+""" Module for defining the native action returning and following the end of log files. """
+
+from typing import Any, BinaryIO, Dict, List
+
+import asyncio
+import os
+import time
+from config_module.config_io import get_logging_path
+from actions_module.action_registry import ActionContext, ActionError, register_action
+
+DEFAULT_LINES = 100
+MAX_LINES = 100000
+MAX_FOLLOW_SECONDS = 3600
+DEFAULT_CHUNK_INTERVAL = 1.0
+DEFAULT_MAX_CHUNK_LINES = 1000
+POLL_INTERVAL = 0.25
+
+# Size of the blocks read backwards from the end of the file
+READ_BLOCK_SIZE = 64 * 1024
+
+
+def read_last_lines(f: BinaryIO, count: int, end: int) -> List[bytes]:
+    """
+    Read the last lines of a file by seeking backwards from the end, without reading the whole file.
+
+    Args:
+        f (BinaryIO): File opened in binary mode.
+        count (int): Number of lines to read.
+        end (int): Offset of the end of the file.
+
+    Returns:
+        List[bytes]: Last lines without their line endings.
+    """
+    if count <= 0:
+        return []
+
+    position = end
+    data = b""
+    # One more line break than lines is needed, unless the start of the file is reached
+    while position > 0 and data.count(b"\n") <= count:
+        size = min(READ_BLOCK_SIZE, position)
+        position -= size
+        f.seek(position)
+        data = f.read(size) + data
+
+    lines = data.splitlines()
+    if position > 0:
+        # The first line is only partially read
+        lines = lines[1:]
+    return lines[-count:]
+
+
+def check_encoding(encoding: str) -> None:
+    """
+    Check that lines of a file in an encoding can be split on line feed bytes.
+
+    Args:
+        encoding (str): Encoding of the file.
+
+    Raises:
+        ActionError: If the encoding is unknown or not ASCII compatible, like UTF-16.
+    """
+    try:
+        encoded = "\r\n".encode(encoding)
+    except LookupError as e:
+        raise ActionError(f"Unknown encoding: {encoding}") from e
+    if encoded != b"\r\n":
+        raise ActionError(f"Unsupported encoding, must be ASCII compatible: {encoding}")
+
+
+def decode_lines(lines: List[bytes], encoding: str) -> List[str]:
+    """
+    Decode lines read from a file.
+
+    Args:
+        lines (List[bytes]): Lines in binary.
+        encoding (str): Encoding of the file.
+
+    Returns:
+        List[str]: Decoded lines, with undecodable bytes replaced.
+    """
+    return [line.decode(encoding, errors="replace") for line in lines]
+
+
+class LogFollower:
+    """
+    Follows the lines appended to a log file, handling rotation by tracking the inode.
+    """
+
+    def __init__(self, path: str, f: BinaryIO, position: int) -> None:
+        """Constructs a new log follower instance.
+
+        Args:
+            path (str): Path of the log file.
+            f (BinaryIO): Log file opened in binary mode.
+            position (int): Offset to follow from.
+        """
+        self.path = path
+        self.rotations = 0
+        self.__file = f
+        self.__inode = os.fstat(f.fileno()).st_ino
+        self.__position = position
+        self.__partial = b""
+
+    def read_new_lines(self) -> List[bytes]:
+        """
+        Read the complete lines appended since the last call.
+
+        Returns:
+            List[bytes]: New lines without their line endings.
+        """
+        data = self.__read_available()
+
+        try:
+            current = os.stat(self.path)
+        except FileNotFoundError:
+            current = None
+
+        if current is not None and (current.st_ino != self.__inode or current.st_size < self.__position):
+            # The file got rotated or truncated, finish the old file and restart from the beginning
+            data += self.__read_available()
+            self.__file.close()
+            self.__file = open(self.path, "rb")
+            self.__inode = os.fstat(self.__file.fileno()).st_ino
+            self.__position = 0
+            self.rotations += 1
+            data += self.__read_available()
+
+        data = self.__partial + data
+        lines = data.split(b"\n")
+        self.__partial = lines.pop()
+        return [line.rstrip(b"\r") for line in lines]
+
+    def close(self) -> None:
+        """
+        Close the followed file.
+        """
+        self.__file.close()
+
+    def __read_available(self) -> bytes:
+        """
+        Read the data appended to the current file.
+
+        Returns:
+            bytes: Appended data.
+        """
+        self.__file.seek(self.__position)
+        data = self.__file.read()
+        self.__position += len(data)
+        return data
+
+
+@register_action("log_tail")
+async def log_tail(parameters: Dict[str, Any], context: ActionContext) -> Dict[str, Any]:
+    """
+    Return the last lines of a log file and optionally follow it for a bounded duration.
+
+    New lines are streamed back in chunks while following if possible, the remaining ones are returned.
+    Following gives back the running slot of the action but still counts as a pending job.
+
+    Args:
+        parameters (Dict[str, Any]): `path` of the file or `agent_log` for the log of the agent, number of
+            `lines`, `follow` duration in seconds, `chunk_interval` in seconds, `max_chunk_lines` and ASCII compatible `encoding`.
+        context (ActionContext): Context of the invocation.
+
+    Raises:
+        ActionError: If the path or encoding is invalid, or the file cannot be read.
+
+    Returns:
+        Dict[str, Any]: Last lines of the file and statistics of the following.
+    """
+    path = parameters.get("path")
+    if not path and parameters.get("agent_log"):
+        path = get_logging_path(context.config_data.get("rewst_org_id"))
+    if not path:
+        raise ActionError("Missing path of the log file")
+
+    count = min(MAX_LINES, max(0, int(parameters.get("lines", DEFAULT_LINES))))
+    follow = min(MAX_FOLLOW_SECONDS, max(0.0, float(parameters.get("follow", 0))))
+    chunk_interval = max(POLL_INTERVAL, float(parameters.get("chunk_interval", DEFAULT_CHUNK_INTERVAL)))
+    max_chunk_lines = max(1, int(parameters.get("max_chunk_lines", DEFAULT_MAX_CHUNK_LINES)))
+    encoding = parameters.get("encoding", "utf-8")
+    check_encoding(encoding)
+
+    def read_tail():
+        f = open(path, "rb")
+        try:
+            end = os.fstat(f.fileno()).st_size
+            return f, end, read_last_lines(f, count, end)
+        except BaseException:
+            f.close()
+            raise
+
+    try:
+        f, end, lines = await asyncio.to_thread(read_tail)
+    except OSError as e:
+        raise ActionError(f"Failed to read {path}: {e}") from e
+
+    result = {"path": path, "lines": decode_lines(lines, encoding)}
+    if not follow:
+        f.close()
+        return result
+
+    if context.streaming and result["lines"]:
+        await context.send_page({"path": path, "lines": result["lines"]})
+        result["lines"] = []
+
+    # Following mostly waits, so it must not keep scripts from running
+    await context.leave_slot()
+
+    follower = LogFollower(path, f, end)
+    deadline = time.monotonic() + follow
+    last_sent = time.monotonic()
+    pending = result["lines"]
+    try:
+        while (now := time.monotonic()) < deadline:
+            await asyncio.sleep(min(POLL_INTERVAL, deadline - now))
+            pending.extend(decode_lines(await asyncio.to_thread(follower.read_new_lines), encoding))
+
+            if not context.streaming:
+                pending = pending[-MAX_LINES:]
+
+            if context.streaming and pending and (
+                    len(pending) >= max_chunk_lines or time.monotonic() - last_sent >= chunk_interval):
+                while pending:
+                    await context.send_page({"path": path, "lines": pending[:max_chunk_lines]})
+                    pending = pending[max_chunk_lines:]
+                last_sent = time.monotonic()
+    finally:
+        follower.close()
+
+    result["lines"] = pending
+    result["followed_seconds"] = follow
+    result["rotations"] = follower.rotations
+    result["pages_sent"] = context.pages_sent
+    return result
@@ -0,0 +1,113 @@
+""" Module for defining the native action checking the TCP reachability of many targets. """
+
+from typing import Any, Dict, List, Tuple
+
+import asyncio
+import time
+from actions_module.action_registry import ActionContext, ActionError, register_action
+
+DEFAULT_CONCURRENCY = 100
+DEFAULT_TIMEOUT = 3.0
+MAX_CONCURRENCY = 1000
+
+
+def parse_targets(parameters: Dict[str, Any]) -> List[Tuple[str, int]]:
+    """
+    Parse the targets to check from the action parameters.
+
+    Targets are given as `host:port` strings or `{"host": ..., "port": ...}` objects in `targets`,
+    or as the product of `hosts` and `ports`.
+
+    Args:
+        parameters (Dict[str, Any]): Parameters of the port check action.
+
+    Raises:
+        ActionError: If a target is invalid or no target is given.
+
+    Returns:
+        List[Tuple[str, int]]: Host and port of the targets.
+    """
+    targets = []
+    for target in parameters.get("targets") or []:
+        if isinstance(target, dict):
+            host, port = target.get("host"), target.get("port")
+        else:
+            host, _, port = str(target).rpartition(":")
+            host = host.strip("[]")
+        try:
+            targets.append((host, int(port)))
+        except (TypeError, ValueError) as e:
+            raise ActionError(f"Invalid target: {target}") from e
+
+    ports = []
+    for port in parameters.get("ports") or []:
+        try:
+            ports.append(int(port))
+        except (TypeError, ValueError) as e:
+            raise ActionError(f"Invalid port {port}") from e
+    for host in parameters.get("hosts") or []:
+        for port in ports:
+            targets.append((host, port))
+
+    if not targets:
+        raise ActionError("Missing targets to check")
+    for host, port in targets:
+        if not host or not 0 < port < 65536:
+            raise ActionError(f"Invalid target: {host}:{port}")
+    return targets
+
+
+async def check_target(host: str, port: int, timeout: float, semaphore: asyncio.Semaphore) -> Dict[str, Any]:
+    """
+    Open a TCP connection to a target and measure the latency.
+
+    Args:
+        host (str): Host name or address of the target.
+        port (int): TCP port of the target.
+        timeout (float): Timeout of the connection in seconds.
+        semaphore (asyncio.Semaphore): Semaphore limiting the concurrent connections.
+
+    Returns:
+        Dict[str, Any]: Status and latency in milliseconds of the target.
+    """
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        except asyncio.TimeoutError:
+            status, error = "timeout", None
+        except ConnectionRefusedError as e:
+            status, error = "refused", str(e)
+        except OSError as e:
+            status, error = "error", str(e)
+        else:
+            latency = time.perf_counter() - start
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+            return {"host": host, "port": port, "status": "open", "latency_ms": round(latency * 1000, 3)}
+
+    return {"host": host, "port": port, "status": status, "latency_ms": None, "error": error}
+
+
+@register_action("port_check")
+async def port_check(parameters: Dict[str, Any], context: ActionContext) -> List[Dict[str, Any]]:
+    """
+    Check the TCP reachability of many targets concurrently.
+
+    Args:
+        parameters (Dict[str, Any]): `targets`, or `hosts` and `ports`, to check, `concurrency` and
+            per-target `timeout` in seconds.
+        context (ActionContext): Context of the invocation.
+
+    Returns:
+        List[Dict[str, Any]]: Status and latency of the targets in the order they were given.
+    """
+    targets = parse_targets(parameters)
+    concurrency = min(MAX_CONCURRENCY, max(1, int(parameters.get("concurrency", DEFAULT_CONCURRENCY))))
+    timeout = float(parameters.get("timeout", DEFAULT_TIMEOUT))
+
+    semaphore = asyncio.Semaphore(concurrency)
+    return await asyncio.gather(*(check_target(host, port, timeout, semaphore) for host, port in targets))
@@ -0,0 +1,252 @@
+""" Module for defining the process pool shared by CPU heavy native actions and the result pipeline. """
+
+from typing import Any, Callable, Dict
+
+import asyncio
+import concurrent.futures
+import json
+import logging
+import math
+import multiprocessing
+import os
+import threading
+from actions_module.action_registry import ActionContext, register_action
+
+# Locations of the CPU quota of cgroup v2 and v1
+CGROUP_V2_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+CGROUP_V1_CPU_QUOTA = "/sys/fs/cgroup/cpu/cpu.cfs_quota_us"
+CGROUP_V1_CPU_PERIOD = "/sys/fs/cgroup/cpu/cpu.cfs_period_us"
+
+
+def read_cgroup_cpu_limit() -> float | None:
+    """
+    Read the CPU limit of the cgroup of the agent.
+
+    Returns:
+        float | None: Number of CPUs allowed by the quota, or None if unlimited or unknown.
+    """
+    try:
+        with open(CGROUP_V2_CPU_MAX) as f:
+            quota, period = f.read().split()[:2]
+        if quota == "max":
+            return None
+        return int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+
+    try:
+        with open(CGROUP_V1_CPU_QUOTA) as f:
+            quota = int(f.read())
+        with open(CGROUP_V1_CPU_PERIOD) as f:
+            period = int(f.read())
+        if quota <= 0 or period <= 0:
+            return None
+        return quota / period
+    except (OSError, ValueError):
+        return None
+
+
+def get_cpu_limit() -> int:
+    """
+    Get the number of CPUs usable by the agent, given its affinity and cgroup limits.
+
+    Returns:
+        int: Number of CPUs, at least 1.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count() or 1
+
+    cgroup_limit = read_cgroup_cpu_limit()
+    if cgroup_limit is not None:
+        cpus = min(cpus, math.ceil(cgroup_limit))
+    return max(1, cpus)
+
+
+def get_default_max_workers() -> int:
+    """
+    Get the default number of worker processes, leaving a CPU to the agent's event loop.
+
+    Returns:
+        int: Number of worker processes.
+    """
+    return max(1, get_cpu_limit() - 1)
+
+
+def get_start_method() -> str:
+    """
+    Get the start method of the worker processes.
+
+    Returns:
+        str: forkserver if available, otherwise spawn.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return "forkserver"
+    return "spawn"
+
+
+def encode_json(data: Any) -> bytes:
+    """
+    Encode data as UTF-8 JSON. Used to encode large results in a worker process.
+
+    Args:
+        data (Any): JSON serializable data.
+
+    Returns:
+        bytes: Encoded data.
+    """
+    return json.dumps(data).encode("utf-8")
+
+
+class SharedProcessPool:
+    """
+    Process pool shared by the agent, started on first use.
+    """
+
+    def __init__(self, max_workers: int = None) -> None:
+        """Constructs a new shared process pool instance.
+
+        Args:
+            max_workers (int, optional): Number of worker processes. Defaults to the CPU limit minus one.
+        """
+        self.max_workers = max_workers or get_default_max_workers()
+        self.start_method = get_start_method()
+
+        self.__lock = threading.Lock()
+        self.__executor = None
+        self.__in_flight = 0
+        self.__completed = 0
+        self.__failed = 0
+
+    def submit(self, function: Callable[..., Any], *args: Any) -> concurrent.futures.Future:
+        """
+        Submit a function to run in a worker process.
+
+        Args:
+            function (Callable[..., Any]): Picklable module level function.
+            *args (Any): Picklable arguments of the function.
+
+        Returns:
+            concurrent.futures.Future: Future of the result.
+        """
+        with self.__lock:
+            if self.__executor is None:
+                logging.info("Starting process pool with %d workers using %s",
+                             self.max_workers, self.start_method)
+                self.__executor = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context(self.start_method),
+                )
+            future = self.__executor.submit(function, *args)
+            self.__in_flight += 1
+
+        future.add_done_callback(self.__on_done)
+        return future
+
+    async def run(self, function: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run a function in a worker process without blocking the event loop.
+
+        Args:
+            function (Callable[..., Any]): Picklable module level function.
+            *args (Any): Picklable arguments of the function.
+
+        Returns:
+            Any: Result of the function.
+        """
+        return await asyncio.wrap_future(self.submit(function, *args))
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Get the queue and busy metrics of the pool.
+
+        Busy and queued jobs are derived from the jobs in flight, as the executor does not
+        tell when a job starts.
+
+        Returns:
+            Dict[str, Any]: Metrics of the pool.
+        """
+        with self.__lock:
+            return {
+                "started": self.__executor is not None,
+                "start_method": self.start_method,
+                "max_workers": self.max_workers,
+                "busy": min(self.__in_flight, self.max_workers),
+                "queued": max(0, self.__in_flight - self.max_workers),
+                "completed": self.__completed,
+                "failed": self.__failed,
+            }
+
+    def resize(self, max_workers: int) -> None:
+        """
+        Change the number of worker processes. Running jobs finish on the previous workers.
+
+        Args:
+            max_workers (int): Number of worker processes.
+        """
+        max_workers = max(1, max_workers)
+        with self.__lock:
+            if max_workers == self.max_workers:
+                return
+            self.max_workers = max_workers
+            executor, self.__executor = self.__executor, None
+
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stop the worker processes. The pool is started again on the next submission.
+
+        Args:
+            wait (bool, optional): Wait for the running jobs to finish. Defaults to True.
+        """
+        with self.__lock:
+            executor, self.__executor = self.__executor, None
+
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
+
+    def __on_done(self, future: concurrent.futures.Future) -> None:
+        """
+        Update the metrics when a job is done.
+
+        Args:
+            future (concurrent.futures.Future): Future of the job.
+        """
+        with self.__lock:
+            self.__in_flight -= 1
+            if future.cancelled() or future.exception() is not None:
+                self.__failed += 1
+            else:
+                self.__completed += 1
+
+
+# Process pool shared by the whole agent process
+process_pool = SharedProcessPool()
+
+
+def get_process_pool() -> SharedProcessPool:
+    """
+    Get the process pool shared by the agent.
+
+    Returns:
+        SharedProcessPool: Shared process pool.
+    """
+    return process_pool
+
+
+@register_action("process_pool_status")
+def process_pool_status(parameters: Dict[str, Any], context: ActionContext) -> Dict[str, Any]:
+    """
+    Get the metrics of the shared process pool.
+
+    Args:
+        parameters (Dict[str, Any]): No parameters.
+        context (ActionContext): Context of the invocation.
+
+    Returns:
+        Dict[str, Any]: Metrics of the pool.
+    """
+    return get_process_pool().metrics()
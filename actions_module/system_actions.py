@@ -0,0 +1,187 @@
+""" Module for defining native actions reading the state of the host system. """
+
+from typing import Any, Dict, List
+
+import os
+import platform
+import stat
+import psutil
+from actions_module.action_registry import ActionContext, ActionError, register_action
+
+# Process attributes returned by the process list action
+PROCESS_ATTRIBUTES = ["pid", "ppid", "name", "username", "status", "create_time", "memory_info"]
+
+
+@register_action("process_list")
+def process_list(parameters: Dict[str, Any], context: ActionContext) -> List[Dict[str, Any]]:
+    """
+    List the running processes of the host.
+
+    Args:
+        parameters (Dict[str, Any]): Optional `name` to only list processes with this name.
+        context (ActionContext): Context of the invocation.
+
+    Returns:
+        List[Dict[str, Any]]: Details of the processes.
+    """
+    name = parameters.get("name")
+    processes = []
+    for process in psutil.process_iter(PROCESS_ATTRIBUTES):
+        info = process.info
+        if name and (info["name"] or "").lower() != name.lower():
+            continue
+        memory_info = info.pop("memory_info")
+        info["rss"] = memory_info.rss if memory_info else None
+        processes.append(info)
+    return processes
+
+
+@register_action("disk_usage")
+def disk_usage(parameters: Dict[str, Any], context: ActionContext) -> List[Dict[str, Any]]:
+    """
+    Get the usage of the mounted disks of the host.
+
+    Args:
+        parameters (Dict[str, Any]): Optional `path` to only get the usage of its disk.
+        context (ActionContext): Context of the invocation.
+
+    Returns:
+        List[Dict[str, Any]]: Usage of the disks.
+    """
+    path = parameters.get("path")
+    if path:
+        mountpoints = [(path, None, None)]
+    else:
+        mountpoints = [(partition.mountpoint, partition.device, partition.fstype)
+                       for partition in psutil.disk_partitions()]
+
+    disks = []
+    for mountpoint, device, fstype in mountpoints:
+        try:
+            usage = psutil.disk_usage(mountpoint)
+        except OSError as e:
+            if path:
+                raise ActionError(f"Failed to get disk usage of {path}: {e}") from e
+            continue
+        disks.append({
+            "mountpoint": mountpoint,
+            "device": device,
+            "fstype": fstype,
+            "total": usage.total,
+            "used": usage.used,
+            "free": usage.free,
+            "percent": usage.percent,
+        })
+    return disks
+
+
+@register_action("service_status")
+def service_status(parameters: Dict[str, Any], context: ActionContext) -> Dict[str, Any]:
+    """
+    Get the status of a service of the host.
+
+    On Windows the service control manager is queried, on other platforms the service is
+    considered running if a process with its name exists.
+
+    Args:
+        parameters (Dict[str, Any]): `name` of the service.
+        context (ActionContext): Context of the invocation.
+
+    Raises:
+        ActionError: If the name of the service is missing.
+
+    Returns:
+        Dict[str, Any]: Status of the service.
+    """
+    name = parameters.get("name")
+    if not name:
+        raise ActionError("Missing service name")
+
+    if platform.system().lower() == "windows":
+        try:
+            service = psutil.win_service_get(name).as_dict()
+        except psutil.NoSuchProcess:
+            return {"name": name, "exists": False, "status": None, "pid": None}
+        return {
+            "name": name,
+            "exists": True,
+            "status": service["status"],
+            "pid": service["pid"],
+            "start_type": service["start_type"],
+            "display_name": service["display_name"],
+        }
+
+    pids = [process.info["pid"] for process in psutil.process_iter(["pid", "name"])
+            if (process.info["name"] or "").lower() == name.lower()]
+    return {
+        "name": name,
+        "exists": bool(pids),
+        "status": "running" if pids else "stopped",
+        "pid": pids[0] if pids else None,
+    }
+
+
+@register_action("network_interfaces")
+def network_interfaces(parameters: Dict[str, Any], context: ActionContext) -> Dict[str, Any]:
+    """
+    Get the network interfaces of the host with their addresses.
+
+    Args:
+        parameters (Dict[str, Any]): No parameters.
+        context (ActionContext): Context of the invocation.
+
+    Returns:
+        Dict[str, Any]: Details of the interfaces by name.
+    """
+    stats = psutil.net_if_stats()
+    interfaces = {}
+    for name, addresses in psutil.net_if_addrs().items():
+        interface_stats = stats.get(name)
+        interfaces[name] = {
+            "is_up": interface_stats.isup if interface_stats else None,
+            "speed": interface_stats.speed if interface_stats else None,
+            "mtu": interface_stats.mtu if interface_stats else None,
+            "addresses": [
+                {
+                    "family": getattr(address.family, "name", str(address.family)),
+                    "address": address.address,
+                    "netmask": address.netmask,
+                }
+                for address in addresses
+            ],
+        }
+    return interfaces
+
+
+@register_action("file_exists")
+def file_exists(parameters: Dict[str, Any], context: ActionContext) -> Dict[str, Any]:
+    """
+    Check whether a file or directory exists on the host.
+
+    Args:
+        parameters (Dict[str, Any]): `path` to check.
+        context (ActionContext): Context of the invocation.
+
+    Raises:
+        ActionError: If the path is missing.
+
+    Returns:
+        Dict[str, Any]: Existence, type, size and modification time of the path.
+    """
+    path = parameters.get("path")
+    if not path:
+        raise ActionError("Missing path")
+
+    try:
+        file_stat = os.stat(path)
+    except FileNotFoundError:
+        return {"path": path, "exists": False}
+
+    return {
+        "path": path,
+        "exists": True,
+        "is_file": stat.S_ISREG(file_stat.st_mode),
+        "is_dir": stat.S_ISDIR(file_stat.st_mode),
+        "size": file_stat.st_size,
+        "mtime": file_stat.st_mtime,
+    }
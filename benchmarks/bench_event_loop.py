@@ -0,0 +1,263 @@
+""" Benchmark of the default asyncio event loop against uvloop.
+
+Run with `poetry run python -m benchmarks.bench_event_loop`.
+
+Each workload runs once on each event loop available:
+- subprocess: short processes started concurrently through the event loop.
+- commands: bash scripts handled by the message pipeline, as the agent runs them.
+- http: concurrent POSTs with httpx to an HTTP server on the same event loop.
+
+uvloop is skipped when not installed or on Windows, where it is not supported.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, List
+
+import argparse
+import asyncio
+import json
+import logging
+import shutil
+import sys
+import tempfile
+import time
+from unittest import mock
+
+import httpx
+
+from benchmarks.bench_message_pipeline import percentile, run_benchmarks
+from rewst_remote_agent import DEFAULT_EVENT_LOOP, UVLOOP, get_event_loop_policy
+
+HTTP_RESPONSE = b"HTTP/1.1 200 OK\r\nContent-Type: text/plain\r\nContent-Length: 2\r\n\r\nOK"
+
+
+async def run_concurrently(operation: Callable[[], Awaitable[Any]], operations: int,
+                           concurrency: int) -> Dict[str, float]:
+    """
+    Run an operation a number of times with some of them in flight at all times.
+
+    Args:
+        operation (Callable[[], Awaitable[Any]]): Coroutine function of the operation.
+        operations (int): Number of operations.
+        concurrency (int): Number of operations in flight.
+
+    Returns:
+        Dict[str, float]: Operations per second and latency percentiles in milliseconds.
+    """
+    remaining = operations
+    latencies: List[float] = []
+
+    async def worker() -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            await operation()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "ops_per_sec": round(operations / elapsed, 3),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+    }
+
+
+async def bench_subprocess(operations: int, concurrency: int) -> Dict[str, float]:
+    """
+    Start short processes through the event loop.
+
+    Args:
+        operations (int): Number of processes.
+        concurrency (int): Number of processes running at once.
+
+    Returns:
+        Dict[str, float]: Processes per second and latency percentiles.
+    """
+    command = [shutil.which("true")] if shutil.which("true") else [sys.executable, "-c", "pass"]
+
+    async def run_process() -> None:
+        process = await asyncio.create_subprocess_exec(
+            *command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+        await process.communicate()
+
+    return await run_concurrently(run_process, operations, concurrency)
+
+
+async def bench_commands(operations: int, concurrency: int) -> Dict[str, float]:
+    """
+    Handle messages running bash scripts through the message pipeline.
+
+    Args:
+        operations (int): Number of messages.
+        concurrency (int): Number of messages in flight.
+
+    Returns:
+        Dict[str, float]: Messages per second and latency percentiles.
+    """
+    report = await run_benchmarks(["bash"], [64], [concurrency], operations)
+    result = report["results"][0]
+    return {
+        "ops_per_sec": result["messages_per_sec"],
+        "p50_ms": result["p50_ms"],
+        "p95_ms": result["p95_ms"],
+        "p99_ms": result["p99_ms"],
+    }
+
+
+async def bench_http(operations: int, concurrency: int) -> Dict[str, float]:
+    """
+    Send POSTs with httpx to an HTTP server running on the same event loop.
+
+    Args:
+        operations (int): Number of POSTs.
+        concurrency (int): Number of POSTs in flight.
+
+    Returns:
+        Dict[str, float]: POSTs per second and latency percentiles.
+    """
+    async def handle_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                headers = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in headers.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                await reader.readexactly(length)
+                writer.write(HTTP_RESPONSE)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle_connection, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    payload = {"output": "x" * 1024, "error": ""}
+    try:
+        limits = httpx.Limits(max_connections=concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits) as client:
+            async def post() -> None:
+                response = await client.post("/webhooks/custom/action/bench", json=payload)
+                response.raise_for_status()
+
+            return await run_concurrently(post, operations, concurrency)
+    finally:
+        server.close()
+        await server.wait_closed()
+
+
+WORKLOADS: Dict[str, Callable[[int, int], Awaitable[Dict[str, float]]]] = {
+    "subprocess": bench_subprocess,
+    "commands": bench_commands,
+    "http": bench_http,
+}
+
+
+def get_event_loops() -> Dict[str, asyncio.AbstractEventLoopPolicy | None]:
+    """
+    Get the event loops available on this machine.
+
+    Returns:
+        Dict[str, asyncio.AbstractEventLoopPolicy | None]: Event loop policy by event loop name, None for the
+            default one.
+    """
+    loops = {DEFAULT_EVENT_LOOP: None}
+    uvloop_policy = get_event_loop_policy(UVLOOP)
+    if uvloop_policy is not None:
+        loops[UVLOOP] = uvloop_policy
+    return loops
+
+
+def run_with_policy(workload: str, policy: asyncio.AbstractEventLoopPolicy | None, operations: int,
+                    concurrency: int) -> Dict[str, float]:
+    """
+    Run a workload with an event loop policy installed, as the agent does.
+
+    Args:
+        workload (str): Name of the workload.
+        policy (asyncio.AbstractEventLoopPolicy | None): Event loop policy, None for the default one.
+        operations (int): Number of operations.
+        concurrency (int): Number of operations in flight.
+
+    Returns:
+        Dict[str, float]: Results of the workload.
+    """
+    previous_policy = asyncio.get_event_loop_policy()
+    asyncio.set_event_loop_policy(policy)
+    try:
+        return asyncio.run(WORKLOADS[workload](operations, concurrency))
+    finally:
+        asyncio.set_event_loop_policy(previous_policy)
+
+
+def run_workloads(workloads: List[str], operations: int, concurrency: int) -> Dict[str, Any]:
+    """
+    Run the workloads on each event loop.
+
+    Args:
+        workloads (List[str]): Names of the workloads.
+        operations (int): Number of operations per workload.
+        concurrency (int): Number of operations in flight.
+
+    Returns:
+        Dict[str, Any]: Results by workload and event loop, with the speedup of uvloop.
+    """
+    loops = get_event_loops()
+    results = {}
+    for workload in workloads:
+        if workload == "commands" and not shutil.which("bash"):
+            continue
+
+        results[workload] = {
+            name: run_with_policy(workload, policy, operations, concurrency)
+            for name, policy in loops.items()
+        }
+        if UVLOOP in results[workload]:
+            results[workload]["uvloop_speedup"] = round(
+                results[workload][UVLOOP]["ops_per_sec"] / results[workload][DEFAULT_EVENT_LOOP]["ops_per_sec"], 3)
+
+    return {"event_loops": list(loops), "operations": operations, "concurrency": concurrency, "results": results}
+
+
+def main() -> None:
+    """
+    Entry point of the benchmark.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the default asyncio event loop against uvloop.")
+    parser.add_argument("--workloads", nargs="+", choices=list(WORKLOADS), default=list(WORKLOADS),
+                        help="Workloads to run.")
+    parser.add_argument("--operations", type=int, default=200, help="Number of operations per workload.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Number of operations in flight.")
+    parser.add_argument("--output", help="Path of the JSON file to save the results to.")
+    args = parser.parse_args()
+
+    # Keep the logs of each message out of the timings
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as data_directory, \
+            mock.patch("iot_hub_module.connection_management.get_data_directory", return_value=data_directory):
+        report = run_workloads(args.workloads, args.operations, args.concurrency)
+
+    if UVLOOP not in report["event_loops"]:
+        print(f"{UVLOOP} is not available, install it with `poetry install --extras uvloop`.")
+
+    print(f"{'workload':<12}{'loop':<10}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for workload, loops in report["results"].items():
+        for name in report["event_loops"]:
+            result = loops[name]
+            print(f"{workload:<12}{name:<10}{result['ops_per_sec']:>10.1f}{result['p50_ms']:>10.1f}"
+                  f"{result['p95_ms']:>10.1f}{result['p99_ms']:>10.1f}")
+        if "uvloop_speedup" in loops:
+            print(f"{workload:<12}{'speedup':<10}{loops['uvloop_speedup']:>10.2f}x")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
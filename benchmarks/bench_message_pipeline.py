@@ -0,0 +1,336 @@
+""" Benchmark of the throughput and latency of the message pipeline.
+
+Run with `poetry run python -m benchmarks.bench_message_pipeline`.
+
+Synthetic cloud to device messages of varying script sizes and interpreters are
+handed to ConnectionManager.handle_message() at several concurrency levels, the
+way the IoT Hub client does. The results are posted to a local webhook sink, so
+the latency of each message runs from its receipt until the POST of its results
+is acknowledged. The peak resident set size of the agent process is sampled
+while each scenario runs.
+"""
+
+from typing import Any, Dict, Iterator, List, Tuple
+from unittest import mock
+
+import argparse
+import asyncio
+import base64
+import itertools
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+import psutil
+from azure.iot.device.iothub.models import Message
+
+from __version__ import __version__
+from tests.fakes.http_sink import WebhookSink
+
+NATIVE = "native"
+DEFAULT_SCRIPT_SIZES = [64, 4096, 65536]
+DEFAULT_CONCURRENCY = [1, 4, 16]
+DEFAULT_MESSAGES = 50
+RSS_SAMPLE_INTERVAL = 0.005
+
+
+def get_interpreters() -> Dict[str, str]:
+    """
+    Get the interpreters installed on this machine.
+
+    Returns:
+        Dict[str, str]: Interpreter executable path by interpreter name.
+    """
+    interpreters = {}
+    bash = shutil.which("bash")
+    if bash:
+        interpreters["bash"] = bash
+    powershell = shutil.which("powershell") or shutil.which("pwsh")
+    if powershell:
+        interpreters["powershell"] = powershell
+    return interpreters
+
+
+def make_script(interpreter: str, size: int) -> str:
+    """
+    Make a script printing lines until it reaches a size.
+
+    Args:
+        interpreter (str): Interpreter name, bash or powershell.
+        size (int): Size of the script in characters.
+
+    Returns:
+        str: Script.
+    """
+    line = "Write-Output '{}'" if interpreter == "powershell" else "echo '{}'"
+    lines, length = [], 0
+    while length < size:
+        lines.append(line.format("x" * min(76, max(1, size - length - len(line)))))
+        length += len(lines[-1]) + 1
+    return "\n".join(lines)
+
+
+def make_message(interpreter: str, executable: str, size: int, post_id: str) -> Message:
+    """
+    Make a synthetic cloud to device message.
+
+    Args:
+        interpreter (str): Interpreter name, or NATIVE for a native action.
+        executable (str): Interpreter executable path.
+        size (int): Size of the script in characters, unused by native actions.
+        post_id (str): Post back identifier of the message.
+
+    Returns:
+        Message: IoT Hub message.
+    """
+    if interpreter == NATIVE:
+        message_data = {"action": "disk_usage", "parameters": {}}
+    else:
+        script = make_script(interpreter, size)
+        encoding = "utf-16-le" if interpreter == "powershell" else "utf-8"
+        message_data = {
+            "commands": base64.b64encode(script.encode(encoding)).decode(),
+            "interpreter_override": executable,
+        }
+    message_data["post_id"] = post_id
+    return Message(json.dumps(message_data).encode("utf-8"), str(uuid.uuid4()))
+
+
+def make_config(concurrency: int) -> Dict[str, Any]:
+    """
+    Make the configuration of a fake organization that keeps no state on disk.
+
+    Args:
+        concurrency (int): Number of messages in flight, all admitted by the agent.
+
+    Returns:
+        Dict[str, Any]: Configuration data.
+    """
+    org_id = str(uuid.uuid4())
+    return {
+        "azure_iot_hub_host": "localhost",
+        "device_id": org_id,
+        "shared_access_key": base64.b64encode(os.urandom(32)).decode(),
+        "rewst_engine_host": "localhost",
+        "rewst_org_id": org_id,
+        "offline_buffer": False,
+        "execution_journal": False,
+        "max_pending_jobs": max(16, concurrency),
+    }
+
+
+class PeakRssSampler:
+    """
+    Samples the resident set size of this process in a background thread and keeps the peak.
+    """
+
+    def __init__(self, interval: float = RSS_SAMPLE_INTERVAL) -> None:
+        """Constructs a new sampler instance.
+
+        Args:
+            interval (float, optional): Seconds between samples. Defaults to RSS_SAMPLE_INTERVAL.
+        """
+        self.interval = interval
+        self.peak_rss = 0
+
+        self.__process = psutil.Process()
+        self.__stop = threading.Event()
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+
+    def __enter__(self) -> "PeakRssSampler":
+        """
+        Start sampling.
+
+        Returns:
+            PeakRssSampler: This sampler.
+        """
+        self.__thread.start()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        """
+        Stop sampling.
+        """
+        self.__stop.set()
+        self.__thread.join()
+
+    def __run(self) -> None:
+        """
+        Sample until stopped.
+        """
+        while True:
+            self.peak_rss = max(self.peak_rss, self.__process.memory_info().rss)
+            if self.__stop.wait(self.interval):
+                return
+
+
+def percentile(latencies: List[float], percent: int) -> float:
+    """
+    Get a percentile of latencies in milliseconds.
+
+    Args:
+        latencies (List[float]): Latencies in seconds.
+        percent (int): Percentile between 1 and 99.
+
+    Returns:
+        float: Percentile in milliseconds.
+    """
+    if len(latencies) < 2:
+        return round(latencies[0] * 1000, 3)
+    return round(statistics.quantiles(latencies, n=100, method="inclusive")[percent - 1] * 1000, 3)
+
+
+async def run_scenario(sink: WebhookSink, interpreter: str, executable: str, size: int,
+                       concurrency: int, messages: int) -> Dict[str, Any]:
+    """
+    Handle synthetic messages with a number of them in flight at all times.
+
+    Args:
+        sink (WebhookSink): Webhook sink receiving the results.
+        interpreter (str): Interpreter name, or NATIVE for a native action.
+        executable (str): Interpreter executable path.
+        size (int): Size of the scripts in characters.
+        concurrency (int): Number of messages in flight.
+        messages (int): Number of messages.
+
+    Returns:
+        Dict[str, Any]: Throughput, latency percentiles and peak resident set size.
+    """
+    from iot_hub_module.connection_management import ConnectionManager
+
+    connection_manager = ConnectionManager(make_config(concurrency), False)
+    queue = asyncio.Queue()
+    for _ in range(messages):
+        queue.put_nowait(make_message(interpreter, executable, size, f"bench:{uuid.uuid4()}"))
+    latencies: List[float] = []
+
+    async def worker() -> None:
+        while not queue.empty():
+            message = queue.get_nowait()
+            start = time.perf_counter()
+            await connection_manager.handle_message(message)
+            latencies.append(time.perf_counter() - start)
+
+    received = len(sink.get_requests())
+    with PeakRssSampler() as sampler:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    results = [request.json() for request in sink.get_requests()[received:]]
+    return {
+        "interpreter": interpreter,
+        "script_size": None if interpreter == NATIVE else size,
+        "concurrency": concurrency,
+        "messages": messages,
+        "posted": len(results),
+        "busy": sum(1 for result in results if result.get("busy")),
+        "errors": sum(1 for result in results if result.get("error") and not result.get("busy")),
+        "messages_per_sec": round(messages / elapsed, 3),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "peak_rss": sampler.peak_rss,
+    }
+
+
+def get_scenarios(interpreters: Dict[str, str], script_sizes: List[int],
+                  concurrency: List[int]) -> Iterator[Tuple[str, str, int, int]]:
+    """
+    Get the scenarios to run.
+
+    Args:
+        interpreters (Dict[str, str]): Interpreter executable path by interpreter name, NATIVE included.
+        script_sizes (List[int]): Script sizes in characters.
+        concurrency (List[int]): Concurrency levels.
+
+    Returns:
+        Iterator[Tuple[str, str, int, int]]: Interpreter name, executable, script size and concurrency of each scenario.
+    """
+    for (interpreter, executable), level in itertools.product(interpreters.items(), concurrency):
+        for size in script_sizes[:1] if interpreter == NATIVE else script_sizes:
+            yield interpreter, executable, size, level
+
+
+async def run_benchmarks(interpreters: List[str] = None, script_sizes: List[int] = None,
+                         concurrency: List[int] = None, messages: int = DEFAULT_MESSAGES) -> Dict[str, Any]:
+    """
+    Run the message pipeline benchmarks.
+
+    Args:
+        interpreters (List[str], optional): Interpreter names to run, NATIVE included. Defaults to all the
+            installed ones.
+        script_sizes (List[int], optional): Script sizes in characters. Defaults to DEFAULT_SCRIPT_SIZES.
+        concurrency (List[int], optional): Concurrency levels. Defaults to DEFAULT_CONCURRENCY.
+        messages (int, optional): Number of messages per scenario. Defaults to DEFAULT_MESSAGES.
+
+    Returns:
+        Dict[str, Any]: Environment of the run and results of each scenario.
+    """
+    available = {**get_interpreters(), NATIVE: ""}
+    selected = {name: path for name, path in available.items() if interpreters is None or name in interpreters}
+
+    sink = WebhookSink()
+    results = []
+    try:
+        with mock.patch("httpx.AsyncClient", side_effect=sink.make_client):
+            for interpreter, executable, size, level in get_scenarios(
+                    selected, script_sizes or DEFAULT_SCRIPT_SIZES, concurrency or DEFAULT_CONCURRENCY):
+                results.append(await run_scenario(sink, interpreter, executable, size, level, messages))
+    finally:
+        sink.close()
+
+    return {
+        "version": __version__,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.time(),
+        "results": results,
+    }
+
+
+def main() -> None:
+    """
+    Entry point of the benchmark.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the throughput and latency of the message pipeline.")
+    parser.add_argument("--interpreters", nargs="+", help=f"Interpreters to run, {NATIVE} included.")
+    parser.add_argument("--script-sizes", type=int, nargs="+", default=DEFAULT_SCRIPT_SIZES,
+                        help="Script sizes in characters.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=DEFAULT_CONCURRENCY,
+                        help="Numbers of messages in flight.")
+    parser.add_argument("--messages", type=int, default=DEFAULT_MESSAGES, help="Number of messages per scenario.")
+    parser.add_argument("--output", help="Path of the JSON file to save the results to.")
+    args = parser.parse_args()
+
+    # Keep the logs of each message out of the timings
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as data_directory, \
+            mock.patch("iot_hub_module.connection_management.get_data_directory", return_value=data_directory):
+        report = asyncio.run(run_benchmarks(args.interpreters, args.script_sizes, args.concurrency, args.messages))
+
+    print(f"{'interpreter':<12}{'size':>8}{'conc':>6}{'msg/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+          f"{'peak MiB':>10}{'errors':>8}")
+    for result in report["results"]:
+        size = "-" if result["script_size"] is None else result["script_size"]
+        print(f"{result['interpreter']:<12}{size:>8}{result['concurrency']:>6}{result['messages_per_sec']:>10.1f}"
+              f"{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}{result['p99_ms']:>10.1f}"
+              f"{result['peak_rss'] / 2**20:>10.1f}{result['errors'] + result['busy']:>8}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
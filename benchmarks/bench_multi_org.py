@@ -0,0 +1,156 @@
+""" Benchmark of the memory used per organization when one agent process hosts several.
+
+Run with `poetry run python -m benchmarks.bench_multi_org`.
+
+Each measurement runs in a fresh process that runs the connection loop of each
+organization, connected to a local stand-in of the IoT Hub, and measures once
+every organization reported itself online. The resident set size of N
+organizations in one process is compared with N separate agent processes.
+
+The device clients are those of the stand-in, so the memory of the MQTT
+pipeline of each SDK client is not included.
+"""
+
+from typing import Any, Dict, List
+from unittest import mock
+
+import argparse
+import asyncio
+import base64
+import gc
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import uuid
+
+import psutil
+
+from tests.fakes.iot_hub import CLIENT_CLASS, FakeIoTHub
+
+CONNECT_TIMEOUT = 60.0
+
+
+def make_config(org_id: str) -> Dict[str, Any]:
+    """
+    Make the configuration of a fake organization that keeps no state on disk.
+
+    Args:
+        org_id (str): Organization identifier.
+
+    Returns:
+        Dict[str, Any]: Configuration data.
+    """
+    return {
+        "azure_iot_hub_host": "localhost",
+        "device_id": org_id,
+        "shared_access_key": base64.b64encode(os.urandom(32)).decode(),
+        "rewst_engine_host": "localhost",
+        "rewst_org_id": org_id,
+        "offline_buffer": False,
+        "execution_journal": False,
+    }
+
+
+async def measure(organizations: int) -> Dict[str, Any]:
+    """
+    Measure the resident set size of this process hosting connected organizations.
+
+    Args:
+        organizations (int): Number of organizations.
+
+    Returns:
+        Dict[str, Any]: Resident set sizes in bytes before and after connecting the organizations.
+    """
+    from iot_hub_module.connection_management import multi_org_connection_loop
+
+    gc.collect()
+    process = psutil.Process()
+    rss_before = process.memory_info().rss
+
+    hub = FakeIoTHub()
+    stop_event = asyncio.Event()
+    configs = [make_config(str(uuid.uuid4())) for _ in range(organizations)]
+    try:
+        with mock.patch(f"{CLIENT_CLASS}.create_from_connection_string", side_effect=hub.create_client):
+            loop_task = asyncio.create_task(multi_org_connection_loop(configs, stop_event, False))
+            try:
+                # The organizations share the twin of the fake hub, so count their online reports
+                await hub.wait_for(lambda: sum(
+                    patch.get("connectivity") == {"status": "online"} for patch in hub.reported_patches
+                ) == organizations, CONNECT_TIMEOUT)
+
+                gc.collect()
+                rss_after = process.memory_info().rss
+                connected = sum(client.connected for client in hub.clients)
+            finally:
+                stop_event.set()
+                await loop_task
+    finally:
+        hub.close()
+
+    return {
+        "organizations": organizations,
+        "connected": connected,
+        "rss_before": rss_before,
+        "rss": rss_after,
+    }
+
+
+def run_child(organizations: int) -> Dict[str, Any]:
+    """
+    Measure organizations in a fresh process.
+
+    Args:
+        organizations (int): Number of organizations.
+
+    Returns:
+        Dict[str, Any]: Measurement of the child process.
+    """
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_multi_org", "--child", str(organizations)],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    """
+    Run the benchmark and print the results.
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--organizations", type=int, nargs="+", default=[1, 2, 5, 10, 25])
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        # Keep the logs of the connection loops out of the output
+        logging.disable(logging.WARNING)
+        with tempfile.TemporaryDirectory() as data_directory, \
+                mock.patch("iot_hub_module.connection_management.get_data_directory", return_value=data_directory):
+            print(json.dumps(asyncio.run(measure(args.child))))
+        return
+
+    counts = sorted(set([1] + args.organizations))
+    results: List[Dict[str, Any]] = [run_child(count) for count in counts]
+    single_process = results[0]["rss"]
+
+    print(f"{'orgs':>5} {'shared MiB':>11} {'separate MiB':>13} {'MiB per extra org':>18}")
+    for result in results:
+        count = result["organizations"]
+        result["separate_processes_rss"] = single_process * count
+        result["rss_per_extra_org"] = (result["rss"] - single_process) / (count - 1) if count > 1 else None
+        per_org = result["rss_per_extra_org"]
+        print(f"{count:>5} {result['rss'] / 2**20:>11.1f} {result['separate_processes_rss'] / 2**20:>13.1f} "
+              f"{'-' if per_org is None else f'{per_org / 2**20:.2f}':>18}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
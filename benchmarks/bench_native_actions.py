@@ -0,0 +1,208 @@
+""" Benchmark of native actions against the equivalent shell one-liners.
+
+Run with `poetry run python -m benchmarks.bench_native_actions`.
+
+The one-liners run the way the agent runs scripts: written to a temporary file,
+then executed by the interpreter through the shell.
+"""
+
+from typing import Any, Dict, List
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+
+from actions_module.action_registry import run_action
+
+# Service queried on every runner, so native and shell timings measure the same lookup
+SERVICE_NAME = "Spooler" if platform.system() == "Windows" else "sshd"
+
+# Action parameters and equivalent one-liners per interpreter
+BENCHMARKS = {
+    "process_list": (
+        {},
+        {
+            "bash": "ps -eo pid,ppid,user,stat,rss,lstart,comm",
+            "powershell": "Get-Process | Select-Object Id,ProcessName,WorkingSet64,StartTime | ConvertTo-Json",
+        },
+    ),
+    "disk_usage": (
+        {},
+        {
+            "bash": "df -P",
+            "powershell": "Get-PSDrive -PSProvider FileSystem | Select-Object Name,Used,Free | ConvertTo-Json",
+        },
+    ),
+    "service_status": (
+        {"name": "{service}"},
+        {
+            "bash": "pgrep -x '{service}' || true",
+            "powershell": "Get-Service -Name '{service}' | Select-Object Name,Status,StartType | ConvertTo-Json",
+        },
+    ),
+    "network_interfaces": (
+        {},
+        {
+            "bash": "ip -o addr 2>/dev/null || ifconfig -a",
+            "powershell": "Get-NetIPAddress | Select-Object InterfaceAlias,IPAddress,PrefixLength | ConvertTo-Json",
+        },
+    ),
+    "file_exists": (
+        {"path": "{path}"},
+        {
+            "bash": "test -e '{path}' && stat '{path}' > /dev/null",
+            "powershell": "Get-Item -LiteralPath '{path}' | Select-Object Length,LastWriteTime | ConvertTo-Json",
+        },
+    ),
+}
+
+
+def get_interpreters() -> Dict[str, str]:
+    """
+    Get the interpreters installed on this machine.
+
+    Returns:
+        Dict[str, str]: Interpreter executable path by interpreter name.
+    """
+    interpreters = {}
+    bash = shutil.which("bash")
+    if bash:
+        interpreters["bash"] = bash
+    powershell = shutil.which("powershell") or shutil.which("pwsh")
+    if powershell:
+        interpreters["powershell"] = powershell
+    return interpreters
+
+
+def summarize(timings: List[float]) -> Dict[str, float]:
+    """
+    Summarize timings in milliseconds.
+
+    Args:
+        timings (List[float]): Timings in seconds.
+
+    Returns:
+        Dict[str, float]: Mean, median, minimum and maximum in milliseconds.
+    """
+    return {
+        "mean_ms": round(statistics.mean(timings) * 1000, 3),
+        "median_ms": round(statistics.median(timings) * 1000, 3),
+        "min_ms": round(min(timings) * 1000, 3),
+        "max_ms": round(max(timings) * 1000, 3),
+    }
+
+
+async def bench_native(action: str, parameters: Dict[str, Any], iterations: int) -> List[float]:
+    """
+    Time a native action.
+
+    Args:
+        action (str): Name of the action.
+        parameters (Dict[str, Any]): Parameters of the action.
+        iterations (int): Number of runs.
+
+    Returns:
+        List[float]: Timings in seconds.
+    """
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        json.dumps(await run_action(action, parameters), default=str)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def bench_shell(interpreter: str, script: str, iterations: int) -> List[float]:
+    """
+    Time a shell one-liner run like ConnectionManager.execute_commands() runs scripts.
+
+    Args:
+        interpreter (str): Interpreter executable path.
+        script (str): One-liner to run.
+        iterations (int): Number of runs.
+
+    Returns:
+        List[float]: Timings in seconds.
+    """
+    powershell = "powershell" in interpreter.lower() or "pwsh" in interpreter.lower()
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".ps1" if powershell else ".sh",
+                                         mode="w") as temp_file:
+            temp_file.write(script)
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+        try:
+            if powershell:
+                shell_command = f'"{interpreter}" -File "{temp_file.name}"'
+            else:
+                shell_command = f'"{interpreter}" "{temp_file.name}"'
+            subprocess.run(shell_command, capture_output=True, text=True, shell=True, check=False)
+        finally:
+            os.remove(temp_file.name)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def run_benchmarks(iterations: int) -> Dict[str, Any]:
+    """
+    Run all the benchmarks.
+
+    Args:
+        iterations (int): Number of runs of each benchmark.
+
+    Returns:
+        Dict[str, Any]: Timings summary by action and runner.
+    """
+    interpreters = get_interpreters()
+    results = {}
+
+    with tempfile.NamedTemporaryFile(delete=False) as temp_file:
+        path = temp_file.name
+
+    try:
+        for action, (parameters, one_liners) in BENCHMARKS.items():
+            parameters = {key: value.format(path=path, service=SERVICE_NAME) for key, value in parameters.items()}
+            results[action] = {
+                "native": summarize(await bench_native(action, parameters, iterations))
+            }
+            for interpreter, executable in interpreters.items():
+                script = one_liners[interpreter].format(path=path, service=SERVICE_NAME)
+                results[action][interpreter] = summarize(bench_shell(executable, script, iterations))
+    finally:
+        os.remove(path)
+
+    return results
+
+
+def main() -> None:
+    """
+    Entry point of the benchmark.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark native actions against shell one-liners.")
+    parser.add_argument("--iterations", type=int, default=20, help="Number of runs per benchmark.")
+    parser.add_argument("--output", help="Path of the JSON file to save the results to.")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmarks(args.iterations))
+
+    print(f"{'action':<20}{'runner':<12}{'median ms':>12}{'mean ms':>12}")
+    for action, runners in results.items():
+        for runner, summary in runners.items():
+            print(f"{action:<20}{runner:<12}{summary['median_ms']:>12.3f}{summary['mean_ms']:>12.3f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@
 
 from typing import Dict, Any, List
 
+import contextvars
 import json
 import logging
 import os
@@ -19,6 +20,9 @@ logging.basicConfig(
 
 os_type = platform.system().lower()
 
+# Organization the running task works for, when one agent process hosts several organizations
+logging_org_id: contextvars.ContextVar[str | None] = contextvars.ContextVar("logging_org_id", default=None)
+
 
 def get_executable_folder(org_id: str) -> str:
     """
@@ -190,6 +194,22 @@ def get_config_file_path(org_id: str) -> str:
     return config_file_path
 
 
+def get_data_directory(org_id: str, name: str) -> str:
+    """
+    Get a directory to keep agent state in, next to the config file.
+
+    Args:
+        org_id (str): Organization identifier in Rewst platform.
+        name (str): Name of the directory.
+
+    Returns:
+        str: Data directory path.
+    """
+    data_dir = os.path.join(os.path.dirname(get_config_file_path(org_id)), name)
+    os.makedirs(data_dir, exist_ok=True)
+    return data_dir
+
+
 def save_configuration(config_data: Dict[str, Any], config_file: str = None) -> None:
     """
     Save configuration of the config_data to the file path.
@@ -249,6 +269,58 @@ def get_org_id_from_executable_name(commandline_args: List[str]) -> str | bool:
     return False
 
 
+def get_hosted_org_ids(commandline_args: List[str]) -> List[str]:
+    """
+    Get the organization identifiers hosted by one agent process from the command line.
+
+    Args:
+        commandline_args (List[str]): Command line arguments used to run the executable, with one
+            --org-id option per hosted organization.
+
+    Returns:
+        List[str]: Organization identifiers in the order given, without duplicates.
+    """
+    org_ids = []
+    for index, arg in enumerate(commandline_args[1:], start=1):
+        if arg == "--org-id" and index + 1 < len(commandline_args):
+            org_id = commandline_args[index + 1]
+        elif arg.startswith("--org-id="):
+            org_id = arg[len("--org-id="):]
+        else:
+            continue
+        if org_id and org_id not in org_ids:
+            org_ids.append(org_id)
+    return org_ids
+
+
+class OrgLogFilter(logging.Filter):
+    """
+    Keeps the records logged for other organizations hosted by the same process out of a log file.
+    """
+
+    def __init__(self, org_id: str = None) -> None:
+        """Constructs a new organization log filter instance.
+
+        Args:
+            org_id (str, optional): Organization identifier of the log file. Defaults to None.
+        """
+        super().__init__()
+        self.org_id = org_id
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """
+        Check whether a record belongs in the log file of the organization.
+
+        Args:
+            record (logging.LogRecord): Log record.
+
+        Returns:
+            bool: True if the record was logged for the organization or for the whole process.
+        """
+        org_id = logging_org_id.get()
+        return org_id is None or org_id == self.org_id
+
+
 def setup_file_logging(org_id: str = None) -> bool:
     """
     Setup the logging system for the organization.
@@ -270,6 +342,7 @@ def setup_file_logging(org_id: str = None) -> bool:
             datefmt="%Y-%m-%d %H:%M:%S"
         ))
         file_handler.setLevel(logging.INFO)
+        file_handler.addFilter(OrgLogFilter(org_id))
 
         logging.getLogger().addHandler(file_handler)
         logging.info("File Logging initialized.")
@@ -0,0 +1,194 @@
+""" Module for defining class and functions to limit the jobs accepted by the agent. """
+
+from typing import AsyncIterator, Awaitable, Callable, Dict
+
+import asyncio
+import contextlib
+import math
+import os
+import threading
+import time
+
+DEFAULT_MAX_PENDING_JOBS = 16
+DEFAULT_MAX_RUNNING_JOBS = min(4, os.cpu_count() or 1)
+DEFAULT_RETRY_AFTER = 5
+MAX_RETRY_AFTER = 300
+
+# Weight of the latest job duration in the moving average
+DURATION_SMOOTHING = 0.2
+
+
+class AdmissionController:
+    """
+    Limits the number of queued plus running jobs of the agent.
+    """
+
+    def __init__(self,
+                 max_pending_jobs: int = DEFAULT_MAX_PENDING_JOBS,
+                 max_running_jobs: int = DEFAULT_MAX_RUNNING_JOBS,
+                 min_retry_after: int = DEFAULT_RETRY_AFTER) -> None:
+        """Constructs a new admission controller instance.
+
+        Args:
+            max_pending_jobs (int, optional): Maximum number of queued plus running jobs.
+                Defaults to DEFAULT_MAX_PENDING_JOBS.
+            max_running_jobs (int, optional): Maximum number of jobs running at the same time.
+                Defaults to DEFAULT_MAX_RUNNING_JOBS.
+            min_retry_after (int, optional): Minimum seconds to wait suggested to busy callers.
+                Defaults to DEFAULT_RETRY_AFTER.
+        """
+        self.max_pending_jobs = max(1, max_pending_jobs)
+        self.max_running_jobs = max(1, max_running_jobs)
+        self.min_retry_after = min_retry_after
+
+        self.__lock = threading.Lock()
+        self.__pending_jobs = 0
+        self.__running_jobs = 0
+        self.__average_duration = None
+        self.__condition = None
+        self.__condition_loop = None
+
+    def configure(self, max_pending_jobs: int = None, max_running_jobs: int = None,
+                  min_retry_after: int = None) -> None:
+        """
+        Change the limits of the controller. Accepted and running jobs keep being counted.
+
+        Args:
+            max_pending_jobs (int, optional): Maximum number of queued plus running jobs. Defaults to unchanged.
+            max_running_jobs (int, optional): Maximum number of jobs running at the same time. Defaults to unchanged.
+            min_retry_after (int, optional): Minimum seconds to wait suggested to busy callers. Defaults to unchanged.
+        """
+        if max_pending_jobs is not None:
+            self.max_pending_jobs = max(1, max_pending_jobs)
+        if max_running_jobs is not None:
+            self.max_running_jobs = max(1, max_running_jobs)
+        if min_retry_after is not None:
+            self.min_retry_after = min_retry_after
+
+    @property
+    def pending_jobs(self) -> int:
+        """
+        Number of queued plus running jobs.
+
+        Returns:
+            int: Number of jobs.
+        """
+        return self.__pending_jobs
+
+    @property
+    def running_jobs(self) -> int:
+        """
+        Number of running jobs.
+
+        Returns:
+            int: Number of jobs.
+        """
+        return self.__running_jobs
+
+    def try_admit(self) -> bool:
+        """
+        Try to accept a new job.
+
+        Returns:
+            bool: True if the job is accepted and must be released later, otherwise False.
+        """
+        with self.__lock:
+            if self.__pending_jobs >= self.max_pending_jobs:
+                return False
+            self.__pending_jobs += 1
+            return True
+
+    def release(self, duration: float = None) -> None:
+        """
+        Release an accepted job.
+
+        Args:
+            duration (float, optional): Running time of the job in seconds. Defaults to None.
+        """
+        with self.__lock:
+            self.__pending_jobs = max(0, self.__pending_jobs - 1)
+            if duration is not None:
+                if self.__average_duration is None:
+                    self.__average_duration = duration
+                else:
+                    self.__average_duration += DURATION_SMOOTHING * \
+                        (duration - self.__average_duration)
+
+    def retry_after(self) -> int:
+        """
+        Estimate the number of seconds until the agent can accept new jobs.
+
+        Returns:
+            int: Seconds to wait before retrying.
+        """
+        if self.__average_duration is None:
+            return self.min_retry_after
+
+        batches = math.ceil(self.__pending_jobs / self.max_running_jobs)
+        estimate = math.ceil(self.__average_duration * max(1, batches))
+        return min(MAX_RETRY_AFTER, max(self.min_retry_after, estimate))
+
+    @contextlib.asynccontextmanager
+    async def execution_slot(self) -> AsyncIterator[Callable[[], Awaitable[None]]]:
+        """
+        Wait for a running slot for an accepted job and release the job when done.
+
+        Jobs mostly waiting on external events can leave their running slot early, they stay
+        accepted until done.
+
+        Yields:
+            Callable[[], Awaitable[None]]: Coroutine function leaving the running slot early.
+        """
+        # The controller outlives connections, a condition is only usable on the loop it was made on
+        loop = asyncio.get_running_loop()
+        if self.__condition is None or self.__condition_loop is not loop:
+            self.__condition = asyncio.Condition()
+            self.__condition_loop = loop
+
+        condition = self.__condition
+        try:
+            async with condition:
+                await condition.wait_for(lambda: self.__running_jobs < self.max_running_jobs)
+                self.__running_jobs += 1
+        except BaseException:
+            self.release()
+            raise
+
+        start = time.monotonic()
+        duration = None
+
+        async def leave_slot() -> None:
+            nonlocal duration
+            if duration is not None:
+                return
+            duration = time.monotonic() - start
+            async with condition:
+                self.__running_jobs -= 1
+                condition.notify_all()
+
+        try:
+            yield leave_slot
+        finally:
+            await leave_slot()
+            self.release(duration)
+
+# Admission controller of each organization hosted by the agent process, so reconnects keep counting
+# in-flight jobs while the limits of an organization never apply to another one
+admission_controllers: Dict[str | None, AdmissionController] = {}
+admission_controllers_lock = threading.Lock()
+
+
+def get_admission_controller(org_id: str = None) -> AdmissionController:
+    """
+    Get the admission controller of an organization.
+
+    Args:
+        org_id (str, optional): Organization identifier in the Rewst platform. Defaults to None.
+
+    Returns:
+        AdmissionController: Admission controller of the organization.
+    """
+    with admission_controllers_lock:
+        if org_id not in admission_controllers:
+            admission_controllers[org_id] = AdmissionController()
+        return admission_controllers[org_id]
@@ -0,0 +1,206 @@
+""" Module for defining class and functions to report only changed job outputs. """
+
+from typing import Dict, Any, Tuple
+
+import difflib
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+# Largest output kept in memory per job key to build text diffs against
+MAX_DIFF_BASE_SIZE = 1024 * 1024
+
+# Limits of the previous results kept in memory, evicting the least recently used job keys
+DEFAULT_MAX_JOBS = 1024
+DEFAULT_MAX_DIFF_BASE_TOTAL = 32 * 1024 * 1024
+
+
+def compute_output_digest(output_message_data: Dict[str, Any]) -> str:
+    """
+    Compute a stable digest of the output and error of a job result.
+
+    Args:
+        output_message_data (Dict[str, Any]): Result of the job execution.
+
+    Returns:
+        str: Hexadecimal SHA-256 digest of the result.
+    """
+    payload = json.dumps(
+        {
+            "output": output_message_data.get("output"),
+            "error": output_message_data.get("error"),
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ChangeReporter:
+    """
+    Keeps the digest of the last reported output of recurring jobs to report only changes.
+    """
+
+    def __init__(self, max_diff_base_size: int = MAX_DIFF_BASE_SIZE, max_jobs: int = DEFAULT_MAX_JOBS,
+                 max_diff_base_total: int = DEFAULT_MAX_DIFF_BASE_TOTAL) -> None:
+        """Constructs a new change reporter instance.
+
+        Args:
+            max_diff_base_size (int, optional): Largest text output kept to compute diffs against.
+                Defaults to MAX_DIFF_BASE_SIZE.
+            max_jobs (int, optional): Maximum number of job keys tracked. Defaults to DEFAULT_MAX_JOBS.
+            max_diff_base_total (int, optional): Maximum total size of the text outputs kept.
+                Defaults to DEFAULT_MAX_DIFF_BASE_TOTAL.
+        """
+        self.max_diff_base_size = max_diff_base_size
+        self.max_jobs = max_jobs
+        self.max_diff_base_total = max_diff_base_total
+
+        self.__lock = threading.Lock()
+        self.__previous: OrderedDict[str, Tuple[str, str, str | None]] = OrderedDict()
+        self.__diff_base_total = 0
+
+    def build_report(
+        self,
+        job_key: str,
+        output_message_data: Dict[str, Any],
+        include_diff: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Build the message to post for a job result, given the last reported result of the same job key.
+
+        The result is not remembered until it is recorded once delivered.
+
+        Args:
+            job_key (str): Key identifying the recurring job.
+            output_message_data (Dict[str, Any]): Result of the job execution.
+            include_diff (bool, optional): Send a unified diff for changed text outputs. Defaults to False.
+
+        Returns:
+            Dict[str, Any]: Message to post back to Rewst.
+        """
+        digest = compute_output_digest(output_message_data)
+
+        with self.__lock:
+            previous = self.__previous.get(job_key)
+
+        if previous and previous[0] == digest:
+            logging.info("Output of job %s unchanged since %s", job_key, previous[1])
+            return {
+                "unchanged": True,
+                "unchanged_since": previous[1],
+                "digest": digest,
+            }
+
+        report = dict(output_message_data)
+        report["unchanged"] = False
+        report["digest"] = digest
+
+        text = self.__get_diff_base(output_message_data)
+        if include_diff and previous and previous[2] is not None and text is not None:
+            diff = "".join(
+                difflib.unified_diff(
+                    previous[2].splitlines(keepends=True),
+                    text.splitlines(keepends=True),
+                    fromfile=previous[0],
+                    tofile=digest,
+                )
+            )
+
+            # Only send the diff if it is actually smaller than the full output
+            if len(diff) < len(text):
+                report.pop("output", None)
+                report["diff"] = diff
+                report["base_digest"] = previous[0]
+
+        return report
+
+    def record(self, job_key: str, output_message_data: Dict[str, Any], digest: str = None) -> None:
+        """
+        Remember the result of a job once it was delivered to Rewst.
+
+        Args:
+            job_key (str): Key identifying the recurring job.
+            output_message_data (Dict[str, Any]): Result of the job execution.
+            digest (str, optional): Digest of the result. Defaults to computing it.
+        """
+        digest = digest or compute_output_digest(output_message_data)
+        text = self.__get_diff_base(output_message_data)
+
+        with self.__lock:
+            previous = self.__previous.pop(job_key, None)
+            if previous:
+                self.__diff_base_total -= len(previous[2] or "")
+
+            if previous and previous[0] == digest:
+                entry = previous
+            else:
+                entry = (digest, datetime.now(timezone.utc).isoformat(), text)
+            self.__previous[job_key] = entry
+            self.__diff_base_total += len(entry[2] or "")
+
+            while self.__previous and (len(self.__previous) > self.max_jobs or
+                                       self.__diff_base_total > self.max_diff_base_total):
+                _, evicted = self.__previous.popitem(last=False)
+                self.__diff_base_total -= len(evicted[2] or "")
+
+    def forget(self, job_key: str) -> None:
+        """
+        Forget the previous result of a job so the next one is fully reported.
+
+        Args:
+            job_key (str): Key identifying the recurring job.
+        """
+        with self.__lock:
+            previous = self.__previous.pop(job_key, None)
+            if previous:
+                self.__diff_base_total -= len(previous[2] or "")
+
+    def __len__(self) -> int:
+        """
+        Number of job keys tracked.
+
+        Returns:
+            int: Number of job keys.
+        """
+        return len(self.__previous)
+
+    def __get_diff_base(self, output_message_data: Dict[str, Any]) -> str | None:
+        """
+        Get the text output kept to compute diffs against.
+
+        Args:
+            output_message_data (Dict[str, Any]): Result of the job execution.
+
+        Returns:
+            str | None: Text output, or None if not a string or too large.
+        """
+        output = output_message_data.get("output")
+        if isinstance(output, str) and len(output) <= self.max_diff_base_size:
+            return output
+        return None
+
+
+# Change reporter of each organization hosted by the agent process, so reconnects keep the reported digests
+# while the outputs of an organization never evict those of another one
+change_reporters: Dict[str | None, ChangeReporter] = {}
+change_reporters_lock = threading.Lock()
+
+
+def get_change_reporter(org_id: str = None) -> ChangeReporter:
+    """
+    Get the change reporter of an organization.
+
+    Args:
+        org_id (str, optional): Organization identifier in the Rewst platform. Defaults to None.
+
+    Returns:
+        ChangeReporter: Change reporter of the organization.
+    """
+    with change_reporters_lock:
+        if org_id not in change_reporters:
+            change_reporters[org_id] = ChangeReporter()
+        return change_reporters[org_id]
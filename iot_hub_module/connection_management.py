@@ -1,9 +1,11 @@
 """ Module for defining class and functions to manage connections. """
 
-from typing import Dict, Any
+from typing import Awaitable, Callable, Dict, Any, List, Set
 
 import asyncio
 import base64
+import hashlib
+import itertools
 import json
 import os
 import subprocess
@@ -11,28 +13,98 @@ import logging
 import platform
 import signal
 import tempfile
+import time
 import httpx
 
+from azure.iot.device import MethodRequest, MethodResponse
 from azure.iot.device.aio import IoTHubDeviceClient
 from azure.iot.device.iothub.models import Message
-from azure.iot.device.exceptions import ConnectionFailedError, ConnectionDroppedError
+from azure.iot.device.exceptions import ConnectionFailedError, ConnectionDroppedError, CredentialError
 
 from platformdirs import (
     site_config_dir
 )
 from config_module.config_io import (
+    load_configuration,
     get_config_file_path,
     get_agent_executable_path,
+    get_data_directory,
     get_service_executable_path,
-    get_service_manager_path
+    get_service_manager_path,
+    logging_org_id
 )
 from config_module.host_info import build_host_tags
+from __version__ import __version__
+from actions_module.action_registry import ActionContext, run_action
+from actions_module.process_pool import encode_json, get_process_pool
+from iot_hub_module.admission_control import (
+    DEFAULT_MAX_PENDING_JOBS,
+    DEFAULT_MAX_RUNNING_JOBS,
+    DEFAULT_RETRY_AFTER,
+    get_admission_controller
+)
+from iot_hub_module.change_reporting import get_change_reporter
+from iot_hub_module.execution_journal import (
+    DEFAULT_RETENTION_DAYS,
+    JOURNAL_DIRECTORY,
+    JOURNAL_FILE,
+    ExecutionJournal,
+    get_result_size,
+    get_script_hash,
+)
+from iot_hub_module.heartbeat import (
+    DEFAULT_FULL_SNAPSHOT_INTERVAL,
+    DEFAULT_MAX_INTERVAL,
+    DEFAULT_MIN_INTERVAL,
+    Heartbeat,
+)
+from iot_hub_module.live_settings import (
+    DEFAULT_POST_TIMEOUT,
+    DESIRED_SETTINGS_KEY,
+    parse_settings,
+)
+from iot_hub_module.offline_buffer import (
+    DEFAULT_MAX_SEGMENTS,
+    DEFAULT_SEGMENT_SIZE,
+    OFFLINE_BUFFER_DIRECTORY,
+    OfflineBuffer,
+)
+from iot_hub_module.reconnect_policy import ReconnectPolicy
+from iot_hub_module.reported_properties import DEFAULT_DEBOUNCE_INTERVAL, ReportedPropertiesWriter
+from iot_hub_module.result_cache import (
+    CACHE_DIRECTORY,
+    DEFAULT_MAX_DISK_ENTRIES,
+    DEFAULT_MAX_ENTRIES,
+    DEFAULT_TTL,
+    ResultCache,
+    get_cache_key,
+)
+from iot_hub_module.telemetry import (
+    DEFAULT_DRAIN_INTERVAL,
+    DEFAULT_FLUSH_INTERVAL,
+    DEFAULT_MAX_BATCH_SIZE,
+    TelemetryChannel,
+)
+from iot_hub_module.transport_state import (
+    DEFAULT_RACE_HEAD_START,
+    DEFAULT_REPROBE_INTERVAL,
+    MQTT,
+    STATE_DIRECTORY,
+    TRANSPORT_STATE_FILE,
+    WEBSOCKETS,
+    TransportState,
+)
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 
 os_type = platform.system().lower()
 
+# Outputs of native actions with more items than this are JSON encoded in the shared process pool.
+# Pickling nested outputs to a worker costs about half of encoding them on the event loop, while
+# plain strings are cheaper to encode in place than to send back and forth.
+LARGE_RESULT_ITEMS = 10000
+
 
 class ConnectionManager:
     """
@@ -51,7 +123,78 @@ class ConnectionManager:
         self.os_type = platform.system().lower()
 
         self.__connection_retry = connection_retry
+        self.__websockets = False
+        self.__transport_state = None
         self.client = self.__make_client()
+        # Organizations hosted by the same process only share the process pool
+        self.change_reporter = get_change_reporter(config_data.get("rewst_org_id"))
+        self.admission_controller = get_admission_controller(config_data.get("rewst_org_id"))
+        self.admission_controller.configure(
+            config_data.get("max_pending_jobs", DEFAULT_MAX_PENDING_JOBS),
+            config_data.get("max_running_jobs", DEFAULT_MAX_RUNNING_JOBS),
+            config_data.get("busy_retry_after", DEFAULT_RETRY_AFTER)
+        )
+        self.result_cache = ResultCache(
+            config_data.get("result_cache_max_entries", DEFAULT_MAX_ENTRIES),
+            config_data.get("result_cache_max_disk_entries", DEFAULT_MAX_DISK_ENTRIES)
+        )
+        self.reported_properties = ReportedPropertiesWriter(
+            self.patch_reported_properties,
+            config_data.get("reported_properties_debounce", DEFAULT_DEBOUNCE_INTERVAL)
+        )
+        self.telemetry = TelemetryChannel(
+            self.send_telemetry_batch,
+            config_data.get("telemetry_max_batch_size", DEFAULT_MAX_BATCH_SIZE),
+            config_data.get("telemetry_flush_interval", DEFAULT_FLUSH_INTERVAL),
+            config_data.get("telemetry_compression", False),
+            offline_buffer=self.__open_offline_buffer(),
+            drain_interval=config_data.get("offline_drain_interval", DEFAULT_DRAIN_INTERVAL)
+        )
+        self.heartbeat = Heartbeat(
+            self.telemetry.enqueue,
+            min_interval=config_data.get("heartbeat_min_interval", DEFAULT_MIN_INTERVAL),
+            max_interval=config_data.get("heartbeat_max_interval", DEFAULT_MAX_INTERVAL),
+            full_snapshot_interval=config_data.get("heartbeat_full_snapshot_interval",
+                                                   DEFAULT_FULL_SNAPSHOT_INTERVAL)
+        )
+        self.__execution_journal = None
+        self.__cache_in_flight: Dict[str, asyncio.Future] = {}
+        self.__loop = None
+        self.__connection_changed = asyncio.Event()
+        self.__handle_messages = False
+        self.__handle_desired_properties = False
+        self.__handle_methods = False
+        self.__settings_version = None
+        self.__live_settings: Dict[str, Any] = {}
+        self.__method_tasks: Set[asyncio.Task] = set()
+        self.direct_methods: Dict[str, Callable[[Any], Awaitable[Any]]] = {
+            "ping": self.ping,
+            "get_installation": self.get_installation_method,
+            "agent_status": self.get_agent_status,
+        }
+        if config_data.get("process_pool_workers"):
+            get_process_pool().resize(config_data["process_pool_workers"])
+
+    def __open_offline_buffer(self) -> OfflineBuffer | None:
+        """
+        Open the buffer of the telemetry sent while offline, kept in the data directory of the organization.
+
+        Returns:
+            OfflineBuffer | None: Offline buffer, or None if disabled or unavailable.
+        """
+        org_id = self.config_data.get("rewst_org_id")
+        if not org_id or not self.config_data.get("offline_buffer", True):
+            return None
+
+        try:
+            return OfflineBuffer(
+                get_data_directory(org_id, OFFLINE_BUFFER_DIRECTORY),
+                self.config_data.get("offline_buffer_segment_size", DEFAULT_SEGMENT_SIZE),
+                self.config_data.get("offline_buffer_max_segments", DEFAULT_MAX_SEGMENTS)
+            )
+        except OSError as e:
+            logging.warning("Offline buffer is not available: %s", e)
+            return None
 
     def __make_client(self, websockets: bool = False) -> IoTHubDeviceClient:
         """
@@ -69,6 +212,36 @@ class ConnectionManager:
             connection_retry=self.__connection_retry
         )
 
+    def __attach_handlers(self) -> None:
+        """
+        Attach the event handlers set so far to the current client.
+        """
+        if self.__handle_messages:
+            self.client.on_message_received = self.handle_message
+        if self.__loop is not None:
+            self.client.on_connection_state_change = self.handle_connection_state_change
+        if self.__handle_desired_properties:
+            self.client.on_twin_desired_properties_patch_received = self.handle_desired_properties_patch
+        if self.__handle_methods:
+            self.client.on_method_request_received = self.handle_method_request
+
+    async def replace_client(self, websockets: bool = False) -> None:
+        """
+        Replace the client with a new one keeping the event handlers, and shut down the old one.
+
+        Args:
+            websockets (bool, optional): Use webosocket connection to IoTHub. Defaults to False.
+        """
+        old_client = self.client
+        self.client = self.__make_client(websockets)
+        self.__websockets = websockets
+        self.__attach_handlers()
+
+        try:
+            await old_client.shutdown()
+        except Exception as e:
+            logging.warning("Failed to shut down the previous IoT Hub client: %s", e)
+
     def get_connection_string(self) -> str:
         """
         Get the connection string used to connect to the IoT Hub.
@@ -89,32 +262,174 @@ class ConnectionManager:
         """
         try:
             logging.info("Connecting over websockets...")
-            self.client = self.__make_client(True)
+            await self.replace_client(True)
             await self.client.connect()
         except Exception as e:
             logging.exception("Exception in connection to the IoT Hub: %s", e)
 
+    def get_transport_state(self) -> TransportState:
+        """
+        Get the transport that last connected, kept in the data directory of the organization.
+
+        Returns:
+            TransportState: Transport state, in memory only if the data directory is unavailable.
+        """
+        if self.__transport_state is None:
+            state_file = None
+            org_id = self.config_data.get("rewst_org_id")
+            if org_id:
+                try:
+                    state_file = os.path.join(get_data_directory(org_id, STATE_DIRECTORY), TRANSPORT_STATE_FILE)
+                except OSError as e:
+                    logging.warning("Keeping transport state in memory only: %s", e)
+            self.__transport_state = TransportState(
+                state_file,
+                self.config_data.get("transport_reprobe_interval", DEFAULT_REPROBE_INTERVAL)
+            )
+        return self.__transport_state
+
     async def connect(self) -> None:
         """
-        Connect the agent service to the IoT Hub.
+        Connect the agent service to the IoT Hub, trying the transport that last connected first.
+
+        Raises:
+            CredentialError: If the IoT Hub rejected the credentials, so that the client gets rebuilt.
+        """
+        transport_state = self.get_transport_state()
+        if not transport_state.known and self.config_data.get("transport_race", True):
+            await self.race_transports()
+            return
+
+        for transport in transport_state.get_order():
+            websockets = transport == WEBSOCKETS
+            try:
+                if websockets != self.__websockets:
+                    logging.info("Connecting over %s...", transport)
+                    await self.replace_client(websockets)
+                await self.client.connect()
+            except (ConnectionFailedError, ConnectionDroppedError) as e:
+                logging.warning("Failed to connect over %s: %s", transport, e)
+                continue
+            except CredentialError:
+                raise
+            except Exception as e:
+                logging.exception("Exception in connection to the IoT Hub: %s", e)
+                return
+
+            transport_state.record_success(transport)
+            return
+
+    async def race_transports(self) -> None:
         """
+        Connect over MQTT and, after a short head start, over websockets in parallel. The first client that
+        connects is kept, the other attempt is cancelled and its client shut down.
+
+        Raises:
+            CredentialError: If no attempt connected and the IoT Hub rejected the credentials.
+        """
+        head_start = self.config_data.get("transport_race_head_start", DEFAULT_RACE_HEAD_START)
+        if self.__websockets:
+            await self.replace_client(False)
+
+        clients = {MQTT: self.client}
+        mqtt_attempt = asyncio.create_task(self.client.connect())
+        attempts = {mqtt_attempt: MQTT}
+        winner = None
+        credential_error = None
+        pending = set(attempts)
         try:
-            await self.client.connect()
-        except (ConnectionFailedError, ConnectionDroppedError):
-            await self.connect_using_websockets()
-        except Exception as e:
-            logging.exception("Exception in connection to the IoT Hub: %s", e)
+            await asyncio.wait(attempts, timeout=head_start)
+            if not mqtt_attempt.done() or mqtt_attempt.exception() is not None:
+                logging.info("Racing MQTT and websockets connections...")
+                clients[WEBSOCKETS] = self.__make_client(True)
+                attempts[asyncio.create_task(clients[WEBSOCKETS].connect())] = WEBSOCKETS
+                pending = set(attempts)
+
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for attempt in done:
+                    transport = attempts[attempt]
+                    if attempt.exception() is None:
+                        winner = transport
+                        break
+                    logging.warning("Failed to connect over %s: %s", transport, attempt.exception())
+                    if isinstance(attempt.exception(), CredentialError):
+                        credential_error = attempt.exception()
+        finally:
+            for attempt in pending:
+                attempt.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        # Keep the MQTT client when both attempts failed, the next connection tries both transports again
+        kept = winner or MQTT
+        self.client = clients[kept]
+        self.__websockets = kept == WEBSOCKETS
+        self.__attach_handlers()
+
+        for transport, client in clients.items():
+            if transport != kept:
+                try:
+                    await client.shutdown()
+                except Exception as e:
+                    logging.warning("Failed to shut down the %s IoT Hub client: %s", transport, e)
+
+        if winner is not None:
+            logging.info("Connected over %s", winner)
+            self.get_transport_state().record_success(winner)
+        elif credential_error is not None:
+            raise credential_error
+
+    async def reconnect(self, config_data: Dict[str, Any] = None, rebuild: bool = False) -> None:
+        """
+        Reconnect the agent service to the IoT Hub reusing the client and its handlers. The client is
+        only rebuilt when the credentials changed or when asked to.
+
+        Args:
+            config_data (Dict[str, Any], optional): Reloaded configuration data. Defaults to the current one.
+            rebuild (bool, optional): Rebuild the client, e.g. after an authentication failure. Defaults to False.
+        """
+        if config_data is not None:
+            # Settings applied live take precedence over the configuration file
+            self.config_data = {**config_data, **self.__live_settings}
+
+        connection_string = self.get_connection_string()
+        if connection_string != self.connection_string:
+            logging.info("IoT Hub credentials changed, rebuilding the client...")
+            self.connection_string = connection_string
+            rebuild = True
+
+        if rebuild:
+            await self.replace_client(self.__websockets)
+
+        await self.connect()
 
     async def disconnect(self) -> None:
         """
         Disconnect the agent service from the IoT Hub.
         """
+        await self.heartbeat.close()
+        await self.reported_properties.close()
+        await self.telemetry.close()
+
         try:
             await self.client.disconnect()
         except Exception as e:
             logging.exception(
                 "Exception in disconnecting from the IoT Hub: %s", e)
 
+        if self.__execution_journal is not None:
+            await asyncio.to_thread(self.__execution_journal.flush)
+
+    async def patch_reported_properties(self, patch: Dict[str, Any]) -> None:
+        """
+        Write a patch of the reported properties of the device twin. Use reported_properties.update() to
+        coalesce patches instead.
+
+        Args:
+            patch (Dict[str, Any]): Reported properties patch.
+        """
+        await self.client.patch_twin_reported_properties(patch)
+
     async def send_message(self, message_data: Dict[str, Any]) -> None:
         """
         Send a message to the IoT Hub.
@@ -125,13 +440,275 @@ class ConnectionManager:
         message_json = json.dumps(message_data)
         await self.client.send_message(message_json)
 
+    async def send_telemetry_batch(self, message: Message) -> None:
+        """
+        Send a batch of telemetry records to the IoT Hub. Use telemetry.enqueue() to send telemetry instead.
+
+        Args:
+            message (Message): Batch message.
+        """
+        await self.client.send_message(message)
+
     async def set_message_handler(self) -> None:
         """
         Sets the event handler for income messages from the Iot Hub.
         """
-        self.client.on_message_received = self.handle_message
+        self.__handle_messages = True
+        self.__attach_handlers()
+
+    async def set_connection_state_handler(self) -> None:
+        """
+        Sets the event handler for connection state changes of the IoT Hub client.
+        """
+        self.__loop = asyncio.get_running_loop()
+        self.__attach_handlers()
 
-    async def execute_commands(self, commands: bytes, post_url: str = None, interpreter_override: str = None) -> Dict[str, str]:
+    def handle_connection_state_change(self) -> None:
+        """
+        Handle connection state change events of the IoT Hub client. Called from a thread of the SDK.
+        """
+        logging.info("IoT Hub connection state changed, connected: %s", self.client.connected)
+        if self.__loop is None:
+            return
+        try:
+            self.__loop.call_soon_threadsafe(self.__connection_changed.set)
+        except RuntimeError:
+            # The event loop is already closed
+            pass
+
+    async def set_desired_properties_handler(self) -> None:
+        """
+        Sets the event handler for desired properties patches of the device twin.
+        """
+        self.__loop = asyncio.get_running_loop()
+        self.__handle_desired_properties = True
+        self.__attach_handlers()
+
+    def handle_desired_properties_patch(self, patch: Dict[str, Any]) -> None:
+        """
+        Handle desired properties patches of the device twin. Called from a thread of the SDK.
+
+        Args:
+            patch (Dict[str, Any]): Desired properties patch.
+        """
+        if self.__loop is None:
+            return
+        try:
+            self.__loop.call_soon_threadsafe(self.apply_desired_properties, patch)
+        except RuntimeError:
+            # The event loop is already closed
+            pass
+
+    async def sync_desired_properties(self) -> None:
+        """
+        Apply the desired properties of the device twin, which may have changed while disconnected.
+        """
+        try:
+            twin = await self.client.get_twin()
+        except Exception as e:
+            logging.warning("Failed to get the device twin: %s", e)
+            return
+
+        if isinstance(twin, dict) and isinstance(twin.get("desired"), dict):
+            self.apply_desired_properties(twin["desired"])
+
+    def apply_desired_properties(self, desired: Dict[str, Any]) -> None:
+        """
+        Apply the agent settings of the desired properties and report the applied version.
+
+        Args:
+            desired (Dict[str, Any]): Desired properties or desired properties patch.
+        """
+        settings = desired.get(DESIRED_SETTINGS_KEY)
+        version = desired.get("$version")
+        if not isinstance(settings, dict) or (version is not None and version == self.__settings_version):
+            return
+
+        rejected = self.apply_settings(settings)
+        self.__settings_version = version
+        self.reported_properties.update({
+            DESIRED_SETTINGS_KEY: {
+                "applied_version": version,
+                "rejected": sorted(f"{name}: {reason}" for name, reason in rejected.items()),
+            }
+        })
+
+    def apply_settings(self, settings: Dict[str, Any]) -> Dict[str, str]:
+        """
+        Apply agent settings without reconnecting.
+
+        Args:
+            settings (Dict[str, Any]): Settings by name.
+
+        Returns:
+            Dict[str, str]: Reason each rejected setting was not applied.
+        """
+        valid, rejected = parse_settings(settings)
+        for name, reason in rejected.items():
+            logging.warning("Ignoring setting %s: %s", name, reason)
+        if not valid:
+            return rejected
+
+        logging.info("Applying settings: %s", valid)
+        self.__live_settings.update(valid)
+        self.config_data = {**self.config_data, **valid}
+
+        self.admission_controller.configure(
+            valid.get("max_pending_jobs"), valid.get("max_running_jobs"), valid.get("busy_retry_after")
+        )
+        self.result_cache.resize(valid.get("result_cache_max_entries"), valid.get("result_cache_max_disk_entries"))
+        if "log_level" in valid:
+            logging.getLogger().setLevel(valid["log_level"])
+        if "heartbeat_min_interval" in valid or "heartbeat_max_interval" in valid:
+            self.heartbeat.min_interval = self.config_data.get("heartbeat_min_interval", self.heartbeat.min_interval)
+            self.heartbeat.max_interval = max(self.heartbeat.min_interval,
+                                              self.config_data.get("heartbeat_max_interval", self.heartbeat.max_interval))
+            self.heartbeat.interval = min(self.heartbeat.max_interval,
+                                          max(self.heartbeat.min_interval, self.heartbeat.interval))
+        if "process_pool_workers" in valid:
+            get_process_pool().resize(valid["process_pool_workers"])
+
+        return rejected
+
+    def register_direct_method(self, name: str, handler: Callable[[Any], Awaitable[Any]]) -> None:
+        """
+        Register the handler of a direct method. Handlers answer quick queries, long-running work stays on
+        cloud to device messages.
+
+        Args:
+            name (str): Method name.
+            handler (Callable[[Any], Awaitable[Any]]): Coroutine function called with the payload of the
+                request, returning the JSON serializable payload of the response.
+        """
+        self.direct_methods[name] = handler
+
+    async def set_method_handler(self) -> None:
+        """
+        Sets the event handler for direct method requests.
+        """
+        self.__loop = asyncio.get_running_loop()
+        self.__handle_methods = True
+        self.__attach_handlers()
+
+    def handle_method_request(self, method_request: MethodRequest) -> None:
+        """
+        Handle direct method requests. Called from a thread of the SDK.
+
+        Args:
+            method_request (MethodRequest): Method request from the IoT Hub.
+        """
+        if self.__loop is None:
+            return
+
+        def start() -> None:
+            task = asyncio.create_task(self.answer_method_request(method_request))
+            self.__method_tasks.add(task)
+            task.add_done_callback(self.__method_tasks.discard)
+
+        try:
+            self.__loop.call_soon_threadsafe(start)
+        except RuntimeError:
+            # The event loop is already closed
+            pass
+
+    async def answer_method_request(self, method_request: MethodRequest) -> None:
+        """
+        Run the handler of a direct method and send its response.
+
+        Args:
+            method_request (MethodRequest): Method request from the IoT Hub.
+        """
+        handler = self.direct_methods.get(method_request.name)
+        if handler is None:
+            logging.warning("Received unknown direct method %s", method_request.name)
+            status, payload = 404, {"error": f"Unknown method {method_request.name}"}
+        else:
+            logging.info("Received direct method %s", method_request.name)
+            try:
+                status, payload = 200, await handler(method_request.payload)
+            except Exception as e:
+                logging.exception("Exception in direct method %s: %s", method_request.name, e)
+                status, payload = 500, {"error": str(e)}
+
+        try:
+            await self.client.send_method_response(
+                MethodResponse.create_from_method_request(method_request, status, payload)
+            )
+        except Exception as e:
+            logging.warning("Failed to answer direct method %s: %s", method_request.name, e)
+
+    async def ping(self, payload: Any) -> Dict[str, Any]:
+        """
+        Direct method checking that the agent answers.
+
+        Args:
+            payload (Any): Request payload, returned as is.
+
+        Returns:
+            Dict[str, Any]: Request payload and agent time.
+        """
+        return {"pong": payload, "timestamp": time.time()}
+
+    async def get_installation_method(self, payload: Any) -> Dict[str, Any]:
+        """
+        Direct method returning the installation data of the service.
+
+        Args:
+            payload (Any): Request payload, unused.
+
+        Returns:
+            Dict[str, Any]: Installation data.
+        """
+        return await asyncio.to_thread(self.get_installation_info)
+
+    async def get_agent_status(self, payload: Any) -> Dict[str, Any]:
+        """
+        Direct method returning the status of the agent.
+
+        Args:
+            payload (Any): Request payload, unused.
+
+        Returns:
+            Dict[str, Any]: Version, transport, jobs, telemetry and settings of the agent.
+        """
+        return {
+            "version": __version__,
+            "transport": WEBSOCKETS if self.__websockets else MQTT,
+            "pending_jobs": self.admission_controller.pending_jobs,
+            "running_jobs": self.admission_controller.running_jobs,
+            "max_pending_jobs": self.admission_controller.max_pending_jobs,
+            "max_running_jobs": self.admission_controller.max_running_jobs,
+            "cached_results": len(self.result_cache),
+            "queued_telemetry": len(self.telemetry),
+            "heartbeat_interval": self.heartbeat.interval,
+            "settings_version": self.__settings_version,
+        }
+
+    async def wait_for_disconnection(self, stop_event: asyncio.Event) -> None:
+        """
+        Wait until the client is disconnected or the stop event is set, without polling.
+
+        Args:
+            stop_event (asyncio.Event): Stop event instance.
+        """
+        while self.client.connected and not stop_event.is_set():
+            self.__connection_changed.clear()
+            # The state may have changed before the event got cleared
+            if not self.client.connected:
+                break
+
+            waiters = {
+                asyncio.create_task(stop_event.wait()),
+                asyncio.create_task(self.__connection_changed.wait()),
+            }
+            try:
+                await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for waiter in waiters:
+                    waiter.cancel()
+
+    async def execute_commands(self, commands: bytes, post_url: str = None, interpreter_override: str = None,
+                               job_key: str = None, report_diff: bool = False, post_id: str = None) -> Dict[str, str]:
         """
         Execute commands on the machine using the specified interpreter and send back result via post_url.
 
@@ -139,6 +716,9 @@ class ConnectionManager:
             commands (str): Base64 encoded list of commands.
             post_url (str, optional): Post back URL to send the stdout and stderr results of the commands after execution. Defaults to None.
             interpreter_override (str, optional): Interpreter name to use in executing the commands. Defaults to None.
+            job_key (str, optional): Key of a recurring job to only report changed outputs for. Defaults to None.
+            report_diff (bool, optional): Send a diff of changed text outputs of the recurring job. Defaults to False.
+            post_id (str, optional): Post back identifier recorded in the execution journal. Defaults to None.
 
         Returns:
             Dict[str, str]: Output message in JSON format sent to the post_url.
@@ -146,6 +726,9 @@ class ConnectionManager:
         interpreter = interpreter_override or self.get_default_interpreter()
         logging.info("Using interpreter: %s", interpreter)
         output_message_data = None
+        exit_code = None
+        started_at = time.time()
+        start = time.perf_counter()
 
         # Write commands to a temporary file
         script_suffix = ".ps1" if "powershell" in interpreter.lower() else ".sh"
@@ -196,7 +779,8 @@ class ConnectionManager:
                 shell=True,
                 text=True
             )
-            stdout, stderr = process.communicate()
+            # Wait in a worker thread so other messages can still be admitted
+            stdout, stderr = await asyncio.to_thread(process.communicate)
             exit_code = process.returncode
             logging.info("Command completed with exit code %d", exit_code)
 
@@ -245,32 +829,332 @@ class ConnectionManager:
                     logging.error("Error deleting temporary file: %s", e)
                     break  # If a different error occurs, break out of the loop
 
+        await self.record_execution(
+            "commands", started_at, time.perf_counter() - start, output_message_data, post_id=post_id,
+            script_hash=get_script_hash(commands), interpreter=interpreter, exit_code=exit_code
+        )
+
         if post_url and output_message_data:
-            logging.info("Sending Results to Rewst via httpx.")
-            async with httpx.AsyncClient() as client:
-                response = await client.post(post_url, json=output_message_data)
-            logging.info("POST request status: %d", response.status_code)
-            if response.status_code != 200:
-                if response.status_code == 400 and ("fulfilled" in response.text.lower()):
-                    logging.info("Webhook POST fulfilled by Script")
-                else:
-                    logging.error("Error response: %s", response.text)
+            await self.post_job_results(post_url, output_message_data, job_key, report_diff)
+
+        return output_message_data
+
+    async def execute_action(self, action: str, parameters: Dict[str, Any] = None, post_url: str = None,
+                             job_key: str = None, report_diff: bool = False, post_id: str = None,
+                             leave_slot: Callable[[], Awaitable[None]] = None) -> Dict[str, Any]:
+        """
+        Run a native action inside the agent process and send back the result via post_url.
+
+        Args:
+            action (str): Name of the native action.
+            parameters (Dict[str, Any], optional): Parameters of the action. Defaults to None.
+            post_url (str, optional): Post back URL to send the result of the action to. Defaults to None.
+            job_key (str, optional): Key of a recurring job to only report changed outputs for. Defaults to None.
+            report_diff (bool, optional): Send a diff of changed text outputs of the recurring job. Defaults to False.
+            post_id (str, optional): Post back identifier recorded in the execution journal. Defaults to None.
+            leave_slot (Callable[[], Awaitable[None]], optional): Coroutine function giving back the running
+                slot of the action. Defaults to None.
+
+        Returns:
+            Dict[str, Any]: Output message in JSON format sent to the post_url.
+        """
+        page_numbers = itertools.count(1)
+
+        async def send_page(page: Any) -> None:
+            await self.post_results(post_url, {
+                'output': page,
+                'error': '',
+                'partial': True,
+                'page': next(page_numbers)
+            })
+
+        context = ActionContext(self.config_data, send_page if post_url else None,
+                                execution_journal=self.get_execution_journal(), leave_slot=leave_slot)
+        started_at = time.time()
+        start = time.perf_counter()
+
+        try:
+            output = await run_action(action, parameters, context)
+            output_message_data = {
+                'output': output,
+                'error': ''
+            }
+        except Exception as e:
+            logging.error("Native action %s failed: %s", action, e)
+            output_message_data = {
+                'output': '',
+                'error': f"Action {action} failed: {e}"
+            }
+
+        await self.record_execution(
+            "action", started_at, time.perf_counter() - start, output_message_data, post_id=post_id, name=action
+        )
+
+        if post_url:
+            await self.post_job_results(post_url, output_message_data, job_key, report_diff)
 
         return output_message_data
 
+    async def post_job_results(self, post_url: str, output_message_data: Dict[str, Any],
+                               job_key: str = None, report_diff: bool = False) -> None:
+        """
+        Send the results of a job back to Rewst, only reporting changes of recurring jobs.
+
+        Args:
+            post_url (str): Post back URL to send the results to.
+            output_message_data (Dict[str, Any]): Results in JSON format.
+            job_key (str, optional): Key of a recurring job to only report changed outputs for. Defaults to None.
+            report_diff (bool, optional): Send a diff of changed text outputs of the recurring job. Defaults to False.
+        """
+        if not job_key:
+            await self.post_results(post_url, output_message_data)
+            return
+
+        report = self.change_reporter.build_report(job_key, output_message_data, report_diff)
+        if await self.post_results(post_url, report):
+            # Only remember delivered results, so a failed post is fully reported next time
+            self.change_reporter.record(job_key, output_message_data, report["digest"])
+
+    def get_execution_journal(self) -> ExecutionJournal | None:
+        """
+        Get the journal of the executed jobs, kept in the data directory of the organization.
+
+        Returns:
+            ExecutionJournal | None: Execution journal, or None if disabled or unavailable.
+        """
+        org_id = self.config_data.get("rewst_org_id")
+        if self.__execution_journal is None and org_id and self.config_data.get("execution_journal", True):
+            try:
+                journal_dir = get_data_directory(org_id, JOURNAL_DIRECTORY)
+            except OSError as e:
+                logging.warning("Execution journal is not available: %s", e)
+                return None
+            self.__execution_journal = ExecutionJournal(
+                os.path.join(journal_dir, JOURNAL_FILE),
+                self.config_data.get("journal_retention_days", DEFAULT_RETENTION_DAYS)
+            )
+        return self.__execution_journal
+
+    async def record_execution(self, kind: str, started_at: float, duration: float,
+                               output_message_data: Dict[str, Any] | None, **fields: Any) -> None:
+        """
+        Record an executed job in the execution journal.
+
+        Args:
+            kind (str): Kind of job, commands or action.
+            started_at (float): Start time as a UNIX timestamp.
+            duration (float): Duration in seconds.
+            output_message_data (Dict[str, Any] | None): Result of the job.
+            **fields (Any): Other fields of ExecutionJournal.record().
+        """
+        journal = self.get_execution_journal()
+        if journal is None:
+            return
+
+        try:
+            await asyncio.to_thread(
+                journal.record, kind, started_at, duration,
+                failed=not output_message_data or bool(output_message_data.get('error')),
+                result_size=get_result_size(output_message_data), **fields
+            )
+        except Exception as e:
+            logging.warning("Failed to record execution in the journal: %s", e)
+
+    def get_cache_ttl(self, message_data: Dict[str, Any]) -> float:
+        """
+        Get the time to live of the result of a message marked as cacheable.
+
+        Args:
+            message_data (Dict[str, Any]): Message data in JSON format.
+
+        Returns:
+            float: Time to live in seconds, or 0 if the result must not be cached.
+        """
+        if not message_data.get("cacheable"):
+            return 0
+
+        try:
+            ttl = float(message_data.get("ttl") or 0)
+        except (TypeError, ValueError):
+            ttl = 0
+        if ttl <= 0:
+            logging.warning("Cacheable job without a valid ttl, caching its result for %d seconds", DEFAULT_TTL)
+            ttl = DEFAULT_TTL
+        return ttl
+
+    async def run_cacheable_commands(self, commands: bytes, post_url: str, interpreter_override: str,
+                                     job_key: str, report_diff: bool, post_id: str, ttl: float) -> None:
+        """
+        Serve the result of cacheable commands from the cache, or execute them once for all identical
+        messages received meanwhile.
+
+        Args:
+            commands (bytes): Base64 encoded list of commands.
+            post_url (str): Post back URL to send the results to.
+            interpreter_override (str): Interpreter name to use in executing the commands.
+            job_key (str): Key of a recurring job to only report changed outputs for.
+            report_diff (bool): Send a diff of changed text outputs of the recurring job.
+            post_id (str): Post back identifier recorded in the execution journal.
+            ttl (float): Time to live of the result in seconds.
+        """
+        cache_key = get_cache_key(interpreter_override or self.get_default_interpreter(), commands)
+        result = await self.get_cached_result(cache_key)
+
+        if result is None and cache_key in self.__cache_in_flight:
+            # Wait for the identical job already running instead of running it again
+            start = time.monotonic()
+            result = await asyncio.shield(self.__cache_in_flight[cache_key])
+            if result is None:
+                result = {'output': '', 'error': "Identical cacheable job failed"}
+            elif not result.get('error'):
+                result = {**result, 'cached': True, 'cache_age': round(time.monotonic() - start, 3)}
+
+        if result is not None:
+            if post_url:
+                await self.post_job_results(post_url, result, job_key, report_diff)
+            return
+
+        if not self.admission_controller.try_admit():
+            await self.send_busy_response(post_url)
+            return
+
+        in_flight = asyncio.get_running_loop().create_future()
+        self.__cache_in_flight[cache_key] = in_flight
+        try:
+            async with self.admission_controller.execution_slot():
+                result = await self.execute_commands(
+                    commands, post_url, interpreter_override, job_key, report_diff, post_id=post_id)
+            await self.cache_result(cache_key, result, ttl)
+        finally:
+            del self.__cache_in_flight[cache_key]
+            in_flight.set_result(result)
+
+    async def get_cached_result(self, cache_key: str) -> Dict[str, Any] | None:
+        """
+        Get the cached result of a cacheable job.
+
+        Args:
+            cache_key (str): Cache key of the job.
+
+        Returns:
+            Dict[str, Any] | None: Result marked as cached with its age in seconds, or None if not cached.
+        """
+        self.__open_result_cache()
+        cached = await asyncio.to_thread(self.result_cache.get, cache_key)
+        if cached is None:
+            return None
+
+        result, age = cached
+        logging.info("Serving cached result %.1f seconds old", age)
+        return {**result, 'cached': True, 'cache_age': round(age, 3)}
+
+    async def cache_result(self, cache_key: str, output_message_data: Dict[str, Any], ttl: float) -> None:
+        """
+        Cache the result of a cacheable job if it succeeded.
+
+        Args:
+            cache_key (str): Cache key of the job.
+            output_message_data (Dict[str, Any]): Result of the job.
+            ttl (float): Time to live of the result in seconds.
+        """
+        if not output_message_data or output_message_data.get('error'):
+            return
+
+        self.__open_result_cache()
+        await asyncio.to_thread(self.result_cache.put, cache_key, output_message_data, ttl)
+
+    def __open_result_cache(self) -> None:
+        """
+        Keep the result cache on disk in the data directory of the organization, if possible.
+        """
+        org_id = self.config_data.get("rewst_org_id")
+        if self.result_cache.cache_directory or not org_id:
+            return
+
+        try:
+            self.result_cache.cache_directory = get_data_directory(org_id, CACHE_DIRECTORY)
+        except OSError as e:
+            logging.warning("Keeping result cache in memory only: %s", e)
+
+    async def send_busy_response(self, post_url: str) -> Dict[str, Any]:
+        """
+        Tell Rewst that the agent is at capacity and when the job should be retried.
+
+        Args:
+            post_url (str): Post back URL of the rejected job.
+
+        Returns:
+            Dict[str, Any]: Busy message in JSON format sent to the post_url.
+        """
+        retry_after = self.admission_controller.retry_after()
+        logging.warning("Agent busy with %d jobs, rejecting job. Retry after %d seconds.",
+                        self.admission_controller.pending_jobs, retry_after)
+
+        busy_message_data = {
+            'output': '',
+            'error': f"Agent is busy, retry after {retry_after} seconds.",
+            'busy': True,
+            'retry_after': retry_after,
+            'pending_jobs': self.admission_controller.pending_jobs,
+            'max_pending_jobs': self.admission_controller.max_pending_jobs
+        }
+
+        if post_url:
+            await self.post_results(post_url, busy_message_data)
+
+        return busy_message_data
+
+    async def post_results(self, post_url: str, output_message_data: Dict[str, Any]) -> bool:
+        """
+        Send the results of a job back to Rewst via the post_url.
+
+        Args:
+            post_url (str): Post back URL to send the results to.
+            output_message_data (Dict[str, Any]): Results in JSON format.
+
+        Returns:
+            bool: True if Rewst accepted the results or the webhook was already fulfilled, otherwise False.
+        """
+        logging.info("Sending Results to Rewst via httpx.")
+        output = output_message_data.get("output")
+        if isinstance(output, (list, dict)) and len(output) > LARGE_RESULT_ITEMS:
+            # Keep the event loop responsive while encoding large nested results
+            content = await get_process_pool().run(encode_json, output_message_data)
+            request_args = {"content": content, "headers": {"Content-Type": "application/json"}}
+        else:
+            request_args = {"json": output_message_data}
+
+        async with httpx.AsyncClient(timeout=self.config_data.get("post_timeout", DEFAULT_POST_TIMEOUT)) as client:
+            response = await client.post(post_url, **request_args)
+        logging.info("POST request status: %d", response.status_code)
+        if response.status_code != 200:
+            if response.status_code == 400 and ("fulfilled" in response.text.lower()):
+                logging.info("Webhook POST fulfilled by Script")
+            else:
+                logging.error("Error response: %s", response.text)
+                return False
+        return True
+
     async def handle_message(self, message: Message) -> None:
         """Handle incoming message event from the IoT Hub.
 
         Args:
             message (Message): Message instance from the IoT Hub.
         """
+        # The SDK runs each message in a task of its own, so this only tags the records of this message
+        logging_org_id.set(self.config_data.get("rewst_org_id"))
         logging.info("Received IoT Hub message in handle_message.")
         try:
             message_data = json.loads(message.data)
             get_installation_info = message_data.get("get_installation")
             commands = message_data.get("commands")
+            action = message_data.get("action")
+            parameters = message_data.get("parameters")
             post_id = message_data.get("post_id")
             interpreter_override = message_data.get("interpreter_override")
+            report_changes_only = message_data.get("report_changes_only")
+            report_diff = bool(message_data.get("report_diff"))
+            cache_ttl = self.get_cache_ttl(message_data)
 
             if post_id:
                 post_path = post_id.replace(":", "/")
@@ -281,13 +1165,43 @@ class ConnectionManager:
             else:
                 post_url = None
 
+            job_key = None
+            if report_changes_only:
+                if commands:
+                    job_source = f"{interpreter_override or ''}:{commands}"
+                else:
+                    job_source = f"{action}:{json.dumps(parameters, sort_keys=True)}"
+                job_key = message_data.get("job_key") or hashlib.sha256(
+                    job_source.encode("utf-8")).hexdigest()
+
             if commands:
                 logging.info("Received commands in message")
                 try:
-                    await self.execute_commands(commands, post_url, interpreter_override)
+                    if cache_ttl:
+                        await self.run_cacheable_commands(
+                            commands, post_url, interpreter_override, job_key, report_diff, post_id, cache_ttl)
+                    elif self.admission_controller.try_admit():
+                        async with self.admission_controller.execution_slot():
+                            await self.execute_commands(
+                                commands, post_url, interpreter_override, job_key, report_diff, post_id=post_id)
+                    else:
+                        await self.send_busy_response(post_url)
                 except Exception as e:
                     logging.exception("Exception running commands: %s", e)
 
+            if action:
+                logging.info("Received native action %s in message", action)
+                try:
+                    if self.admission_controller.try_admit():
+                        async with self.admission_controller.execution_slot() as leave_slot:
+                            await self.execute_action(
+                                action, parameters, post_url, job_key, report_diff, post_id=post_id,
+                                leave_slot=leave_slot)
+                    else:
+                        await self.send_busy_response(post_url)
+                except Exception as e:
+                    logging.exception("Exception running native action: %s", e)
+
             if get_installation_info:
                 logging.info("Received request for installation paths")
                 try:
@@ -300,12 +1214,12 @@ class ConnectionManager:
         except Exception as e:
             logging.exception("An unexpected error occurred: %s", e)
 
-    async def get_installation(self, post_url: str) -> None:
-        """Send installation data of the service to the Rewst platform. The post_url
-        is an ephemeral link generated by the Rewst platform.
+    def get_installation_info(self) -> Dict[str, Any]:
+        """
+        Get the installation data of the service.
 
-        Args:
-            post_url (str): Post back link to send the installation data to.
+        Returns:
+            Dict[str, Any]: Paths of the installed files and host tags.
         """
         org_id = self.config_data['rewst_org_id']
         service_executable_path = get_service_executable_path(org_id)
@@ -313,7 +1227,7 @@ class ConnectionManager:
         service_manager_path = get_service_manager_path(org_id)
         config_file_path = get_config_file_path(org_id)
 
-        paths_data = {
+        return {
             "service_executable_path": service_executable_path,
             "agent_executable_path": agent_executable_path,
             "config_file_path": config_file_path,
@@ -321,6 +1235,15 @@ class ConnectionManager:
             "tags": build_host_tags(org_id)
         }
 
+    async def get_installation(self, post_url: str) -> None:
+        """Send installation data of the service to the Rewst platform. The post_url
+        is an ephemeral link generated by the Rewst platform.
+
+        Args:
+            post_url (str): Post back link to send the installation data to.
+        """
+        paths_data = self.get_installation_info()
+
         try:
             async with httpx.AsyncClient() as client:
                 response = await client.post(post_url, json=paths_data)
@@ -349,6 +1272,41 @@ class ConnectionManager:
             return '/bin/bash'
 
 
+def set_signal_handlers(stop_event: asyncio.Event) -> None:
+    """
+    Set the stop event when the service is asked to stop.
+
+    Args:
+        stop_event (asyncio.Event): Stop event instance.
+    """
+    def signal_handler(signum, frame):
+        logging.info(
+            f"Received signal {signum}. Initiating graceful shutdown.")
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, signal_handler)
+    signal.signal(signal.SIGINT, signal_handler)
+
+
+def reload_configuration(config_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Reload the configuration file of the agent to pick up changed credentials.
+
+    Args:
+        config_data (Dict[str, Any]): Current configuration data of the agent service.
+
+    Returns:
+        Dict[str, Any]: Reloaded configuration data, or the current one if it cannot be read.
+    """
+    try:
+        config_file = get_config_file_path(config_data["rewst_org_id"])
+        if os.path.exists(config_file):
+            return load_configuration(None, config_file) or config_data
+    except Exception as e:
+        logging.warning("Failed to reload the configuration: %s", e)
+    return config_data
+
+
 async def iot_hub_connection_loop(config_data: Dict[str, Any], stop_event: asyncio.Event = asyncio.Event(), use_signals: bool = True) -> None:
     """Connect to the IoT Hub and wait for a stop event to close the loop.
 
@@ -358,56 +1316,105 @@ async def iot_hub_connection_loop(config_data: Dict[str, Any], stop_event: async
         use_signals (bool): Use signal handlers to monitor the stop event.s
     """
     if use_signals:
-        def signal_handler(signum, frame):
-            logging.info(
-                f"Received signal {signum}. Initiating graceful shutdown.")
-            stop_event.set()
+        set_signal_handlers(stop_event)
 
-        signal.signal(signal.SIGTERM, signal_handler)
-        signal.signal(signal.SIGINT, signal_handler)
+    # Keep the records of this organization out of the log files of the others hosted by the process
+    logging_org_id.set(config_data.get("rewst_org_id"))
+    reconnect_policy = ReconnectPolicy.from_config(config_data)
 
-    # Set connection constants
-    connection_retry_interval = 10
+    # One connection manager and client are kept for the lifetime of the service
+    connection_manager = None
+    rebuild_client = False
 
     while not stop_event.is_set():
         try:
-            # Instantiate ConnectionManager
-            connection_manager = ConnectionManager(config_data, False)
+            if connection_manager is None:
+                # Instantiate ConnectionManager
+                connection_manager = ConnectionManager(config_data, False)
+                await connection_manager.set_connection_state_handler()
+                await connection_manager.set_desired_properties_handler()
+                await connection_manager.set_method_handler()
 
-            # Connect to IoT Hub
-            logging.info("Connecting to IoT Hub...")
-            await connection_manager.connect()
+                # Connect to IoT Hub
+                logging.info("Connecting to IoT Hub...")
+                await connection_manager.connect()
+            else:
+                logging.info("Reconnecting to IoT Hub...")
+                await connection_manager.reconnect(reload_configuration(config_data), rebuild_client)
+                config_data = connection_manager.config_data
+                rebuild_client = False
+            if not connection_manager.client.connected:
+                raise ConnectionFailedError("No transport connected to the IoT Hub")
+            reconnect_policy.connected()
+            connection_manager.telemetry.resume()
+            await connection_manager.sync_desired_properties()
+            if config_data.get("heartbeat", True):
+                connection_manager.heartbeat.start()
 
             # Update Device Twin reported properties to 'online'
             logging.info("Updating device status to online...")
-            twin_patch = {"connectivity": {"status": "online"}}
-            await connection_manager.client.patch_twin_reported_properties(twin_patch)
+            connection_manager.reported_properties.update({"connectivity": {"status": "online"}})
 
             # Set Message Handler
             logging.info("Setting up message handler...")
             await connection_manager.set_message_handler()
 
-            # Use an asyncio.Event to exit the loop when the service stops
-            while not stop_event.is_set() and connection_manager.client.connected:
-                await asyncio.sleep(1)
+            # Wait for the service to stop or the connection to drop, without waking up periodically
+            await connection_manager.wait_for_disconnection(stop_event)
 
             if connection_manager.client.connected:
                 # Before disconnecting, update Device Twin reported properties to 'offline'
                 logging.info("Updating device status to offline...")
-                twin_patch = {"connectivity": {"status": "offline"}}
-                await connection_manager.client.patch_twin_reported_properties(twin_patch)
+                connection_manager.reported_properties.update({"connectivity": {"status": "offline"}})
+                await connection_manager.reported_properties.flush()
 
                 await connection_manager.disconnect()
                 return
             else:
                 logging.info("Client disconnected")
 
+        except CredentialError as e:
+            logging.exception(
+                f"Authentication failed during IoT Hub Loop: {str(e)}")
+            rebuild_client = True
+
+        except (ConnectionFailedError, ConnectionDroppedError) as e:
+            logging.warning("Failed to connect to IoT Hub: %s", e)
+
         except Exception as e:
             logging.exception(
                 f"Exception Caught during IoT Hub Loop: {str(e)}")
 
-        # Reconnect
-        logging.info("Reconnecting in %d seconds...",
-                     connection_retry_interval)
+        # Reconnect, waking up early if the service stops meanwhile
+        delay = reconnect_policy.next_delay()
+        logging.info("Reconnecting in %.1f seconds (attempt %d)...",
+                     delay, reconnect_policy.attempts)
+
+        try:
+            await asyncio.wait_for(stop_event.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def multi_org_connection_loop(configs: List[Dict[str, Any]], stop_event: asyncio.Event = asyncio.Event(), use_signals: bool = True) -> None:
+    """Connect several organizations to the IoT Hub from one process and wait for a stop event to close the loops.
+
+    Each organization has its own connection manager, client, queues, admission controller, change reporter and
+    result cache on the shared event loop, so that limits and results never cross organizations. Only the
+    process pool is shared.
+
+    Args:
+        configs (List[Dict[str, Any]]): Configuration data of each organization.
+        stop_event (asyncio.Event): Stop event instance.
+        use_signals (bool): Use signal handlers to monitor the stop event.
+    """
+    if use_signals:
+        set_signal_handlers(stop_event)
 
-        await asyncio.sleep(connection_retry_interval)
+    results = await asyncio.gather(
+        *(iot_hub_connection_loop(config_data, stop_event, False) for config_data in configs),
+        return_exceptions=True
+    )
+    for config_data, result in zip(configs, results):
+        if isinstance(result, Exception):
+            logging.error("IoT Hub loop of Org ID %s failed: %s", config_data.get("rewst_org_id"), result)
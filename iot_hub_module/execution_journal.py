@@ -0,0 +1,313 @@
+""" Module for defining class and functions to keep a local journal of the executed jobs. """
+
+from typing import Any, Dict, List, Tuple
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+JOURNAL_DIRECTORY = "journal"
+JOURNAL_FILE = "executions.sqlite3"
+DEFAULT_RETENTION_DAYS = 30
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_FLUSH_INTERVAL = 5.0
+PRUNE_INTERVAL = 3600
+DEFAULT_QUERY_LIMIT = 100
+MAX_QUERY_LIMIT = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS executions (
+    id INTEGER PRIMARY KEY,
+    post_id TEXT,
+    kind TEXT NOT NULL,
+    name TEXT,
+    script_hash TEXT,
+    interpreter TEXT,
+    started_at REAL NOT NULL,
+    finished_at REAL NOT NULL,
+    duration REAL NOT NULL,
+    exit_code INTEGER,
+    failed INTEGER NOT NULL,
+    result_size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS executions_started_at ON executions (started_at);
+CREATE INDEX IF NOT EXISTS executions_script_hash ON executions (script_hash, started_at);
+"""
+
+# Columns written for each execution, in insertion order
+COLUMNS = (
+    "post_id", "kind", "name", "script_hash", "interpreter", "started_at",
+    "finished_at", "duration", "exit_code", "failed", "result_size",
+)
+
+# Columns executions can be filtered and aggregated by
+FILTER_COLUMNS = ("kind", "name", "script_hash", "interpreter", "exit_code")
+
+
+def get_script_hash(commands: str | bytes) -> str:
+    """
+    Get the hash identifying a script in the journal.
+
+    Args:
+        commands (str | bytes): Base64 encoded script.
+
+    Returns:
+        str: Hexadecimal SHA-256 digest of the script.
+    """
+    if isinstance(commands, str):
+        commands = commands.encode("utf-8")
+    return hashlib.sha256(commands).hexdigest()
+
+
+def get_result_size(output_message_data: Dict[str, Any] | None) -> int:
+    """
+    Get the size of the result of a job.
+
+    Args:
+        output_message_data (Dict[str, Any] | None): Result of the job.
+
+    Returns:
+        int: Number of characters of the output and error.
+    """
+    if not output_message_data:
+        return 0
+
+    size = 0
+    for value in (output_message_data.get("output"), output_message_data.get("error")):
+        if isinstance(value, str):
+            size += len(value)
+        elif value is not None:
+            size += len(json.dumps(value, default=str))
+    return size
+
+
+class ExecutionJournal:
+    """
+    Journal of the executed jobs kept in a SQLite database in WAL mode, written in batches.
+    """
+
+    def __init__(self, database_path: str,
+                 retention_days: float = DEFAULT_RETENTION_DAYS,
+                 batch_size: int = DEFAULT_BATCH_SIZE,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL) -> None:
+        """Constructs a new execution journal instance. The database is opened on first use.
+
+        Args:
+            database_path (str): Database file path.
+            retention_days (float, optional): Days to keep executions for. Defaults to DEFAULT_RETENTION_DAYS.
+            batch_size (int, optional): Number of executions written together. Defaults to DEFAULT_BATCH_SIZE.
+            flush_interval (float, optional): Seconds before pending executions are written with the next one.
+                Defaults to DEFAULT_FLUSH_INTERVAL.
+        """
+        self.database_path = database_path
+        self.retention_days = retention_days
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self.__lock = threading.Lock()
+        self.__connection = None
+        self.__pending = []
+        self.__first_pending_at = None
+        self.__last_pruned_at = None
+
+    def record(self, kind: str, started_at: float, duration: float, post_id: str = None,
+               name: str = None, script_hash: str = None, interpreter: str = None,
+               exit_code: int = None, failed: bool = False, result_size: int = 0) -> None:
+        """
+        Record an execution, writing the pending executions when the batch is full or old enough.
+
+        Args:
+            kind (str): Kind of job, commands or action.
+            started_at (float): Start time as a UNIX timestamp.
+            duration (float): Duration in seconds.
+            post_id (str, optional): Post back identifier of the job. Defaults to None.
+            name (str, optional): Name of the native action. Defaults to None.
+            script_hash (str, optional): Hash of the script. Defaults to None.
+            interpreter (str, optional): Interpreter of the script. Defaults to None.
+            exit_code (int, optional): Exit code of the script. Defaults to None.
+            failed (bool, optional): Whether the job failed. Defaults to False.
+            result_size (int, optional): Size of the result. Defaults to 0.
+        """
+        row = (post_id, kind, name, script_hash, interpreter, started_at,
+               started_at + duration, duration, exit_code, int(failed), result_size)
+
+        with self.__lock:
+            if not self.__pending:
+                self.__first_pending_at = time.monotonic()
+            self.__pending.append(row)
+
+            if (len(self.__pending) >= self.batch_size or
+                    time.monotonic() - self.__first_pending_at >= self.flush_interval):
+                self.__flush()
+
+    def flush(self) -> None:
+        """
+        Write the pending executions.
+        """
+        with self.__lock:
+            self.__flush()
+
+    def prune(self, now: float = None) -> int:
+        """
+        Delete the executions older than the retention period.
+
+        Args:
+            now (float, optional): Current UNIX timestamp. Defaults to the current time.
+
+        Returns:
+            int: Number of deleted executions.
+        """
+        with self.__lock:
+            return self.__prune(now)
+
+    def query(self, since: float = None, limit: int = DEFAULT_QUERY_LIMIT,
+              filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """
+        Get the most recent executions.
+
+        Args:
+            since (float, optional): Only executions started after this UNIX timestamp. Defaults to None.
+            limit (int, optional): Maximum number of executions. Defaults to DEFAULT_QUERY_LIMIT.
+            filters (Dict[str, Any], optional): Values of FILTER_COLUMNS to match. Defaults to None.
+
+        Returns:
+            List[Dict[str, Any]]: Executions from the most recent.
+        """
+        where, parameters = self.__build_where(since, filters)
+        limit = min(MAX_QUERY_LIMIT, max(1, limit))
+        with self.__lock:
+            self.__flush()
+            rows = self.__connect().execute(
+                f"SELECT * FROM executions {where} ORDER BY started_at DESC LIMIT ?",
+                (*parameters, limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def aggregate(self, group_by: str = "script_hash", since: float = None,
+                  filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """
+        Get statistics of the executions grouped by a column.
+
+        Args:
+            group_by (str, optional): Column of FILTER_COLUMNS to group by. Defaults to "script_hash".
+            since (float, optional): Only executions started after this UNIX timestamp. Defaults to None.
+            filters (Dict[str, Any], optional): Values of FILTER_COLUMNS to match. Defaults to None.
+
+        Raises:
+            ValueError: If the column cannot be grouped by.
+
+        Returns:
+            List[Dict[str, Any]]: Statistics of each group, from the longest total duration.
+        """
+        if group_by not in FILTER_COLUMNS:
+            raise ValueError(f"Cannot group executions by {group_by}")
+
+        where, parameters = self.__build_where(since, filters)
+        with self.__lock:
+            self.__flush()
+            rows = self.__connect().execute(
+                f"""SELECT {group_by}, COUNT(*) AS executions, SUM(failed) AS failures,
+                           AVG(duration) AS avg_duration, MAX(duration) AS max_duration,
+                           SUM(duration) AS total_duration, AVG(result_size) AS avg_result_size,
+                           MAX(started_at) AS last_started_at
+                    FROM executions {where} GROUP BY {group_by} ORDER BY total_duration DESC""",
+                parameters
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self) -> None:
+        """
+        Write the pending executions and close the database.
+        """
+        with self.__lock:
+            self.__flush()
+            if self.__connection is not None:
+                self.__connection.close()
+                self.__connection = None
+
+    def __connect(self) -> sqlite3.Connection:
+        """
+        Open the database if needed. Must be called with the lock held.
+
+        Returns:
+            sqlite3.Connection: Database connection.
+        """
+        if self.__connection is None:
+            connection = sqlite3.connect(self.database_path, check_same_thread=False)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(SCHEMA)
+            self.__connection = connection
+        return self.__connection
+
+    def __flush(self) -> None:
+        """
+        Write the pending executions in one transaction, pruning old ones from time to time.
+        Must be called with the lock held.
+        """
+        if not self.__pending:
+            return
+
+        rows, self.__pending = self.__pending, []
+        try:
+            connection = self.__connect()
+            with connection:
+                connection.executemany(
+                    f"INSERT INTO executions ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                    rows
+                )
+            if self.__last_pruned_at is None or time.monotonic() - self.__last_pruned_at >= PRUNE_INTERVAL:
+                self.__prune()
+        except sqlite3.Error as e:
+            logging.warning("Failed to write %d executions to the journal: %s", len(rows), e)
+
+    def __prune(self, now: float = None) -> int:
+        """
+        Delete the executions older than the retention period. Must be called with the lock held.
+
+        Args:
+            now (float, optional): Current UNIX timestamp. Defaults to the current time.
+
+        Returns:
+            int: Number of deleted executions.
+        """
+        cutoff = (now or time.time()) - self.retention_days * 86400
+        connection = self.__connect()
+        with connection:
+            deleted = connection.execute("DELETE FROM executions WHERE started_at < ?", (cutoff,)).rowcount
+        self.__last_pruned_at = time.monotonic()
+        if deleted:
+            logging.info("Pruned %d executions from the journal", deleted)
+        return deleted
+
+    @staticmethod
+    def __build_where(since: float | None, filters: Dict[str, Any] | None) -> Tuple[str, List[Any]]:
+        """
+        Build the WHERE clause of a query.
+
+        Args:
+            since (float | None): Only executions started after this UNIX timestamp.
+            filters (Dict[str, Any] | None): Values of FILTER_COLUMNS to match.
+
+        Raises:
+            ValueError: If a column cannot be filtered by.
+
+        Returns:
+            Tuple[str, List[Any]]: WHERE clause and its parameters.
+        """
+        conditions, parameters = [], []
+        if since is not None:
+            conditions.append("started_at >= ?")
+            parameters.append(since)
+        for column, value in (filters or {}).items():
+            if column not in FILTER_COLUMNS:
+                raise ValueError(f"Cannot filter executions by {column}")
+            conditions.append(f"{column} = ?")
+            parameters.append(value)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return where, parameters
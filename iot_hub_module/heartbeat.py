@@ -0,0 +1,196 @@
+""" Module for defining class and functions to send a host health heartbeat. """
+
+from typing import Any, Callable, Dict
+
+import asyncio
+import logging
+import os
+import time
+
+import psutil
+
+HEARTBEAT_TYPE = "heartbeat"
+DEFAULT_MIN_INTERVAL = 15.0
+DEFAULT_MAX_INTERVAL = 300.0
+DEFAULT_FULL_SNAPSHOT_INTERVAL = 3600.0
+INTERVAL_GROWTH = 1.5
+
+# Change of a metric since the last full snapshot that is worth reporting
+DEFAULT_THRESHOLDS = {
+    "cpu_percent": 10.0,
+    "memory_percent": 5.0,
+    "swap_percent": 5.0,
+    "disk_percent": 1.0,
+    "load_1": 0.5,
+    "load_5": 0.5,
+    "load_15": 0.5,
+}
+
+
+def sample_host_health(disk_path: str = None) -> Dict[str, float]:
+    """
+    Sample the health metrics of the host.
+
+    Args:
+        disk_path (str, optional): Path on the disk to measure. Defaults to the system drive.
+
+    Returns:
+        Dict[str, float]: CPU, memory, swap and disk usage in percent, and load averages.
+    """
+    if disk_path is None:
+        disk_path = os.environ.get("SystemDrive", "C:") + "\\" if os.name == "nt" else "/"
+
+    # The CPU usage is measured since the previous sample, without blocking
+    sample = {
+        "cpu_percent": psutil.cpu_percent(interval=None),
+        "memory_percent": psutil.virtual_memory().percent,
+        "swap_percent": psutil.swap_memory().percent,
+        "disk_percent": psutil.disk_usage(disk_path).percent,
+    }
+    sample["load_1"], sample["load_5"], sample["load_15"] = (
+        round(load, 2) for load in psutil.getloadavg()
+    )
+    return sample
+
+
+class Heartbeat:
+    """
+    Periodic host health heartbeat. Each message only carries the metrics that changed beyond their threshold
+    since the last full snapshot. The interval grows while the metrics are stable since the previous sample and
+    shrinks when they move.
+    """
+
+    def __init__(self, send: Callable[[Dict[str, Any]], Any],
+                 sample: Callable[[], Dict[str, float]] = sample_host_health,
+                 min_interval: float = DEFAULT_MIN_INTERVAL,
+                 max_interval: float = DEFAULT_MAX_INTERVAL,
+                 full_snapshot_interval: float = DEFAULT_FULL_SNAPSHOT_INTERVAL,
+                 thresholds: Dict[str, float] = None) -> None:
+        """Constructs a new heartbeat instance.
+
+        Args:
+            send (Callable[[Dict[str, Any]], Any]): Queues a heartbeat message, e.g. TelemetryChannel.enqueue.
+            sample (Callable[[], Dict[str, float]], optional): Samples the metrics. Defaults to
+                sample_host_health.
+            min_interval (float, optional): Interval while the metrics move, in seconds. Defaults to
+                DEFAULT_MIN_INTERVAL.
+            max_interval (float, optional): Interval while the metrics are stable, in seconds. Defaults to
+                DEFAULT_MAX_INTERVAL.
+            full_snapshot_interval (float, optional): Seconds between full snapshots. Defaults to
+                DEFAULT_FULL_SNAPSHOT_INTERVAL.
+            thresholds (Dict[str, float], optional): Change of each metric worth reporting. Defaults to
+                DEFAULT_THRESHOLDS.
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.full_snapshot_interval = full_snapshot_interval
+        self.thresholds = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+        self.interval = min_interval
+
+        self.__send = send
+        self.__sample = sample
+        self.__snapshot: Dict[str, float] | None = None
+        self.__snapshot_at = 0.0
+        self.__previous: Dict[str, float] | None = None
+        self.__task: asyncio.Task | None = None
+
+    def build_message(self, sample: Dict[str, float], now: float) -> Dict[str, Any]:
+        """
+        Build the heartbeat message of a sample, taking a full snapshot when due.
+
+        Args:
+            sample (Dict[str, float]): Sampled metrics.
+            now (float): Current UNIX timestamp.
+
+        Returns:
+            Dict[str, Any]: Heartbeat message with the full snapshot or the changed metrics.
+        """
+        message = {"type": HEARTBEAT_TYPE, "timestamp": now}
+        if self.__snapshot is None or now - self.__snapshot_at >= self.full_snapshot_interval:
+            self.__snapshot = dict(sample)
+            self.__snapshot_at = now
+            message["full"] = True
+            message.update(sample)
+            return message
+
+        message["full"] = False
+        for name, value in sample.items():
+            previous = self.__snapshot.get(name)
+            if previous is None or abs(value - previous) >= self.thresholds.get(name, 0):
+                message[name] = value
+        return message
+
+    def has_changed(self, sample: Dict[str, float]) -> bool:
+        """
+        Check whether metrics changed beyond their threshold since the previous sample, and keep the sample.
+
+        Args:
+            sample (Dict[str, float]): Sampled metrics.
+
+        Returns:
+            bool: True if a metric changed beyond its threshold.
+        """
+        previous, self.__previous = self.__previous, dict(sample)
+        if previous is None:
+            return False
+        return any(
+            name not in previous or abs(value - previous[name]) >= self.thresholds.get(name, 0)
+            for name, value in sample.items()
+        )
+
+    def next_interval(self, changed: bool) -> float:
+        """
+        Adapt the interval to the last heartbeat.
+
+        Args:
+            changed (bool): Whether metrics changed beyond their threshold.
+
+        Returns:
+            float: Interval before the next heartbeat in seconds.
+        """
+        if changed:
+            self.interval = max(self.min_interval, self.interval / 2)
+        else:
+            self.interval = min(self.max_interval, self.interval * INTERVAL_GROWTH)
+        return self.interval
+
+    async def beat(self) -> float:
+        """
+        Sample the metrics and send a heartbeat.
+
+        Returns:
+            float: Interval before the next heartbeat in seconds.
+        """
+        try:
+            sample = await asyncio.to_thread(self.__sample)
+        except Exception as e:
+            logging.warning("Failed to sample host health: %s", e)
+            return self.next_interval(False)
+
+        message = self.build_message(sample, time.time())
+        self.__send(message)
+        # The snapshot only picks the fields to send, the interval follows the changes between samples
+        return self.next_interval(self.has_changed(sample))
+
+    def start(self) -> None:
+        """
+        Start sending heartbeats if not started yet. Must be called from the event loop.
+        """
+        if self.__task is None or self.__task.done():
+            self.__task = asyncio.create_task(self.__run())
+
+    async def close(self) -> None:
+        """
+        Stop sending heartbeats.
+        """
+        task, self.__task = self.__task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def __run(self) -> None:
+        """
+        Send heartbeats until closed.
+        """
+        while True:
+            await asyncio.sleep(await self.beat())
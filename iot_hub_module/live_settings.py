@@ -0,0 +1,109 @@
+""" Module for defining functions to validate the agent settings changed live from the device twin. """
+
+from typing import Any, Callable, Dict, Tuple
+
+DESIRED_SETTINGS_KEY = "agent_settings"
+DEFAULT_POST_TIMEOUT = 5.0
+LOG_LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+
+
+def positive_int(value: Any) -> int:
+    """
+    Validate a positive integer setting.
+
+    Args:
+        value (Any): Setting value.
+
+    Raises:
+        ValueError: If the value is not a positive integer.
+
+    Returns:
+        int: Setting value.
+    """
+    if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+        raise ValueError("must be a positive integer")
+    return value
+
+
+def positive_number(value: Any) -> float:
+    """
+    Validate a positive number setting.
+
+    Args:
+        value (Any): Setting value.
+
+    Raises:
+        ValueError: If the value is not a positive number.
+
+    Returns:
+        float: Setting value.
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+        raise ValueError("must be a positive number")
+    return value
+
+
+def log_level(value: Any) -> str:
+    """
+    Validate a log level setting.
+
+    Args:
+        value (Any): Setting value.
+
+    Raises:
+        ValueError: If the value is not a log level name.
+
+    Returns:
+        str: Upper case log level name.
+    """
+    if not isinstance(value, str) or value.upper() not in LOG_LEVELS:
+        raise ValueError(f"must be one of {', '.join(LOG_LEVELS)}")
+    return value.upper()
+
+
+# Settings that can be changed without restarting the agent, with their validation
+TUNABLES: Dict[str, Callable[[Any], Any]] = {
+    "max_pending_jobs": positive_int,
+    "max_running_jobs": positive_int,
+    "busy_retry_after": positive_number,
+    "post_timeout": positive_number,
+    "log_level": log_level,
+    "result_cache_max_entries": positive_int,
+    "result_cache_max_disk_entries": positive_int,
+    "heartbeat_min_interval": positive_number,
+    "heartbeat_max_interval": positive_number,
+    "process_pool_workers": positive_int,
+}
+
+
+def parse_settings(settings: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    Validate the settings of a desired properties patch.
+
+    Args:
+        settings (Dict[str, Any]): Settings by name. None values are ignored, as the device twin uses them to
+            delete properties.
+
+    Returns:
+        Tuple[Dict[str, Any], Dict[str, str]]: Valid settings, and the reason each other setting was rejected.
+    """
+    valid, rejected = {}, {}
+    for name, value in settings.items():
+        if value is None:
+            continue
+
+        validate = TUNABLES.get(name)
+        if validate is None:
+            rejected[name] = "cannot be changed live"
+            continue
+
+        try:
+            valid[name] = validate(value)
+        except ValueError as e:
+            rejected[name] = str(e)
+
+    if valid.get("heartbeat_min_interval", 0) > valid.get("heartbeat_max_interval", float("inf")):
+        rejected["heartbeat_min_interval"] = "must not exceed heartbeat_max_interval"
+        del valid["heartbeat_min_interval"]
+
+    return valid, rejected
@@ -0,0 +1,171 @@
+""" Module for defining class and functions to keep telemetry on disk while the IoT Hub is unreachable. """
+
+from typing import List
+
+import logging
+import os
+import threading
+
+OFFLINE_BUFFER_DIRECTORY = "offline_buffer"
+DEFAULT_SEGMENT_SIZE = 1024 * 1024
+DEFAULT_MAX_SEGMENTS = 64
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".jsonl"
+
+
+class OfflineBuffer:
+    """
+    Bounded ring buffer of telemetry records kept in segment files, one JSON record per line. When full,
+    the oldest segment is dropped. Records are read back from the oldest segment, which is deleted once
+    all its records were consumed, so records may be sent twice if the agent stops while draining.
+    """
+
+    def __init__(self, directory: str,
+                 segment_size: int = DEFAULT_SEGMENT_SIZE,
+                 max_segments: int = DEFAULT_MAX_SEGMENTS) -> None:
+        """Constructs a new offline buffer instance, picking up the segments left by a previous run.
+
+        Args:
+            directory (str): Directory of the segment files.
+            segment_size (int, optional): Size in bytes after which a new segment is started. Defaults to
+                DEFAULT_SEGMENT_SIZE.
+            max_segments (int, optional): Maximum number of segments kept. Defaults to DEFAULT_MAX_SEGMENTS.
+        """
+        self.directory = directory
+        self.segment_size = segment_size
+        self.max_segments = max(2, max_segments)
+        self.dropped_segments = 0
+
+        self.__lock = threading.Lock()
+        self.__segments = sorted(
+            int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]) for name in os.listdir(directory)
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)
+            and name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)].isdigit()
+        )
+        self.__writing = False
+        self.__head_records: List[bytes] | None = None
+        self.__head_position = 0
+
+    def __bool__(self) -> bool:
+        """
+        Whether records are waiting to be read.
+
+        Returns:
+            bool: True if the buffer is not empty.
+        """
+        return bool(self.__segments)
+
+    def append(self, records: List[bytes]) -> None:
+        """
+        Write records at the end of the buffer, dropping the oldest segment when full.
+
+        Args:
+            records (List[bytes]): JSON encoded records without line breaks.
+        """
+        if not records:
+            return
+
+        with self.__lock:
+            path = self.__get_segment_path(self.__segments[-1]) if self.__writing else None
+            if path is None or os.path.getsize(path) >= self.segment_size:
+                self.__segments.append(self.__segments[-1] + 1 if self.__segments else 0)
+                self.__writing = True
+                path = self.__get_segment_path(self.__segments[-1])
+
+            with open(path, "ab") as f:
+                f.write(b"".join(data + b"\n" for data in records))
+
+            while len(self.__segments) > self.max_segments:
+                logging.warning("Offline buffer is full, dropping the oldest telemetry")
+                self.__remove_head()
+                self.dropped_segments += 1
+
+    def peek(self, max_size: int) -> List[bytes]:
+        """
+        Read the oldest records without consuming them.
+
+        Args:
+            max_size (int): Maximum total size of the records in bytes. At least one record is returned.
+
+        Returns:
+            List[bytes]: Oldest records, empty if the buffer is empty.
+        """
+        with self.__lock:
+            head_records = self.__load_head()
+            records, size = [], 0
+            for data in head_records[self.__head_position:]:
+                if records and size + len(data) + 1 > max_size:
+                    break
+                records.append(data)
+                size += len(data) + 1
+            return records
+
+    def consume(self, count: int) -> None:
+        """
+        Consume the oldest records, deleting their segment once all its records were consumed.
+
+        Args:
+            count (int): Number of records returned by peek() to consume.
+        """
+        with self.__lock:
+            if self.__head_records is None:
+                return
+
+            self.__head_position += count
+            if self.__head_position >= len(self.__head_records):
+                self.__remove_head()
+
+    def __get_segment_path(self, segment: int) -> str:
+        """
+        Get the file path of a segment.
+
+        Args:
+            segment (int): Sequence number of the segment.
+
+        Returns:
+            str: Segment file path.
+        """
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{segment:012d}{SEGMENT_SUFFIX}")
+
+    def __load_head(self) -> List[bytes]:
+        """
+        Read the records of the oldest segment if not done yet. Must be called with the lock held.
+
+        Returns:
+            List[bytes]: Records of the oldest segment.
+        """
+        while self.__head_records is None and self.__segments:
+            if self.__writing and len(self.__segments) == 1:
+                # Appends go to a new segment from now on
+                self.__writing = False
+
+            path = self.__get_segment_path(self.__segments[0])
+            try:
+                with open(path, "rb") as f:
+                    # A record cut short by a crash is skipped
+                    self.__head_records = [line.rstrip(b"\n") for line in f if line.endswith(b"\n")]
+                self.__head_position = 0
+            except OSError as e:
+                logging.warning("Skipping unreadable offline buffer segment %s: %s", path, e)
+                self.__remove_head()
+                continue
+
+            if not self.__head_records:
+                self.__remove_head()
+
+        return self.__head_records or []
+
+    def __remove_head(self) -> None:
+        """
+        Delete the oldest segment. Must be called with the lock held.
+        """
+        segment = self.__segments.pop(0)
+        self.__head_records = None
+        self.__head_position = 0
+        if not self.__segments:
+            self.__writing = False
+
+        try:
+            os.remove(self.__get_segment_path(segment))
+        except OSError:
+            pass
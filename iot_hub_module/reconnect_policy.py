@@ -0,0 +1,109 @@
+""" Module for defining class and functions to schedule the reconnections to the IoT Hub. """
+
+from typing import Any, Callable, Dict
+
+import random
+import time
+
+DEFAULT_INITIAL_DELAY = 1.0
+DEFAULT_MAX_DELAY = 300.0
+DEFAULT_MULTIPLIER = 2.0
+DEFAULT_STABLE_PERIOD = 60.0
+
+
+class ReconnectPolicy:
+    """
+    Exponential backoff with full jitter between reconnections. The first retry is immediate and the
+    backoff is reset once a connection stayed up for the stable period.
+    """
+
+    def __init__(self,
+                 initial_delay: float = DEFAULT_INITIAL_DELAY,
+                 max_delay: float = DEFAULT_MAX_DELAY,
+                 multiplier: float = DEFAULT_MULTIPLIER,
+                 stable_period: float = DEFAULT_STABLE_PERIOD,
+                 clock: Callable[[], float] = time.monotonic,
+                 rand: Callable[[], float] = random.random) -> None:
+        """Constructs a new reconnect policy instance.
+
+        Args:
+            initial_delay (float, optional): Upper bound of the second retry delay in seconds. Defaults to
+                DEFAULT_INITIAL_DELAY.
+            max_delay (float, optional): Cap of the retry delay in seconds. Defaults to DEFAULT_MAX_DELAY.
+            multiplier (float, optional): Growth of the upper bound per failed attempt. Defaults to
+                DEFAULT_MULTIPLIER.
+            stable_period (float, optional): Seconds a connection must stay up to reset the backoff. Defaults to
+                DEFAULT_STABLE_PERIOD.
+            clock (Callable[[], float], optional): Monotonic clock in seconds. Defaults to time.monotonic.
+            rand (Callable[[], float], optional): Random number generator in [0, 1). Defaults to random.random.
+        """
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.stable_period = stable_period
+
+        self.__clock = clock
+        self.__rand = rand
+        self.__attempts = 0
+        self.__connected_at = None
+
+    @classmethod
+    def from_config(cls, config_data: Dict[str, Any]) -> "ReconnectPolicy":
+        """
+        Create a reconnect policy from the configuration of the agent.
+
+        Args:
+            config_data (Dict[str, Any]): Configuration data of the agent service.
+
+        Returns:
+            ReconnectPolicy: Reconnect policy instance.
+        """
+        return cls(
+            initial_delay=config_data.get("reconnect_initial_delay", DEFAULT_INITIAL_DELAY),
+            max_delay=config_data.get("reconnect_max_delay", DEFAULT_MAX_DELAY),
+            multiplier=config_data.get("reconnect_multiplier", DEFAULT_MULTIPLIER),
+            stable_period=config_data.get("reconnect_stable_period", DEFAULT_STABLE_PERIOD),
+        )
+
+    @property
+    def attempts(self) -> int:
+        """
+        Number of reconnections since the last stable connection.
+
+        Returns:
+            int: Number of attempts.
+        """
+        return self.__attempts
+
+    def connected(self) -> None:
+        """
+        Record that a connection was established.
+        """
+        self.__connected_at = self.__clock()
+
+    def next_delay(self) -> float:
+        """
+        Get the delay before the next reconnection, after a failed attempt or a dropped connection.
+
+        Returns:
+            float: Delay in seconds.
+        """
+        if self.__connected_at is not None and self.__clock() - self.__connected_at >= self.stable_period:
+            self.__attempts = 0
+        self.__connected_at = None
+
+        attempts = self.__attempts
+        self.__attempts += 1
+        if attempts == 0:
+            return 0.0
+
+        # The exponent is bounded so that long outages do not overflow
+        upper_bound = min(self.max_delay, self.initial_delay * self.multiplier ** min(attempts - 1, 64))
+        return self.__rand() * upper_bound
+
+    def reset(self) -> None:
+        """
+        Forget the failed attempts.
+        """
+        self.__attempts = 0
+        self.__connected_at = None
@@ -0,0 +1,175 @@
+""" Module for defining class and functions to write the reported properties of the device twin. """
+
+from typing import Any, Awaitable, Callable, Dict, Iterable
+
+import asyncio
+import copy
+import logging
+
+DEFAULT_DEBOUNCE_INTERVAL = 2.0
+DEFAULT_MAX_RETRY_INTERVAL = 60.0
+CRITICAL_FIELDS = ("connectivity",)
+
+
+def merge_patch(target: Dict[str, Any], patch: Dict[str, Any]) -> None:
+    """
+    Merge a reported properties patch into a document, nested properties included.
+
+    Args:
+        target (Dict[str, Any]): Document to merge into.
+        patch (Dict[str, Any]): Patch to merge.
+    """
+    for key, value in patch.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            merge_patch(target[key], value)
+        else:
+            target[key] = copy.deepcopy(value)
+
+
+def diff_patch(current: Dict[str, Any], patch: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Get the part of a patch that changes a document.
+
+    Args:
+        current (Dict[str, Any]): Current document.
+        patch (Dict[str, Any]): Patch to apply.
+
+    Returns:
+        Dict[str, Any]: Changed properties of the patch.
+    """
+    changes = {}
+    for key, value in patch.items():
+        if isinstance(value, dict) and isinstance(current.get(key), dict):
+            nested_changes = diff_patch(current[key], value)
+            if nested_changes:
+                changes[key] = nested_changes
+        elif key not in current or current[key] != value:
+            changes[key] = value
+    return changes
+
+
+class ReportedPropertiesWriter:
+    """
+    Coalesces reported properties patches into one pending document, written after a debounce interval or
+    immediately when a critical field changes. Failed writes are kept and retried with a backoff.
+    """
+
+    def __init__(self, patch_properties: Callable[[Dict[str, Any]], Awaitable[None]],
+                 debounce_interval: float = DEFAULT_DEBOUNCE_INTERVAL,
+                 max_retry_interval: float = DEFAULT_MAX_RETRY_INTERVAL,
+                 critical_fields: Iterable[str] = CRITICAL_FIELDS) -> None:
+        """Constructs a new reported properties writer instance.
+
+        Args:
+            patch_properties (Callable[[Dict[str, Any]], Awaitable[None]]): Writes a patch to the device twin.
+            debounce_interval (float, optional): Seconds to wait for more patches before writing. Defaults to
+                DEFAULT_DEBOUNCE_INTERVAL.
+            max_retry_interval (float, optional): Cap of the delay between retries in seconds. Defaults to
+                DEFAULT_MAX_RETRY_INTERVAL.
+            critical_fields (Iterable[str], optional): Top level properties written immediately. Defaults to
+                CRITICAL_FIELDS.
+        """
+        self.debounce_interval = debounce_interval
+        self.max_retry_interval = max_retry_interval
+        self.critical_fields = set(critical_fields)
+
+        self.__patch_properties = patch_properties
+        self.__reported: Dict[str, Any] = {}
+        self.__pending: Dict[str, Any] = {}
+        self.__lock = asyncio.Lock()
+        self.__timer: asyncio.Task | None = None
+        self.__failures = 0
+
+    @property
+    def pending(self) -> Dict[str, Any]:
+        """
+        Properties waiting to be written.
+
+        Returns:
+            Dict[str, Any]: Pending patch.
+        """
+        return copy.deepcopy(self.__pending)
+
+    def update(self, patch: Dict[str, Any], critical: bool = False) -> None:
+        """
+        Queue a patch of the reported properties without waiting for it to be written.
+
+        Args:
+            patch (Dict[str, Any]): Reported properties patch.
+            critical (bool, optional): Write immediately. Defaults to writing immediately only if the patch
+                changes a critical field.
+        """
+        expected = copy.deepcopy(self.__reported)
+        merge_patch(expected, self.__pending)
+        changes = diff_patch(expected, patch)
+        if not changes:
+            return
+
+        merge_patch(self.__pending, changes)
+        if critical or self.critical_fields.intersection(changes):
+            self.__schedule(0)
+        elif self.__timer is None:
+            self.__schedule(self.debounce_interval)
+
+    async def flush(self) -> bool:
+        """
+        Write the pending properties now.
+
+        Returns:
+            bool: True if nothing is left to write.
+        """
+        async with self.__lock:
+            if not self.__pending:
+                return True
+
+            patch, self.__pending = self.__pending, {}
+            try:
+                await self.__patch_properties(patch)
+            except Exception as e:
+                # Keep the failed patch below the properties queued meanwhile
+                merge_patch(patch, self.__pending)
+                self.__pending = patch
+                self.__failures += 1
+                delay = min(self.max_retry_interval, self.debounce_interval * 2 ** min(self.__failures, 16))
+                logging.warning("Failed to write reported properties, retrying in %.1f seconds: %s", delay, e)
+                self.__schedule(delay, replace=True)
+                return False
+
+            self.__failures = 0
+            merge_patch(self.__reported, patch)
+            return not self.__pending
+
+    async def close(self) -> None:
+        """
+        Stop the scheduled writes. Pending properties are kept for the next flush.
+        """
+        timer, self.__timer = self.__timer, None
+        if timer is not None and timer is not asyncio.current_task():
+            timer.cancel()
+            await asyncio.gather(timer, return_exceptions=True)
+
+    def __schedule(self, delay: float, replace: bool = False) -> None:
+        """
+        Schedule a write of the pending properties.
+
+        Args:
+            delay (float): Delay before writing in seconds.
+            replace (bool, optional): Replace a write scheduled later. Defaults to only scheduling earlier writes.
+        """
+        if self.__timer is not None and self.__timer is not asyncio.current_task():
+            if not replace and delay > 0:
+                return
+            self.__timer.cancel()
+        self.__timer = asyncio.create_task(self.__flush_later(delay))
+
+    async def __flush_later(self, delay: float) -> None:
+        """
+        Write the pending properties after a delay.
+
+        Args:
+            delay (float): Delay before writing in seconds.
+        """
+        await asyncio.sleep(delay)
+        if self.__timer is asyncio.current_task():
+            self.__timer = None
+        await self.flush()
@@ -0,0 +1,244 @@
+""" Module for defining class and functions to cache results of idempotent read-only scripts. """
+
+from typing import Any, Dict, Tuple
+
+import collections
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_DISK_ENTRIES = 1024
+DEFAULT_TTL = 300
+CACHE_DIRECTORY = "result_cache"
+
+
+def get_cache_key(interpreter: str, commands: str | bytes) -> str:
+    """
+    Get the cache key of a script run by an interpreter.
+
+    Args:
+        interpreter (str): Interpreter running the script.
+        commands (str | bytes): Base64 encoded script.
+
+    Returns:
+        str: Hexadecimal SHA-256 digest of the interpreter and the script.
+    """
+    if isinstance(commands, str):
+        commands = commands.encode("utf-8")
+    return hashlib.sha256(interpreter.encode("utf-8") + b"\0" + commands).hexdigest()
+
+
+class ResultCache:
+    """
+    LRU cache of job results with a time to live, kept in memory and optionally on disk.
+    """
+
+    def __init__(self,
+                 max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_disk_entries: int = DEFAULT_MAX_DISK_ENTRIES,
+                 cache_directory: str = None) -> None:
+        """Constructs a new result cache instance.
+
+        Args:
+            max_entries (int, optional): Maximum number of results kept in memory. Defaults to DEFAULT_MAX_ENTRIES.
+            max_disk_entries (int, optional): Maximum number of results kept on disk. Defaults to
+                DEFAULT_MAX_DISK_ENTRIES.
+            cache_directory (str, optional): Directory of the results kept on disk. Defaults to memory only.
+        """
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.cache_directory = cache_directory
+
+        self.__lock = threading.Lock()
+        self.__entries: collections.OrderedDict[str, Dict[str, Any]] = collections.OrderedDict()
+
+    def get(self, key: str) -> Tuple[Dict[str, Any], float] | None:
+        """
+        Get a cached result that did not expire.
+
+        Args:
+            key (str): Cache key of the job.
+
+        Returns:
+            Tuple[Dict[str, Any], float] | None: Result and its age in seconds, or None if not cached.
+        """
+        now = time.time()
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None:
+                self.__entries.move_to_end(key)
+
+        if entry is None:
+            entry = self.__read_entry(key)
+            if entry is not None:
+                self.__store_in_memory(key, entry)
+
+        if entry is None:
+            return None
+
+        if entry["expires_at"] <= now:
+            self.remove(key)
+            return None
+
+        return entry["result"], now - entry["stored_at"]
+
+    def put(self, key: str, result: Dict[str, Any], ttl: float) -> None:
+        """
+        Cache the result of a job.
+
+        Args:
+            key (str): Cache key of the job.
+            result (Dict[str, Any]): Result of the job.
+            ttl (float): Time to live of the result in seconds.
+        """
+        now = time.time()
+        entry = {"stored_at": now, "expires_at": now + ttl, "result": result}
+        self.__store_in_memory(key, entry)
+        self.__write_entry(key, entry)
+
+    def remove(self, key: str) -> None:
+        """
+        Remove a result from the cache.
+
+        Args:
+            key (str): Cache key of the job.
+        """
+        with self.__lock:
+            self.__entries.pop(key, None)
+
+        if self.cache_directory:
+            try:
+                os.remove(self.__get_entry_path(key))
+            except OSError:
+                pass
+
+    def resize(self, max_entries: int = None, max_disk_entries: int = None) -> None:
+        """
+        Change the size limits of the cache, evicting the least recently used results.
+
+        Args:
+            max_entries (int, optional): Maximum number of results kept in memory. Defaults to unchanged.
+            max_disk_entries (int, optional): Maximum number of results kept on disk. Defaults to unchanged.
+        """
+        with self.__lock:
+            if max_entries is not None:
+                self.max_entries = max_entries
+            if max_disk_entries is not None:
+                self.max_disk_entries = max_disk_entries
+            while len(self.__entries) > self.max_entries:
+                self.__entries.popitem(last=False)
+        self.__evict_disk_entries()
+
+    def __len__(self) -> int:
+        """
+        Number of results kept in memory.
+
+        Returns:
+            int: Number of results.
+        """
+        return len(self.__entries)
+
+    def __store_in_memory(self, key: str, entry: Dict[str, Any]) -> None:
+        """
+        Store an entry in memory, evicting the least recently used entries.
+
+        Args:
+            key (str): Cache key of the job.
+            entry (Dict[str, Any]): Cache entry.
+        """
+        with self.__lock:
+            self.__entries[key] = entry
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.max_entries:
+                self.__entries.popitem(last=False)
+
+    def __get_entry_path(self, key: str) -> str:
+        """
+        Get the file path of an entry kept on disk.
+
+        Args:
+            key (str): Cache key of the job.
+
+        Returns:
+            str: Entry file path.
+        """
+        return os.path.join(self.cache_directory, f"{key}.json")
+
+    def __read_entry(self, key: str) -> Dict[str, Any] | None:
+        """
+        Read an entry kept on disk, marking it as recently used.
+
+        Args:
+            key (str): Cache key of the job.
+
+        Returns:
+            Dict[str, Any] | None: Cache entry, or None if not found.
+        """
+        if not self.cache_directory:
+            return None
+
+        path = self.__get_entry_path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)
+            return entry
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.warning("Ignoring invalid cached result %s: %s", path, e)
+            return None
+
+    def __write_entry(self, key: str, entry: Dict[str, Any]) -> None:
+        """
+        Write an entry on disk, evicting the least recently used entries.
+
+        Args:
+            key (str): Cache key of the job.
+            entry (Dict[str, Any]): Cache entry.
+        """
+        if not self.cache_directory:
+            return
+
+        path = self.__get_entry_path(key)
+        try:
+            # A unique temporary file keeps concurrent writes of the same key from mixing
+            fd, temp_path = tempfile.mkstemp(dir=self.cache_directory, suffix=".tmp")
+            try:
+                with open(fd, "w", encoding="utf-8") as f:
+                    json.dump(entry, f)
+                os.replace(temp_path, path)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+        except OSError as e:
+            logging.warning("Failed to write cached result %s: %s", path, e)
+            return
+
+        self.__evict_disk_entries()
+
+    def __evict_disk_entries(self) -> None:
+        """
+        Remove the least recently used entries on disk above the size limit.
+        """
+        if not self.cache_directory:
+            return
+
+        try:
+            with os.scandir(self.cache_directory) as iterator:
+                entries = [(entry.stat().st_mtime, entry.path) for entry in iterator
+                           if entry.name.endswith(".json")]
+        except OSError:
+            return
+
+        entries.sort()
+        for _, path in entries[:max(0, len(entries) - self.max_disk_entries)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
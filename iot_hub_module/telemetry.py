@@ -0,0 +1,294 @@
+""" Module for defining class and functions to send telemetry to the IoT Hub in batches. """
+
+from typing import Any, Awaitable, Callable, Dict, List
+
+import asyncio
+import collections
+import gzip
+import json
+import logging
+
+from azure.iot.device.iothub.models import Message
+
+from iot_hub_module.offline_buffer import OfflineBuffer
+
+# Device to cloud messages are limited to 256 KB, application properties included
+MAX_MESSAGE_SIZE = 256 * 1024
+DEFAULT_MAX_BATCH_SIZE = 240 * 1024
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_MAX_QUEUED_RECORDS = 10000
+DEFAULT_DRAIN_INTERVAL = 0.5
+BATCH_PROPERTY = "rewst-batch-size"
+
+
+def build_batch_message(records: List[bytes], compression: bool = False) -> Message:
+    """
+    Build one message out of serialized telemetry records.
+
+    Args:
+        records (List[bytes]): JSON encoded records.
+        compression (bool, optional): Compress the message with gzip. Defaults to False.
+
+    Returns:
+        Message: Message with a JSON array of the records as body.
+    """
+    body = b"[" + b",".join(records) + b"]"
+    if compression:
+        message = Message(gzip.compress(body), content_encoding="gzip", content_type="application/json")
+    else:
+        message = Message(body, content_encoding="utf-8", content_type="application/json")
+    message.custom_properties[BATCH_PROPERTY] = str(len(records))
+    return message
+
+
+class TelemetryChannel:
+    """
+    Queue of telemetry records sent in the background as size bounded batch messages. A batch is sent when
+    it is full or when its first record waited for the flush interval.
+
+    With an offline buffer, batches that fail to be sent are kept on disk and drained one batch per drain
+    interval once the connection is back, live records going first.
+    """
+
+    def __init__(self, send_message: Callable[[Message], Awaitable[None]],
+                 max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 compression: bool = False,
+                 max_queued_records: int = DEFAULT_MAX_QUEUED_RECORDS,
+                 offline_buffer: OfflineBuffer = None,
+                 drain_interval: float = DEFAULT_DRAIN_INTERVAL) -> None:
+        """Constructs a new telemetry channel instance. The sender starts with the first record.
+
+        Args:
+            send_message (Callable[[Message], Awaitable[None]]): Sends a message to the IoT Hub.
+            max_batch_size (int, optional): Maximum uncompressed size of a batch in bytes. Defaults to
+                DEFAULT_MAX_BATCH_SIZE.
+            flush_interval (float, optional): Seconds a record waits for its batch to fill up. Defaults to
+                DEFAULT_FLUSH_INTERVAL.
+            compression (bool, optional): Compress the batches with gzip. Defaults to False.
+            max_queued_records (int, optional): Records kept while sending is slow or failing, the oldest are
+                dropped first. Defaults to DEFAULT_MAX_QUEUED_RECORDS.
+            offline_buffer (OfflineBuffer, optional): Buffer of the records that failed to be sent. Defaults to
+                keeping them in the queue.
+            drain_interval (float, optional): Seconds between batches drained from the offline buffer. Defaults
+                to DEFAULT_DRAIN_INTERVAL.
+        """
+        self.max_batch_size = min(max_batch_size, MAX_MESSAGE_SIZE)
+        self.flush_interval = flush_interval
+        self.compression = compression
+        self.max_queued_records = max_queued_records
+        self.offline_buffer = offline_buffer
+        self.drain_interval = drain_interval
+        self.dropped_records = 0
+
+        self.__send_message = send_message
+        self.__records: collections.deque[bytes] = collections.deque()
+        self.__queued_size = 0
+        self.__has_records = asyncio.Event()
+        self.__batch_full = asyncio.Event()
+        self.__sender: asyncio.Task | None = None
+        self.__lock = asyncio.Lock()
+        self.__online = False
+
+    def __len__(self) -> int:
+        """
+        Number of queued records.
+
+        Returns:
+            int: Number of records.
+        """
+        return len(self.__records)
+
+    def enqueue(self, record: Dict[str, Any]) -> bool:
+        """
+        Queue a telemetry record without waiting for it to be sent. Must be called from the event loop.
+
+        Args:
+            record (Dict[str, Any]): JSON serializable record.
+
+        Returns:
+            bool: False if the record was dropped.
+        """
+        data = json.dumps(record, default=str).encode("utf-8")
+        if len(data) + 2 > self.max_batch_size:
+            logging.warning("Dropping telemetry record of %d bytes above the batch size", len(data))
+            self.dropped_records += 1
+            return False
+
+        if len(self.__records) >= self.max_queued_records:
+            self.__queued_size -= len(self.__records.popleft()) + 1
+            self.dropped_records += 1
+
+        self.__records.append(data)
+        self.__queued_size += len(data) + 1
+        self.__has_records.set()
+        if self.__queued_size >= self.max_batch_size:
+            self.__batch_full.set()
+
+        self.__start()
+        return True
+
+    def resume(self) -> None:
+        """
+        Start draining the offline buffer after the connection was established. Must be called from the
+        event loop.
+        """
+        self.__online = True
+        if self.offline_buffer:
+            self.__has_records.set()
+            self.__start()
+
+    async def flush(self) -> bool:
+        """
+        Send all queued records now.
+
+        Returns:
+            bool: True if all records were sent.
+        """
+        async with self.__lock:
+            while self.__records:
+                records = self.__take_batch()
+                try:
+                    await self.__send_message(build_batch_message(records, self.compression))
+                except Exception as e:
+                    logging.warning("Failed to send %d telemetry records: %s", len(records), e)
+                    self.__online = False
+                    if self.offline_buffer is None:
+                        self.__requeue(records)
+                    else:
+                        # Keep the records queued meanwhile behind the failed batch
+                        records.extend(self.__records)
+                        self.__records.clear()
+                        self.__queued_size = 0
+                        self.__batch_full.clear()
+                        self.__has_records.clear()
+                        await self.__spill(records)
+                    return False
+                self.__online = True
+            return True
+
+    async def close(self) -> bool:
+        """
+        Send the queued records and stop the sender.
+
+        Returns:
+            bool: True if all records were sent.
+        """
+        sender, self.__sender = self.__sender, None
+        if sender is not None:
+            sender.cancel()
+            await asyncio.gather(sender, return_exceptions=True)
+        return await self.flush()
+
+    def __start(self) -> None:
+        """
+        Start the sender if not running.
+        """
+        if self.__sender is None or self.__sender.done():
+            self.__sender = asyncio.create_task(self.__run())
+
+    async def __spill(self, records: List[bytes]) -> None:
+        """
+        Keep records in the offline buffer.
+
+        Args:
+            records (List[bytes]): Records that failed to be sent.
+        """
+        try:
+            await asyncio.to_thread(self.offline_buffer.append, records)
+        except OSError as e:
+            logging.warning("Dropping %d telemetry records, failed to buffer them: %s", len(records), e)
+            self.dropped_records += len(records)
+
+    async def __drain_batch(self) -> bool:
+        """
+        Send the oldest batch of the offline buffer.
+
+        Returns:
+            bool: False if sending failed.
+        """
+        try:
+            records = await asyncio.to_thread(self.offline_buffer.peek, self.max_batch_size - 2)
+        except OSError as e:
+            logging.warning("Failed to read the offline buffer: %s", e)
+            return False
+        if not records:
+            return True
+
+        try:
+            await self.__send_message(build_batch_message(records, self.compression))
+        except Exception as e:
+            logging.warning("Failed to send %d buffered telemetry records: %s", len(records), e)
+            self.__online = False
+            return False
+
+        await asyncio.to_thread(self.offline_buffer.consume, len(records))
+        return True
+
+    def __take_batch(self) -> List[bytes]:
+        """
+        Take the oldest records that fit in one batch.
+
+        Returns:
+            List[bytes]: Records of the batch.
+        """
+        records, size = [], 2
+        while self.__records and size + len(self.__records[0]) + 1 <= self.max_batch_size:
+            data = self.__records.popleft()
+            records.append(data)
+            size += len(data) + 1
+            self.__queued_size -= len(data) + 1
+
+        if self.__queued_size < self.max_batch_size:
+            self.__batch_full.clear()
+        if not self.__records:
+            self.__has_records.clear()
+        return records
+
+    def __requeue(self, records: List[bytes]) -> None:
+        """
+        Put back records that failed to be sent, ahead of the records queued meanwhile.
+
+        Args:
+            records (List[bytes]): Records of the batch.
+        """
+        self.__records.extendleft(reversed(records))
+        self.__queued_size += sum(len(data) + 1 for data in records)
+        while len(self.__records) > self.max_queued_records:
+            self.__queued_size -= len(self.__records.popleft()) + 1
+            self.dropped_records += 1
+        self.__has_records.set()
+        if self.__queued_size >= self.max_batch_size:
+            self.__batch_full.set()
+
+    async def __run(self) -> None:
+        """
+        Send the queued records in batches until the channel is closed.
+        """
+        while True:
+            if self.__online and not self.__records and self.offline_buffer:
+                # Drain one buffered batch at a time, waking up early for live records
+                if await self.__drain_batch():
+                    if not self.__records:
+                        self.__has_records.clear()
+                    try:
+                        await asyncio.wait_for(self.__has_records.wait(), self.drain_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                continue
+
+            await self.__has_records.wait()
+            if not self.__records:
+                # Woken up to drain the offline buffer
+                self.__has_records.clear()
+                continue
+
+            # Let the batch fill up unless it is already full
+            try:
+                await asyncio.wait_for(self.__batch_full.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+
+            if not await self.flush():
+                # Do not retry a failing connection in a busy loop
+                await asyncio.sleep(self.flush_interval)
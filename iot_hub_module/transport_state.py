@@ -0,0 +1,144 @@
+""" Module for defining class and functions to remember the transport that connects to the IoT Hub. """
+
+from typing import Any, Callable, Dict, List
+
+import json
+import logging
+import os
+import tempfile
+import time
+
+MQTT = "mqtt"
+WEBSOCKETS = "websockets"
+STATE_DIRECTORY = "state"
+TRANSPORT_STATE_FILE = "transport.json"
+DEFAULT_REPROBE_INTERVAL = 24 * 3600
+DEFAULT_RACE_HEAD_START = 0.25
+
+
+class TransportState:
+    """
+    Transport that last connected to the IoT Hub, persisted in a small state file. The agent falls back to
+    websockets where MQTT is blocked, so MQTT is re-probed from time to time when websockets is preferred.
+    """
+
+    def __init__(self, state_file: str = None,
+                 reprobe_interval: float = DEFAULT_REPROBE_INTERVAL,
+                 clock: Callable[[], float] = time.time) -> None:
+        """Constructs a new transport state instance. The state file is read on first use.
+
+        Args:
+            state_file (str, optional): State file path. Defaults to memory only.
+            reprobe_interval (float, optional): Seconds between attempts of MQTT while websockets is preferred.
+                Defaults to DEFAULT_REPROBE_INTERVAL.
+            clock (Callable[[], float], optional): Clock returning UNIX timestamps. Defaults to time.time.
+        """
+        self.state_file = state_file
+        self.reprobe_interval = reprobe_interval
+
+        self.__clock = clock
+        self.__state = None
+        self.__known = False
+
+    @property
+    def preferred(self) -> str:
+        """
+        Transport that last connected.
+
+        Returns:
+            str: MQTT or WEBSOCKETS.
+        """
+        return self.__load()["transport"]
+
+    @property
+    def known(self) -> bool:
+        """
+        Whether a transport connected before.
+
+        Returns:
+            bool: True if the preferred transport is known to work.
+        """
+        self.__load()
+        return self.__known
+
+    def get_order(self) -> List[str]:
+        """
+        Get the transports to try, in order.
+
+        Returns:
+            List[str]: Transports, preferred first unless MQTT is due to be re-probed.
+        """
+        state = self.__load()
+        if state["transport"] == MQTT:
+            return [MQTT, WEBSOCKETS]
+
+        now = self.__clock()
+        if now - state.get("probed_at", 0) >= self.reprobe_interval:
+            logging.info("Probing MQTT before the preferred websockets transport")
+            state["probed_at"] = now
+            self.__save()
+            return [MQTT, WEBSOCKETS]
+
+        return [WEBSOCKETS, MQTT]
+
+    def record_success(self, transport: str) -> None:
+        """
+        Remember the transport that connected.
+
+        Args:
+            transport (str): MQTT or WEBSOCKETS.
+        """
+        state = self.__load()
+        if self.__known and state["transport"] == transport:
+            return
+
+        logging.info("Preferring the %s transport from now on", transport)
+        self.__known = True
+        state["transport"] = transport
+        if transport == WEBSOCKETS:
+            # MQTT just failed, no need to probe it again before the interval
+            state["probed_at"] = self.__clock()
+        self.__save()
+
+    def __load(self) -> Dict[str, Any]:
+        """
+        Read the state file if not done yet.
+
+        Returns:
+            Dict[str, Any]: Transport state.
+        """
+        if self.__state is not None:
+            return self.__state
+
+        self.__state = {"transport": MQTT}
+        if self.state_file:
+            try:
+                with open(self.state_file, encoding="utf-8") as f:
+                    state = json.load(f)
+                if state.get("transport") in (MQTT, WEBSOCKETS):
+                    self.__state = state
+                    self.__known = True
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError, AttributeError) as e:
+                logging.warning("Ignoring invalid transport state %s: %s", self.state_file, e)
+        return self.__state
+
+    def __save(self) -> None:
+        """
+        Write the state file atomically.
+        """
+        if not self.state_file:
+            return
+
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(self.state_file), suffix=".tmp")
+            try:
+                with open(fd, "w", encoding="utf-8") as f:
+                    json.dump(self.__state, f)
+                os.replace(temp_path, self.state_file)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+        except OSError as e:
+            logging.warning("Failed to write transport state %s: %s", self.state_file, e)
@@ -3,19 +3,29 @@
 import asyncio
 import logging
 import logging.handlers
+import multiprocessing
+import os
 import platform
 import signal
 import sys
+from typing import List
 from __version__ import __version__
 from config_module.config_io import (
     load_configuration,
+    get_hosted_org_ids,
     get_org_id_from_executable_name,
     setup_file_logging,
 )
-from iot_hub_module.connection_management import iot_hub_connection_loop
+from iot_hub_module.connection_management import iot_hub_connection_loop, multi_org_connection_loop
+from actions_module.process_pool import get_process_pool
 
 os_type = platform.system().lower()
 
+# Event loop selected by the environment, taking precedence over the "event_loop" setting of the configuration
+EVENT_LOOP_ENV_VAR = "REWST_AGENT_EVENT_LOOP"
+DEFAULT_EVENT_LOOP = "asyncio"
+UVLOOP = "uvloop"
+
 stop_event = asyncio.Event()
 
 
@@ -24,6 +34,66 @@ class ConfigurationError(Exception):
     pass
 
 
+def get_event_loop_name(commandline_args: List[str]) -> str:
+    """
+    Get the name of the event loop to run the agent on, from the environment or the configuration.
+
+    Args:
+        commandline_args (List[str]): Command line arguments used to run the executable.
+
+    Returns:
+        str: Event loop name, asyncio or uvloop.
+    """
+    name = os.environ.get(EVENT_LOOP_ENV_VAR)
+    if name:
+        return name.strip().lower()
+
+    org_ids = get_hosted_org_ids(commandline_args) or [get_org_id_from_executable_name(commandline_args)]
+    if not org_ids[0]:
+        return DEFAULT_EVENT_LOOP
+
+    try:
+        config_data = load_configuration(org_ids[0])
+    except Exception as e:
+        logging.warning(f"Failed to read the event loop setting: {e}")
+        return DEFAULT_EVENT_LOOP
+
+    return str((config_data or {}).get("event_loop", DEFAULT_EVENT_LOOP)).lower()
+
+
+def get_event_loop_policy(name: str) -> asyncio.AbstractEventLoopPolicy | None:
+    """
+    Get the policy of an event loop, falling back to the default asyncio loop when it is not available.
+
+    The policy must be installed before any event loop is created, so that the loops the IoT Hub SDK creates
+    for its handlers use it too.
+
+    Args:
+        name (str): Event loop name, asyncio or uvloop.
+
+    Returns:
+        asyncio.AbstractEventLoopPolicy | None: Event loop policy, or None for the default loop.
+    """
+    if name == DEFAULT_EVENT_LOOP:
+        return None
+
+    if name != UVLOOP:
+        logging.warning(f"Unknown event loop {name}, using {DEFAULT_EVENT_LOOP}.")
+        return None
+
+    if os_type == "windows":
+        logging.warning(f"{UVLOOP} is not supported on Windows, using {DEFAULT_EVENT_LOOP}.")
+        return None
+
+    try:
+        import uvloop
+    except ImportError:
+        logging.warning(f"{UVLOOP} is not installed, using {DEFAULT_EVENT_LOOP}.")
+        return None
+
+    return uvloop.EventLoopPolicy()
+
+
 def signal_handler() -> None:
     """
     Signal handler used in the application.
@@ -46,8 +116,10 @@ async def main(use_signals: bool = True) -> None:
 
     logging.info(f"Version: {__version__}")
     logging.info(f"Running on {os_type}")
+    logging.info(f"Event loop: {type(asyncio.get_running_loop()).__module__}")
 
     config_file = None
+    hosted_configs = []
 
     try:
         logging.info("Loading Configuration")
@@ -56,6 +128,15 @@ async def main(use_signals: bool = True) -> None:
             config_data = load_configuration(None, config_file)
             org_id = config_data["rewst_org_id"]
 
+        elif get_hosted_org_ids(sys.argv):
+            hosted_org_ids = get_hosted_org_ids(sys.argv)
+            logging.info(f"Hosting Org IDs {', '.join(hosted_org_ids)} in one process.")
+            hosted_configs = [load_configuration(hosted_org_id) for hosted_org_id in hosted_org_ids]
+            if not all(hosted_configs):
+                raise ConfigurationError("No configuration was found for every hosted Org ID.")
+            org_id = hosted_org_ids[0]
+            config_data = hosted_configs[0]
+
         else:
             org_id = get_org_id_from_executable_name(sys.argv)
             if org_id:
@@ -79,10 +160,11 @@ async def main(use_signals: bool = True) -> None:
     logging.info(f"Running for Org ID {org_id}")
 
     logging.info("Setting up file logging")
-    try:
-        setup_file_logging(org_id)
-    except Exception as e:
-        logging.exception(f"Exception occurred setting up file-based logging: {e}.")
+    for logged_org_id in [hosted_config["rewst_org_id"] for hosted_config in hosted_configs] or [org_id]:
+        try:
+            setup_file_logging(logged_org_id)
+        except Exception as e:
+            logging.exception(f"Exception occurred setting up file-based logging: {e}.")
 
     if os_type != "windows":
         # Register signal handlers for Unix-based systems
@@ -90,9 +172,20 @@ async def main(use_signals: bool = True) -> None:
         for sig in (signal.SIGTERM, signal.SIGINT):
             loop.add_signal_handler(sig, signal_handler)
 
-    await iot_hub_connection_loop(config_data, stop_event, use_signals)
+    try:
+        if len(hosted_configs) > 1:
+            await multi_org_connection_loop(hosted_configs, stop_event, use_signals)
+        else:
+            await iot_hub_connection_loop(config_data, stop_event, use_signals)
+    finally:
+        get_process_pool().shutdown(wait=False)
 
 
 # Entry point
 if __name__ == "__main__":
+    # Needed by the worker processes of the frozen executable
+    multiprocessing.freeze_support()
+    policy = get_event_loop_policy(get_event_loop_name(sys.argv))
+    if policy is not None:
+        asyncio.set_event_loop_policy(policy)
     asyncio.run(main())
@@ -4,6 +4,7 @@ import asyncio
 from typing import List
 
 import logging
+import multiprocessing
 import sys
 
 import servicemanager
@@ -118,4 +119,6 @@ def main() -> None:
 
 
 if __name__ == "__main__":
+    # Needed by the worker processes of the frozen executable
+    multiprocessing.freeze_support()
     main()
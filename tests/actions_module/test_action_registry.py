@@ -0,0 +1,69 @@
+"""
+Tests for action registry module
+"""
+
+import threading
+import pytest
+from actions_module.action_registry import (
+    ACTIONS,
+    ActionContext,
+    ActionError,
+    list_actions,
+    register_action,
+    run_action,
+)
+
+
+@pytest.fixture(name="registered_actions")
+def fixture_registered_actions():
+    """
+    Register test actions and remove them afterwards.
+    """
+
+    @register_action("test_sync")
+    def sync_action(parameters, context):
+        return {"thread": threading.current_thread().name, **parameters}
+
+    @register_action("test_async")
+    async def async_action(parameters, context):
+        return context.config_data
+
+    yield
+
+    ACTIONS.pop("test_sync")
+    ACTIONS.pop("test_async")
+
+
+@pytest.mark.asyncio
+async def test_run_action(registered_actions) -> None:
+    """
+    Test run_action().
+    """
+    result = await run_action("test_sync", {"hello": "world"})
+    assert result["hello"] == "world"
+    assert result["thread"] != threading.current_thread().name
+
+    assert await run_action("test_async", None, ActionContext({"a": 1})) == {"a": 1}
+    assert await run_action("test_async") == {}
+
+
+@pytest.mark.asyncio
+async def test_run_action_errors(registered_actions) -> None:
+    """
+    Test run_action() with an unknown action and invalid parameters.
+    """
+    with pytest.raises(ActionError):
+        await run_action("unknown")
+
+    with pytest.raises(ActionError):
+        await run_action("test_sync", ["not", "a", "dict"])
+
+
+def test_list_actions(registered_actions) -> None:
+    """
+    Test list_actions().
+    """
+    actions = list_actions()
+    assert "test_sync" in actions
+    assert "process_list" in actions
+    assert actions == sorted(actions)
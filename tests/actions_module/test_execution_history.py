@@ -0,0 +1,42 @@
+"""
+Tests for execution history module
+"""
+
+import time
+import pytest
+from actions_module.action_registry import ActionContext, ActionError
+from actions_module.execution_history import execution_history
+from iot_hub_module.execution_journal import ExecutionJournal
+
+
+def test_execution_history(tmp_path) -> None:
+    """
+    Test the execution_history action.
+
+    Args:
+        tmp_path (Path): Temporary directory of the journal.
+    """
+    journal = ExecutionJournal(str(tmp_path / "journal.sqlite3"))
+    started_at = time.time() - 7200
+    journal.record("commands", started_at, 2.0, script_hash="x", exit_code=0)
+    journal.record("action", started_at + 1, 1.0, name="disk_usage")
+    context = ActionContext(execution_journal=journal)
+
+    result = execution_history({"limit": 1}, context)
+    assert [execution["kind"] for execution in result["executions"]] == ["action"]
+
+    result = execution_history({"kind": "commands"}, context)
+    assert [execution["script_hash"] for execution in result["executions"]] == ["x"]
+
+    result = execution_history({"hours": 1}, context)
+    assert result["executions"] == []
+
+    result = execution_history({"group_by": "kind"}, context)
+    assert {aggregate["kind"]: aggregate["executions"] for aggregate in result["aggregates"]} == {
+        "commands": 1, "action": 1
+    }
+
+    with pytest.raises(ActionError):
+        execution_history({"group_by": "post_id"}, context)
+    with pytest.raises(ActionError):
+        execution_history({}, ActionContext())
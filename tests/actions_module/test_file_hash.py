@@ -0,0 +1,166 @@
+"""
+Tests for file hash module
+"""
+
+import asyncio
+import hashlib
+import os
+import threading
+import time
+import pytest
+from pytest_mock import MockerFixture
+from actions_module.action_registry import ActionContext, ActionError
+from actions_module.process_pool import get_process_pool
+from actions_module.file_hash import (
+    CACHE_DIRECTORY,
+    HashCache,
+    expand_paths,
+    file_hash,
+    hash_file,
+)
+
+
+@pytest.fixture(name="files")
+def fixture_files(tmp_path):
+    """
+    Create files to hash.
+    """
+    files = {}
+    for index in range(5):
+        path = tmp_path / f"file{index}.bin"
+        content = os.urandom(1024 * 1024 * index + 7)
+        path.write_bytes(content)
+        files[str(path)] = hashlib.sha256(content).hexdigest()
+    return files
+
+
+def test_hash_file(files) -> None:
+    """
+    Test hash_file().
+    """
+    for path, digest in files.items():
+        result, file_stat = hash_file(path, "sha256")
+        assert result == digest
+        assert file_stat.st_size == os.path.getsize(path)
+
+
+def test_expand_paths(files, tmp_path) -> None:
+    """
+    Test expand_paths().
+    """
+    first = sorted(files)[0]
+    assert expand_paths([first, str(tmp_path / "*.bin"), str(tmp_path)]) == [first] + sorted(files)[1:]
+
+
+@pytest.mark.asyncio
+async def test_file_hash(files, tmp_path) -> None:
+    """
+    Test file_hash().
+    """
+    pages = []
+
+    async def send_page(page) -> None:
+        pages.append(page)
+
+    result = await file_hash(
+        {"paths": [str(tmp_path / "*.bin"), str(tmp_path / "missing.bin")], "page_size": 2},
+        ActionContext(send_page=send_page),
+    )
+    results = [item for page in pages for item in page] + result["results"]
+    assert {item["path"]: item.get("digest") for item in results} == {
+        **files, str(tmp_path / "missing.bin"): None
+    }
+    assert result["pages_sent"] == 3
+    assert result["hashed"] == 5
+    assert result["errors"] == 1
+
+    # Hash in the shared process pool
+    result = await file_hash({"paths": [str(tmp_path / "*.bin")], "use_processes": True}, ActionContext())
+    get_process_pool().shutdown()
+    assert {item["path"]: item["digest"] for item in result["results"]} == files
+
+    result = await file_hash({"paths": sorted(files)[0], "algorithm": "MD5"}, ActionContext())
+    assert result["algorithm"] == "md5"
+    assert len(result["results"][0]["digest"]) == 32
+
+    with pytest.raises(ActionError):
+        await file_hash({}, ActionContext())
+
+    with pytest.raises(ActionError):
+        await file_hash({"paths": ["a"], "algorithm": "unknown"}, ActionContext())
+
+
+@pytest.mark.asyncio
+async def test_file_hash_cache(mocker: MockerFixture, files, tmp_path) -> None:
+    """
+    Test file_hash() skipping unchanged files using the cache.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+    """
+    context = ActionContext(data_directory=str(tmp_path / "data"))
+    parameters = {"paths": [str(tmp_path / "*.bin")], "use_cache": True}
+
+    result = await file_hash(parameters, context)
+    assert result["hashed"] == 5
+
+    mocked_hash = mocker.patch("actions_module.file_hash.hash_file", side_effect=hash_file)
+    result = await file_hash(parameters, context)
+    assert result["cached"] == 5
+    assert {item["path"]: item["digest"] for item in result["results"]} == files
+    mocked_hash.assert_not_called()
+
+    # Changed files are hashed again
+    changed = sorted(files)[0]
+    with open(changed, "ab") as f:
+        f.write(b"changed")
+    result = await file_hash(parameters, context)
+    assert result["cached"] == 4
+    assert result["hashed"] == 1
+
+    # Invalid cache files are ignored
+    cache_path = tmp_path / "data" / CACHE_DIRECTORY / "sha256.json"
+    cache_path.write_text("not json")
+    assert HashCache(str(cache_path)).entries == {}
+
+
+@pytest.mark.asyncio
+async def test_file_hash_concurrent_cache(files, tmp_path) -> None:
+    """
+    Test concurrent file_hash() invocations saving the same cache.
+    """
+    context = ActionContext(data_directory=str(tmp_path / "data"))
+    parameters = {"paths": [str(tmp_path / "*.bin")], "use_cache": True}
+
+    results = await asyncio.gather(*(file_hash(parameters, context) for _ in range(4)))
+    assert all(len(result["results"]) == 5 for result in results)
+    assert os.listdir(tmp_path / "data" / CACHE_DIRECTORY) == ["sha256.json"]
+    assert len(HashCache(str(tmp_path / "data" / CACHE_DIRECTORY / "sha256.json")).entries) == 5
+
+
+@pytest.mark.asyncio
+async def test_file_hash_cancelled(mocker: MockerFixture, files, tmp_path) -> None:
+    """
+    Test file_hash() not blocking the event loop on the running hashes when cancelled.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+    """
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_hash(path, algorithm, cache, pool):
+        started.set()
+        release.wait(5)
+        return {"path": path, "error": "slow"}
+
+    mocker.patch("actions_module.file_hash.hash_path", side_effect=slow_hash)
+    task = asyncio.create_task(file_hash({"paths": list(files), "max_workers": 1}, ActionContext()))
+    await asyncio.to_thread(started.wait, 5)
+
+    start = time.monotonic()
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert time.monotonic() - start < 1
+    release.set()
@@ -0,0 +1,166 @@
+"""
+Tests for file search module
+"""
+
+import asyncio
+import os
+import time
+import pytest
+from actions_module.action_registry import ActionContext, ActionError
+from actions_module.file_search import (
+    INDEX_DIRECTORY,
+    SearchFilter,
+    file_search,
+    get_index_path,
+    load_index,
+)
+
+
+@pytest.fixture(name="tree")
+def fixture_tree(tmp_path):
+    """
+    Create a directory tree to search.
+    """
+    root = tmp_path / "root"
+    for index in range(3):
+        subtree = root / f"dir{index}" / "nested"
+        subtree.mkdir(parents=True)
+        (subtree / f"report{index}.log").write_text("x" * (index + 1) * 100)
+        (subtree / f"notes{index}.txt").write_text("notes")
+    (root / "top.LOG").write_text("top")
+    return root
+
+
+def test_search_filter() -> None:
+    """
+    Test SearchFilter.matches().
+    """
+    search_filter = SearchFilter({"name": "Report*", "extensions": ["log"], "min_size": 10, "max_size": 100})
+    assert search_filter.matches("report.LOG", False, 50, 0)
+    assert not search_filter.matches("report.txt", False, 50, 0)
+    assert not search_filter.matches("other.log", False, 50, 0)
+    assert not search_filter.matches("report.log", False, 5, 0)
+    assert not search_filter.matches("report.log", False, 500, 0)
+    assert not search_filter.matches("report.log", True, 50, 0)
+
+    search_filter = SearchFilter({"name": "Report*", "case_sensitive": True, "include_dirs": True})
+    assert search_filter.matches("Report", True, 0, 0)
+    assert not search_filter.matches("report", True, 0, 0)
+
+    search_filter = SearchFilter({"modified_after": 100, "modified_before": 200})
+    assert search_filter.matches("file", False, 0, 150)
+    assert not search_filter.matches("file", False, 0, 50)
+    assert not search_filter.matches("file", False, 0, 250)
+
+
+@pytest.mark.asyncio
+async def test_file_search(tree) -> None:
+    """
+    Test file_search() with filters.
+    """
+    result = await file_search({"root": str(tree), "extensions": [".log"]}, ActionContext())
+    paths = sorted(os.path.relpath(match["path"], tree) for match in result["matches"])
+    assert paths == [
+        os.path.join("dir0", "nested", "report0.log"),
+        os.path.join("dir1", "nested", "report1.log"),
+        os.path.join("dir2", "nested", "report2.log"),
+        "top.LOG",
+    ]
+    assert result["total_matches"] == 4
+    assert result["truncated"] is False
+
+    result = await file_search({"root": str(tree), "name": "report*", "min_size": 150}, ActionContext())
+    assert sorted(match["size"] for match in result["matches"]) == [200, 300]
+
+    result = await file_search(
+        {"roots": [str(tree)], "modified_after": time.time() + 3600}, ActionContext()
+    )
+    assert result["total_matches"] == 0
+
+    with pytest.raises(ActionError):
+        await file_search({}, ActionContext())
+
+    with pytest.raises(ActionError):
+        await file_search({"root": str(tree / "missing")}, ActionContext())
+
+
+@pytest.mark.asyncio
+async def test_file_search_pages(tree) -> None:
+    """
+    Test file_search() streaming pages and limiting the results.
+    """
+    pages = []
+
+    async def send_page(page) -> None:
+        pages.append(page)
+
+    result = await file_search({"root": str(tree), "page_size": 2}, ActionContext(send_page=send_page))
+    assert result["total_matches"] == 7
+    assert result["pages_sent"] == 3
+    assert [len(page) for page in pages] == [2, 2, 2]
+    assert len(result["matches"]) == 1
+
+    result = await file_search({"root": str(tree), "max_results": 3}, ActionContext())
+    assert result["total_matches"] == 3
+    assert result["truncated"] is True
+
+
+@pytest.mark.asyncio
+async def test_file_search_index(tree, tmp_path) -> None:
+    """
+    Test file_search() keeping an index refreshed by modification time.
+    """
+    data_directory = tmp_path / "data"
+    parameters = {"root": str(tree), "extensions": [".txt"], "use_index": True}
+
+    result = await file_search(parameters, ActionContext(data_directory=str(data_directory)))
+    assert result["total_matches"] == 3
+    assert result["directories_from_index"] == 0
+
+    index_path = get_index_path(str(data_directory / INDEX_DIRECTORY), str(tree))
+    assert str(tree / "dir0" / "nested") in load_index(index_path)
+
+    result = await file_search(parameters, ActionContext(data_directory=str(data_directory)))
+    assert result["total_matches"] == 3
+    assert result["directories_scanned"] == 0
+
+    # Only the changed directory is scanned again
+    new_file = tree / "dir1" / "nested" / "new.txt"
+    new_file.write_text("new")
+    os.utime(new_file.parent, (time.time() + 10, time.time() + 10))
+
+    result = await file_search(parameters, ActionContext(data_directory=str(data_directory)))
+    assert result["total_matches"] == 4
+    assert result["directories_scanned"] == 1
+
+    # Files rewritten in place do not change their directory, they are matched on their new size
+    # once the index is older than max_index_age
+    directory = tree / "dir2" / "nested"
+    directory_mtime = os.stat(directory).st_mtime
+    (directory / "notes2.txt").write_text("x" * 1000)
+    os.utime(directory, (directory_mtime, directory_mtime))
+
+    sized = {**parameters, "min_size": 100}
+    result = await file_search(sized, ActionContext(data_directory=str(data_directory)))
+    assert result["total_matches"] == 0
+    assert result["directories_scanned"] == 0
+
+    result = await file_search({**sized, "max_index_age": 0}, ActionContext(data_directory=str(data_directory)))
+    assert result["total_matches"] == 1
+    assert result["directories_from_index"] == 0
+    assert result["matches"][0]["size"] == 1000
+
+    # Concurrent searches of the same root both save the index
+    results = await asyncio.gather(*(
+        file_search(parameters, ActionContext(data_directory=str(data_directory))) for _ in range(4)
+    ))
+    assert all(result["total_matches"] == 4 for result in results)
+    assert os.listdir(data_directory / INDEX_DIRECTORY) == [os.path.basename(index_path)]
+
+    # Invalid index files are ignored
+    with open(index_path, "w") as f:
+        f.write("not json")
+    assert load_index(index_path) == {}
+
+    with pytest.raises(ActionError):
+        await file_search(parameters, ActionContext())
@@ -0,0 +1,142 @@
+"""
+Tests for log tail module
+"""
+
+import asyncio
+import io
+import os
+import pytest
+from pytest_mock import MockerFixture
+from actions_module.action_registry import ActionContext, ActionError
+from actions_module import log_tail as log_tail_module
+from actions_module.log_tail import LogFollower, log_tail, read_last_lines
+
+
+@pytest.mark.parametrize("count", (0, 1, 5, 1000))
+def test_read_last_lines(mocker: MockerFixture, count: int) -> None:
+    """
+    Test read_last_lines() across block boundaries.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+        count (int): Number of lines to read.
+    """
+    mocker.patch(f"{log_tail_module.__name__}.READ_BLOCK_SIZE", 16)
+    lines = [f"line number {index}".encode() for index in range(100)]
+    expected = lines[-count:] if count else []
+    data = b"\r\n".join(lines) + b"\r\n"
+
+    assert read_last_lines(io.BytesIO(data), count, len(data)) == expected
+
+    # Last line without line ending
+    data = b"\n".join(lines)
+    assert read_last_lines(io.BytesIO(data), count, len(data)) == expected
+
+
+def test_log_follower(tmp_path) -> None:
+    """
+    Test LogFollower.read_new_lines() with appends, rotation and truncation.
+    """
+    path = tmp_path / "agent.log"
+    path.write_bytes(b"old\n")
+
+    f = open(path, "rb")
+    follower = LogFollower(str(path), f, os.path.getsize(path))
+    assert follower.read_new_lines() == []
+
+    with open(path, "ab") as log:
+        log.write(b"first\r\nsecond")
+    assert follower.read_new_lines() == [b"first"]
+
+    # Rotate the file, the rest of the old file is still read
+    with open(path, "ab") as log:
+        log.write(b" half\n")
+    os.rename(path, tmp_path / "agent.log.1")
+    path.write_bytes(b"new\n")
+    assert follower.read_new_lines() == [b"second half", b"new"]
+    assert follower.rotations == 1
+
+    # Truncate the file
+    path.write_bytes(b"")
+    with open(path, "ab") as log:
+        log.write(b"x\n")
+    assert follower.read_new_lines() == [b"x"]
+    assert follower.rotations == 2
+
+    follower.close()
+
+
+@pytest.mark.asyncio
+async def test_log_tail(tmp_path, mocker: MockerFixture) -> None:
+    """
+    Test log_tail() without following.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+    """
+    path = tmp_path / "agent.log"
+    path.write_text("\n".join(f"line {index}" for index in range(10)) + "\n")
+
+    result = await log_tail({"path": str(path), "lines": 3}, ActionContext())
+    assert result == {"path": str(path), "lines": ["line 7", "line 8", "line 9"]}
+
+    mocker.patch(f"{log_tail_module.__name__}.get_logging_path", return_value=str(path))
+    result = await log_tail({"agent_log": True, "lines": 1}, ActionContext({"rewst_org_id": "org"}))
+    assert result["lines"] == ["line 9"]
+
+    with pytest.raises(ActionError):
+        await log_tail({}, ActionContext())
+
+    with pytest.raises(ActionError):
+        await log_tail({"path": str(tmp_path / "missing.log")}, ActionContext())
+
+    # Lines are split on line feed bytes, which other encodings do not use
+    result = await log_tail({"path": str(path), "lines": 1, "encoding": "latin-1"}, ActionContext())
+    assert result["lines"] == ["line 9"]
+    for encoding in ("utf-16", "utf-32-le", "not-an-encoding"):
+        with pytest.raises(ActionError):
+            await log_tail({"path": str(path), "encoding": encoding}, ActionContext())
+
+
+@pytest.mark.asyncio
+async def test_log_tail_follow(tmp_path, mocker: MockerFixture) -> None:
+    """
+    Test log_tail() following the file for a bounded duration.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+    """
+    mocker.patch(f"{log_tail_module.__name__}.POLL_INTERVAL", 0.01)
+    path = tmp_path / "agent.log"
+    path.write_text("start\n")
+    pages = []
+
+    async def send_page(page) -> None:
+        pages.append(page["lines"])
+
+    async def write_lines() -> None:
+        for index in range(5):
+            await asyncio.sleep(0.03)
+            with open(path, "a") as log:
+                log.write(f"new {index}\n")
+
+    leave_slot = mocker.AsyncMock()
+    result, _ = await asyncio.gather(
+        log_tail(
+            {"path": str(path), "lines": 1, "follow": 0.4, "chunk_interval": 0.01, "max_chunk_lines": 2},
+            ActionContext(send_page=send_page, leave_slot=leave_slot),
+        ),
+        write_lines(),
+    )
+    leave_slot.assert_awaited_once()
+    streamed = [line for page in pages for line in page] + result["lines"]
+    assert streamed == ["start"] + [f"new {index}" for index in range(5)]
+    assert all(len(page) <= 2 for page in pages)
+    assert result["rotations"] == 0
+
+    # Without streaming all lines are returned at the end
+    result, _ = await asyncio.gather(
+        log_tail({"path": str(path), "lines": 0, "follow": 0.3}, ActionContext()),
+        write_lines(),
+    )
+    assert result["lines"] == [f"new {index}" for index in range(5)]
@@ -0,0 +1,106 @@
+"""
+Tests for port check module
+"""
+
+import asyncio
+import socket
+import pytest
+from pytest_mock import MockerFixture
+from actions_module.action_registry import ActionContext, ActionError
+from actions_module.port_check import parse_targets, port_check
+
+
+def get_closed_port() -> int:
+    """
+    Get a loopback port with no listener.
+
+    Returns:
+        int: Port number.
+    """
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_parse_targets() -> None:
+    """
+    Test parse_targets().
+    """
+    assert parse_targets({
+        "targets": ["host:443", "[::1]:80", {"host": "other", "port": "22"}],
+        "hosts": ["a", "b"],
+        "ports": [1],
+    }) == [("host", 443), ("::1", 80), ("other", 22), ("a", 1), ("b", 1)]
+
+    for parameters in ({}, {"targets": ["host"]}, {"targets": ["host:0"]}, {"targets": [":80"]},
+                       {"hosts": ["a"], "ports": ["http"]}, {"hosts": ["a"], "ports": [None]}):
+        with pytest.raises(ActionError):
+            parse_targets(parameters)
+
+
+@pytest.mark.asyncio
+async def test_port_check() -> None:
+    """
+    Test port_check() against loopback listeners.
+    """
+    connections = 0
+
+    async def on_connect(reader, writer) -> None:
+        nonlocal connections
+        connections += 1
+        writer.close()
+
+    servers = [await asyncio.start_server(on_connect, "127.0.0.1", 0) for _ in range(20)]
+    open_ports = [server.sockets[0].getsockname()[1] for server in servers]
+    closed_port = get_closed_port()
+
+    try:
+        results = await port_check(
+            {"hosts": ["127.0.0.1"], "ports": open_ports + [closed_port], "concurrency": 5},
+            ActionContext(),
+        )
+    finally:
+        for server in servers:
+            server.close()
+            await server.wait_closed()
+
+    assert [result["port"] for result in results] == open_ports + [closed_port]
+    assert all(result["status"] == "open" and result["latency_ms"] >= 0 for result in results[:-1])
+    assert results[-1]["status"] == "refused"
+    assert results[-1]["latency_ms"] is None
+    assert connections == len(open_ports)
+
+
+@pytest.mark.asyncio
+async def test_port_check_concurrency(mocker: MockerFixture) -> None:
+    """
+    Test port_check() limiting the concurrent connections and timing out.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+    """
+    running = 0
+    max_running = 0
+
+    async def slow_connection(host, port):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        try:
+            await asyncio.sleep(1)
+        finally:
+            running -= 1
+
+    mocker.patch("asyncio.open_connection", side_effect=slow_connection)
+
+    results = await port_check(
+        {"targets": [f"10.0.0.{index}:443" for index in range(10)], "concurrency": 3, "timeout": 0.05},
+        ActionContext(),
+    )
+    assert all(result["status"] == "timeout" for result in results)
+    assert max_running == 3
+
+    mocker.patch("asyncio.open_connection", side_effect=OSError("unreachable"))
+    results = await port_check({"targets": ["10.0.0.1:443"]}, ActionContext())
+    assert results[0]["status"] == "error"
+    assert results[0]["error"] == "unreachable"
@@ -0,0 +1,139 @@
+"""
+Tests for process pool module
+"""
+
+import os
+import pytest
+from pytest_mock import MockerFixture
+from actions_module.action_registry import ActionContext
+from actions_module import process_pool as process_pool_module
+from actions_module.process_pool import (
+    SharedProcessPool,
+    encode_json,
+    get_cpu_limit,
+    get_default_max_workers,
+    get_process_pool,
+    get_start_method,
+    process_pool_status,
+    read_cgroup_cpu_limit,
+)
+
+# Constants
+MODULE = process_pool_module.__name__
+
+
+@pytest.mark.parametrize(
+    "cpu_max, expected", (("max 100000\n", None), ("150000 100000\n", 1.5), ("invalid", None))
+)
+def test_read_cgroup_cpu_limit_v2(mocker: MockerFixture, tmp_path, cpu_max: str, expected) -> None:
+    """
+    Test read_cgroup_cpu_limit() with cgroup v2.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+        cpu_max (str): Content of the cpu.max file.
+        expected (float | None): Expected CPU limit.
+    """
+    path = tmp_path / "cpu.max"
+    path.write_text(cpu_max)
+    mocker.patch(f"{MODULE}.CGROUP_V2_CPU_MAX", str(path))
+    mocker.patch(f"{MODULE}.CGROUP_V1_CPU_QUOTA", str(tmp_path / "missing"))
+
+    assert read_cgroup_cpu_limit() == expected
+
+
+@pytest.mark.parametrize("quota, expected", (("-1", None), ("250000", 2.5)))
+def test_read_cgroup_cpu_limit_v1(mocker: MockerFixture, tmp_path, quota: str, expected) -> None:
+    """
+    Test read_cgroup_cpu_limit() with cgroup v1.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+        quota (str): Content of the cpu.cfs_quota_us file.
+        expected (float | None): Expected CPU limit.
+    """
+    (tmp_path / "quota").write_text(quota)
+    (tmp_path / "period").write_text("100000")
+    mocker.patch(f"{MODULE}.CGROUP_V2_CPU_MAX", str(tmp_path / "missing"))
+    mocker.patch(f"{MODULE}.CGROUP_V1_CPU_QUOTA", str(tmp_path / "quota"))
+    mocker.patch(f"{MODULE}.CGROUP_V1_CPU_PERIOD", str(tmp_path / "period"))
+
+    assert read_cgroup_cpu_limit() == expected
+
+
+def test_get_cpu_limit(mocker: MockerFixture) -> None:
+    """
+    Test get_cpu_limit() and get_default_max_workers().
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+    """
+    mocker.patch("os.sched_getaffinity", create=True, return_value={0, 1, 2, 3, 4, 5, 6, 7})
+    mocker.patch(f"{MODULE}.read_cgroup_cpu_limit", return_value=2.5)
+    assert get_cpu_limit() == 3
+    assert get_default_max_workers() == 2
+
+    mocker.patch(f"{MODULE}.read_cgroup_cpu_limit", return_value=None)
+    assert get_cpu_limit() == 8
+
+    mocker.patch(f"{MODULE}.read_cgroup_cpu_limit", return_value=0.5)
+    assert get_cpu_limit() == 1
+    assert get_default_max_workers() == 1
+
+
+def test_get_start_method(mocker: MockerFixture) -> None:
+    """
+    Test get_start_method().
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+    """
+    mocker.patch("multiprocessing.get_all_start_methods", return_value=["fork", "spawn", "forkserver"])
+    assert get_start_method() == "forkserver"
+
+    mocker.patch("multiprocessing.get_all_start_methods", return_value=["spawn"])
+    assert get_start_method() == "spawn"
+
+
+@pytest.mark.asyncio
+async def test_shared_process_pool() -> None:
+    """
+    Test SharedProcessPool running jobs in worker processes.
+    """
+    pool = SharedProcessPool(max_workers=2)
+    assert pool.metrics()["started"] is False
+
+    try:
+        assert await pool.run(encode_json, {"hello": "world"}) == b'{"hello": "world"}'
+        assert await pool.run(os.getpid) != os.getpid()
+
+        with pytest.raises(TypeError):
+            await pool.run(encode_json, {"not": object()})
+
+        metrics = pool.metrics()
+        assert metrics["started"] is True
+        assert metrics["completed"] == 2
+        assert metrics["failed"] == 1
+        assert metrics["busy"] == 0
+        assert metrics["queued"] == 0
+
+        pool.resize(1)
+        assert pool.metrics()["started"] is False
+        assert await pool.run(encode_json, 1) == b"1"
+        assert pool.metrics()["max_workers"] == 1
+
+        # Clamped sizes equal to the current one keep the running workers
+        pool.resize(0)
+        assert pool.metrics()["started"] is True
+        assert pool.metrics()["max_workers"] == 1
+    finally:
+        pool.shutdown()
+
+    assert pool.metrics()["started"] is False
+
+
+def test_process_pool_status() -> None:
+    """
+    Test process_pool_status().
+    """
+    assert process_pool_status({}, ActionContext()) == get_process_pool().metrics()
@@ -0,0 +1,109 @@
+"""
+Tests for system actions module
+"""
+
+import os
+import psutil
+import pytest
+from pytest_mock import MockerFixture
+from actions_module.action_registry import ActionContext, ActionError
+from actions_module.system_actions import (
+    disk_usage,
+    file_exists,
+    network_interfaces,
+    process_list,
+    service_status,
+)
+
+# Constants
+CONTEXT = ActionContext()
+
+
+def test_process_list() -> None:
+    """
+    Test process_list().
+    """
+    processes = process_list({}, CONTEXT)
+    assert os.getpid() in [process["pid"] for process in processes]
+
+    name = psutil.Process().name()
+    filtered = process_list({"name": name.upper()}, CONTEXT)
+    assert filtered
+    assert all(process["name"] == name for process in filtered)
+    assert "rss" in filtered[0]
+
+
+def test_disk_usage(tmp_path) -> None:
+    """
+    Test disk_usage().
+    """
+    assert isinstance(disk_usage({}, CONTEXT), list)
+
+    disks = disk_usage({"path": str(tmp_path)}, CONTEXT)
+    assert len(disks) == 1
+    assert disks[0]["total"] > 0
+
+    with pytest.raises(ActionError):
+        disk_usage({"path": str(tmp_path / "missing")}, CONTEXT)
+
+
+@pytest.mark.parametrize("platform", ("Windows", "Linux", "Darwin"))
+def test_service_status(mocker: MockerFixture, platform: str) -> None:
+    """
+    Test service_status().
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+        platform (str): Current platform parameter.
+    """
+    mocker.patch("platform.system", return_value=platform)
+
+    with pytest.raises(ActionError):
+        service_status({}, CONTEXT)
+
+    if platform == "Windows":
+        mocked_service = mocker.MagicMock()
+        mocked_service.as_dict.return_value = {
+            "status": "running", "pid": 4, "start_type": "automatic", "display_name": "Test"
+        }
+        mocked_get = mocker.patch("psutil.win_service_get", create=True, return_value=mocked_service)
+        assert service_status({"name": "Test"}, CONTEXT)["status"] == "running"
+
+        mocked_get.side_effect = psutil.NoSuchProcess(0)
+        assert service_status({"name": "Test"}, CONTEXT)["exists"] is False
+    else:
+        status = service_status({"name": psutil.Process().name()}, CONTEXT)
+        assert status["status"] == "running"
+
+        status = service_status({"name": "not-a-real-service"}, CONTEXT)
+        assert status["exists"] is False
+
+
+def test_network_interfaces() -> None:
+    """
+    Test network_interfaces().
+    """
+    interfaces = network_interfaces({}, CONTEXT)
+    assert interfaces
+    for interface in interfaces.values():
+        assert "addresses" in interface
+
+
+def test_file_exists(tmp_path) -> None:
+    """
+    Test file_exists().
+    """
+    file_path = tmp_path / "file.txt"
+    file_path.write_text("hello")
+
+    result = file_exists({"path": str(file_path)}, CONTEXT)
+    assert result["exists"] and result["is_file"] and not result["is_dir"]
+    assert result["size"] == 5
+
+    assert file_exists({"path": str(tmp_path)}, CONTEXT)["is_dir"]
+    assert file_exists({"path": str(tmp_path / "missing")}, CONTEXT) == {
+        "path": str(tmp_path / "missing"), "exists": False
+    }
+
+    with pytest.raises(ActionError):
+        file_exists({}, CONTEXT)
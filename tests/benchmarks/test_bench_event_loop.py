@@ -0,0 +1,38 @@
+"""
+Tests for event loop benchmark
+"""
+
+import asyncio
+import sys
+import types
+from pytest_mock import MockerFixture
+from benchmarks.bench_event_loop import run_workloads
+
+
+def test_run_workloads(mocker: MockerFixture) -> None:
+    """
+    Test run_workloads() runs each workload on each event loop and reports the speedup of uvloop.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+    """
+    mocker.patch("rewst_remote_agent.os_type", "linux")
+    uvloop = types.ModuleType("uvloop")
+    uvloop.EventLoopPolicy = asyncio.DefaultEventLoopPolicy
+    mocker.patch.dict(sys.modules, {"uvloop": uvloop})
+
+    report = run_workloads(["subprocess", "http"], 4, 2)
+
+    assert report["event_loops"] == ["asyncio", "uvloop"]
+    for workload in ("subprocess", "http"):
+        results = report["results"][workload]
+        for loop in report["event_loops"]:
+            assert results[loop]["ops_per_sec"] > 0
+            assert results[loop]["p50_ms"] <= results[loop]["p99_ms"]
+        assert results["uvloop_speedup"] > 0
+
+    # Only the default event loop without uvloop
+    mocker.patch.dict(sys.modules, {"uvloop": None})
+    report = run_workloads(["http"], 2, 1)
+    assert report["event_loops"] == ["asyncio"]
+    assert "uvloop_speedup" not in report["results"]["http"]
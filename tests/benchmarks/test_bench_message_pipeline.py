@@ -0,0 +1,59 @@
+"""
+Tests for message pipeline benchmark
+"""
+
+import json
+import shutil
+import pytest
+from pytest_mock import MockerFixture
+from benchmarks.bench_message_pipeline import NATIVE, make_script, percentile, run_benchmarks
+
+
+def test_make_script() -> None:
+    """
+    Test make_script() makes scripts of the requested size.
+    """
+    for size in (1, 64, 4096):
+        script = make_script("bash", size)
+        assert size <= len(script) < size + 80
+        assert all(line.startswith("echo '") for line in script.splitlines())
+
+
+def test_percentile() -> None:
+    """
+    Test percentile() in milliseconds.
+    """
+    latencies = [i / 1000 for i in range(1, 101)]
+
+    assert percentile(latencies, 50) == pytest.approx(50.5)
+    assert percentile(latencies, 99) == pytest.approx(99.01)
+    assert percentile([0.002], 95) == 2.0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("interpreter", [
+    NATIVE,
+    pytest.param("bash", marks=pytest.mark.skipif(shutil.which("bash") is None, reason="Needs bash")),
+])
+async def test_run_benchmarks(mocker: MockerFixture, tmp_path, interpreter: str) -> None:
+    """
+    Test run_benchmarks() handles every message and reports the results as JSON.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+        tmp_path (Path): Temporary directory.
+        interpreter (str): Interpreter of the benchmark.
+    """
+    mocker.patch("iot_hub_module.connection_management.get_data_directory", return_value=str(tmp_path))
+
+    report = await run_benchmarks([interpreter], [64], [1, 2], messages=3)
+
+    assert [result["concurrency"] for result in report["results"]] == [1, 2]
+    for result in report["results"]:
+        assert result["interpreter"] == interpreter
+        assert result["posted"] == 3
+        assert result["errors"] == 0 and result["busy"] == 0
+        assert result["messages_per_sec"] > 0
+        assert 0 < result["p50_ms"] <= result["p95_ms"] <= result["p99_ms"]
+        assert result["peak_rss"] > 0
+    json.dumps(report)
@@ -1,5 +1,7 @@
 """ Test module for config_module.config_io """
 
+import contextvars
+import logging
 import os
 from uuid import uuid4
 import unittest
@@ -12,10 +14,14 @@ from config_module.config_io import (
     get_service_executable_path,
     get_logging_path,
     get_config_file_path,
+    get_data_directory,
     save_configuration,
     load_configuration,
     get_org_id_from_executable_name,
+    get_hosted_org_ids,
     setup_file_logging,
+    logging_org_id,
+    OrgLogFilter,
 )
 
 
@@ -380,6 +386,24 @@ class TestConfigIO(unittest.TestCase):
         mock_error.assert_called()
         mock_info.assert_called()
 
+    @patch("config_module.config_io.get_config_file_path")
+    @patch("os.makedirs")
+    def test_get_data_directory(
+        self, mock_makedirs: MagicMock, mock_config_path: MagicMock
+    ) -> None:
+        """Test the get_data_directory() function
+
+        Args:
+            mock_makedirs (MagicMock): Mock instance for os.makedirs() function
+            mock_config_path (MagicMock): Mock instance for get_config_file_path() function
+        """
+
+        mock_config_path.return_value = os.path.join("config", ORG_ID, "config.json")
+
+        path = get_data_directory(ORG_ID, "index")
+        self.assertEqual(path, os.path.join("config", ORG_ID, "index"))
+        mock_makedirs.assert_called_with(path, exist_ok=True)
+
     @patch("config_module.config_io.os_type", "windows")
     @patch("logging.error")
     @patch("logging.info")
@@ -480,6 +504,15 @@ class TestConfigIO(unittest.TestCase):
         org_id = get_org_id_from_executable_name(args)
         self.assertEqual(org_id, ORG_ID)
 
+    def test_get_hosted_org_ids(self) -> None:
+        """Test the get_hosted_org_ids() function"""
+
+        other_org_id = str(uuid4())
+        args = ["rewst_remote_agent", "--org-id", ORG_ID, f"--org-id={other_org_id}", "--org-id", ORG_ID]
+        self.assertEqual(get_hosted_org_ids(args), [ORG_ID, other_org_id])
+        self.assertEqual(get_hosted_org_ids([f"rewst_remote_agent_{ORG_ID}.win.exe"]), [])
+        self.assertEqual(get_hosted_org_ids(["rewst_remote_agent", "--org-id"]), [])
+
     def test_get_org_id_from_executable_name_unmatched(self) -> None:
         """Test the get_org_id_from_executable_name() function
         when the name doesn't match the pattern"""
@@ -533,6 +566,20 @@ class TestConfigIO(unittest.TestCase):
         mock_logging_path.assert_called()
         mock_print.assert_called()
 
+    def test_org_log_filter(self) -> None:
+        """Test OrgLogFilter only keeps the records of its organization and of the whole process
+        """
+        log_filter = OrgLogFilter(ORG_ID)
+        record = logging.LogRecord("test", logging.INFO, __file__, 1, "message", None, None)
+
+        def filter_for(org_id: str) -> bool:
+            logging_org_id.set(org_id)
+            return log_filter.filter(record)
+
+        self.assertTrue(log_filter.filter(record))
+        self.assertTrue(contextvars.copy_context().run(filter_for, ORG_ID))
+        self.assertFalse(contextvars.copy_context().run(filter_for, str(uuid4())))
+
 
 if __name__ == "__main__":
     unittest.main()
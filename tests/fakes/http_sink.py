@@ -0,0 +1,177 @@
+""" Module for defining a local HTTP sink of the webhook POSTs sent back to Rewst, for end-to-end tests. """
+
+from typing import Any, Dict, List
+
+import json
+import threading
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+# Client class of httpx, kept before install() patches it
+AsyncClient = httpx.AsyncClient
+
+
+@dataclass
+class WebhookRequest:
+    """
+    Request received by the webhook sink.
+    """
+    method: str
+    path: str
+    headers: Dict[str, str]
+    body: bytes
+
+    def json(self) -> Any:
+        """
+        Decode the body from JSON.
+
+        Returns:
+            Any: Request data.
+        """
+        return json.loads(self.body)
+
+
+class WebhookSink:
+    """
+    HTTP server on the loopback interface that records the requests it receives and answers them with a
+    configurable status. Use transport() or install() to send the agent's HTTPS webhook POSTs to it.
+    """
+
+    def __init__(self) -> None:
+        """Constructs a new webhook sink instance, listening on a free port.
+        """
+        self.requests: List[WebhookRequest] = []
+        self.status_code = 200
+        self.response_text = "OK"
+
+        sink = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """
+            Request handler recording the requests in the sink.
+            """
+
+            def do_POST(self) -> None:
+                """
+                Record a POST request and answer it.
+                """
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with sink.lock:
+                    sink.requests.append(WebhookRequest("POST", self.path, dict(self.headers), body))
+                    status_code, response_text = sink.status_code, sink.response_text
+
+                data = response_text.encode("utf-8")
+                self.send_response(status_code)
+                self.send_header("Content-Type", "text/plain")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                """
+                Keep the test output quiet.
+                """
+
+        self.lock = threading.Lock()
+        self.__server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.__thread = threading.Thread(target=self.__server.serve_forever, name="WebhookSink", daemon=True)
+        self.__thread.start()
+
+    @property
+    def url(self) -> str:
+        """
+        Get the base URL of the sink.
+
+        Returns:
+            str: Base URL.
+        """
+        host, port = self.__server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def transport(self) -> httpx.AsyncBaseTransport:
+        """
+        Get an HTTP transport that sends every request to the sink, keeping its path.
+
+        Returns:
+            httpx.AsyncBaseTransport: Transport to the sink.
+        """
+        return SinkTransport(httpx.URL(self.url))
+
+    def make_client(self, *args: Any, **kwargs: Any) -> httpx.AsyncClient:
+        """
+        Make an HTTP client sending its requests to the sink.
+
+        Args:
+            *args (Any): Positional arguments of httpx.AsyncClient.
+            **kwargs (Any): Keyword arguments of httpx.AsyncClient.
+
+        Returns:
+            httpx.AsyncClient: HTTP client.
+        """
+        return AsyncClient(*args, transport=self.transport(), **kwargs)
+
+    def install(self, mocker: Any) -> None:
+        """
+        Make the agent's HTTP clients send their requests to the sink.
+
+        Args:
+            mocker (MockerFixture): Fixture instance for mocking.
+        """
+        mocker.patch("httpx.AsyncClient", side_effect=self.make_client)
+
+    def get_requests(self, path: str = None) -> List[WebhookRequest]:
+        """
+        Get the requests received so far.
+
+        Args:
+            path (str, optional): Only get the requests to this path. Defaults to all requests.
+
+        Returns:
+            List[WebhookRequest]: Received requests.
+        """
+        with self.lock:
+            return [request for request in self.requests if path is None or request.path == path]
+
+    def close(self) -> None:
+        """
+        Stop the server.
+        """
+        self.__server.shutdown()
+        self.__server.server_close()
+        self.__thread.join(timeout=5)
+
+
+class SinkTransport(httpx.AsyncBaseTransport):
+    """
+    HTTP transport rewriting the scheme, host and port of each request to the sink.
+    """
+
+    def __init__(self, url: httpx.URL) -> None:
+        """Constructs a new sink transport instance.
+
+        Args:
+            url (httpx.URL): Base URL of the sink.
+        """
+        self.__url = url
+        self.__transport = httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """
+        Send a request to the sink.
+
+        Args:
+            request (httpx.Request): Request of the agent.
+
+        Returns:
+            httpx.Response: Response of the sink.
+        """
+        request.url = request.url.copy_with(scheme=self.__url.scheme, host=self.__url.host, port=self.__url.port)
+        return await self.__transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        """
+        Close the connections to the sink.
+        """
+        await self.__transport.aclose()
@@ -0,0 +1,425 @@
+""" Module for defining a local stand-in of the IoT Hub for end-to-end tests. """
+
+from typing import Any, Callable, Dict, List
+
+import asyncio
+import copy
+import gzip
+import json
+import threading
+import time
+import uuid
+
+from azure.iot.device import Message, MethodRequest, MethodResponse
+from azure.iot.device.exceptions import ConnectionFailedError, CredentialError, NoConnectionError
+
+CLIENT_CLASS = "iot_hub_module.connection_management.IoTHubDeviceClient"
+
+
+class FakeIoTHub:
+    """
+    Local stand-in of the IoT Hub. It hands out fake device clients, injects cloud-to-device messages, desired
+    properties patches and direct methods, drops connections, and records what the devices sent.
+
+    Like the SDK, the handlers of the clients are called from a separate thread, and coroutine handlers run on
+    an event loop of that thread.
+    """
+
+    def __init__(self) -> None:
+        """Constructs a new fake IoT Hub instance.
+        """
+        self.clients: List[FakeIoTHubDeviceClient] = []
+        self.messages: List[Message] = []
+        self.reported_patches: List[Dict[str, Any]] = []
+        self.method_responses: List[MethodResponse] = []
+        self.desired: Dict[str, Any] = {"$version": 1}
+        self.reported: Dict[str, Any] = {}
+        self.connections = 0
+        self.refuse_connections = False
+        self.reject_credentials = False
+
+        self.__lock = threading.Lock()
+        self.__handler_loop = asyncio.new_event_loop()
+        self.__handler_thread = threading.Thread(
+            target=self.__handler_loop.run_forever, name="FakeIoTHubHandlers", daemon=True)
+        self.__handler_thread.start()
+
+    def install(self, mocker: Any) -> None:
+        """
+        Make the connection manager create its clients from this hub.
+
+        Args:
+            mocker (MockerFixture): Fixture instance for mocking.
+        """
+        mocker.patch(f"{CLIENT_CLASS}.create_from_connection_string", side_effect=self.create_client)
+
+    def close(self) -> None:
+        """
+        Stop the handler thread.
+        """
+        self.__handler_loop.call_soon_threadsafe(self.__handler_loop.stop)
+        self.__handler_thread.join(timeout=5)
+        self.__handler_loop.close()
+
+    def create_client(self, connection_string: str, websockets: bool = False,
+                      **kwargs: Any) -> "FakeIoTHubDeviceClient":
+        """
+        Create a device client, as IoTHubDeviceClient.create_from_connection_string() does.
+
+        Args:
+            connection_string (str): Connection string of the device.
+            websockets (bool, optional): Connect over websockets. Defaults to False.
+
+        Returns:
+            FakeIoTHubDeviceClient: Device client.
+        """
+        client = FakeIoTHubDeviceClient(self, connection_string, websockets)
+        self.clients.append(client)
+        return client
+
+    @property
+    def connected_client(self) -> "FakeIoTHubDeviceClient | None":
+        """
+        Get the client currently connected.
+
+        Returns:
+            FakeIoTHubDeviceClient | None: Last connected client, or None if no client is connected.
+        """
+        connected = [client for client in self.clients if client.connected]
+        return connected[-1] if connected else None
+
+    def inject_message(self, data: Dict[str, Any] | str | bytes) -> None:
+        """
+        Send a cloud-to-device message to the connected client.
+
+        Args:
+            data (Dict[str, Any] | str | bytes): Message data, encoded as JSON if a dictionary.
+
+        Raises:
+            NoConnectionError: If no client is connected.
+        """
+        if isinstance(data, dict):
+            data = json.dumps(data)
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self.__get_connected_client().dispatch("on_message_received", Message(data, str(uuid.uuid4())))
+
+    def patch_desired_properties(self, patch: Dict[str, Any]) -> None:
+        """
+        Patch the desired properties of the device twin and notify the connected client, if any.
+
+        Args:
+            patch (Dict[str, Any]): Desired properties patch.
+        """
+        with self.__lock:
+            apply_twin_patch(self.desired, patch)
+            self.desired["$version"] += 1
+            patch = {**copy.deepcopy(patch), "$version": self.desired["$version"]}
+
+        client = self.connected_client
+        if client is not None:
+            client.dispatch("on_twin_desired_properties_patch_received", patch)
+
+    def invoke_method(self, name: str, payload: Any = None) -> str:
+        """
+        Invoke a direct method on the connected client. Use wait_for() to get the response.
+
+        Args:
+            name (str): Method name.
+            payload (Any, optional): Method payload. Defaults to None.
+
+        Raises:
+            NoConnectionError: If no client is connected.
+
+        Returns:
+            str: Request identifier of the method.
+        """
+        request_id = str(uuid.uuid4())
+        self.__get_connected_client().dispatch("on_method_request_received",
+                                               MethodRequest(request_id, name, payload))
+        return request_id
+
+    def get_method_response(self, request_id: str) -> MethodResponse | None:
+        """
+        Get the response of a direct method.
+
+        Args:
+            request_id (str): Request identifier returned by invoke_method().
+
+        Returns:
+            MethodResponse | None: Method response, or None if not answered yet.
+        """
+        for response in self.method_responses:
+            if response.request_id == request_id:
+                return response
+        return None
+
+    def drop_connection(self) -> None:
+        """
+        Drop the connection of the connected client, as a network failure would.
+        """
+        client = self.connected_client
+        if client is not None:
+            client.set_connected(False)
+
+    def get_messages(self) -> List[Any]:
+        """
+        Get the device-to-cloud messages sent so far, decompressed and decoded from JSON.
+
+        Returns:
+            List[Any]: Message data.
+        """
+        with self.__lock:
+            messages = list(self.messages)
+        return [
+            json.loads(gzip.decompress(message.data) if message.content_encoding == "gzip" else message.data)
+            for message in messages
+        ]
+
+    async def wait_for(self, predicate: Callable[[], Any], timeout: float = 5.0) -> Any:
+        """
+        Wait until a condition holds.
+
+        Args:
+            predicate (Callable[[], Any]): Condition to wait for.
+            timeout (float, optional): Seconds to wait at most. Defaults to 5.0.
+
+        Raises:
+            TimeoutError: If the condition does not hold in time.
+
+        Returns:
+            Any: Result of the predicate.
+        """
+        deadline = time.monotonic() + timeout
+        while not (result := predicate()):
+            if time.monotonic() > deadline:
+                raise TimeoutError("Condition not met in time")
+            await asyncio.sleep(0.01)
+        return result
+
+    def record_message(self, message: Message | str) -> None:
+        """
+        Record a device-to-cloud message.
+
+        Args:
+            message (Message | str): Message sent by a device.
+        """
+        if not isinstance(message, Message):
+            message = Message(message)
+        with self.__lock:
+            self.messages.append(message)
+
+    def record_reported_patch(self, patch: Dict[str, Any]) -> None:
+        """
+        Record and apply a reported properties patch.
+
+        Args:
+            patch (Dict[str, Any]): Reported properties patch sent by a device.
+        """
+        with self.__lock:
+            self.reported_patches.append(copy.deepcopy(patch))
+            apply_twin_patch(self.reported, patch)
+
+    def record_method_response(self, response: MethodResponse) -> None:
+        """
+        Record a direct method response.
+
+        Args:
+            response (MethodResponse): Response sent by a device.
+        """
+        with self.__lock:
+            self.method_responses.append(response)
+
+    def get_twin(self) -> Dict[str, Any]:
+        """
+        Get a copy of the device twin.
+
+        Returns:
+            Dict[str, Any]: Desired and reported properties.
+        """
+        with self.__lock:
+            return {"desired": copy.deepcopy(self.desired), "reported": copy.deepcopy(self.reported)}
+
+    def call_handler(self, handler: Callable[..., Any], *args: Any) -> None:
+        """
+        Call a handler from the handler thread.
+
+        Args:
+            handler (Callable[..., Any]): Handler of a client.
+            *args (Any): Handler arguments.
+        """
+        if asyncio.iscoroutinefunction(handler):
+            asyncio.run_coroutine_threadsafe(handler(*args), self.__handler_loop)
+        else:
+            self.__handler_loop.call_soon_threadsafe(handler, *args)
+
+    def __get_connected_client(self) -> "FakeIoTHubDeviceClient":
+        """
+        Get the client currently connected.
+
+        Raises:
+            NoConnectionError: If no client is connected.
+
+        Returns:
+            FakeIoTHubDeviceClient: Connected client.
+        """
+        client = self.connected_client
+        if client is None:
+            raise NoConnectionError("No device is connected")
+        return client
+
+
+class FakeIoTHubDeviceClient:
+    """
+    Device client of the fake IoT Hub, with the interface of IoTHubDeviceClient used by the agent.
+    """
+
+    def __init__(self, hub: FakeIoTHub, connection_string: str, websockets: bool = False) -> None:
+        """Constructs a new fake device client instance.
+
+        Args:
+            hub (FakeIoTHub): Hub of the client.
+            connection_string (str): Connection string of the device.
+            websockets (bool, optional): Connect over websockets. Defaults to False.
+        """
+        self.connection_string = connection_string
+        self.websockets = websockets
+        self.shut_down = False
+        self.on_message_received = None
+        self.on_connection_state_change = None
+        self.on_twin_desired_properties_patch_received = None
+        self.on_method_request_received = None
+
+        self.__hub = hub
+        self.__connected = False
+
+    @property
+    def connected(self) -> bool:
+        """
+        Whether the client is connected.
+
+        Returns:
+            bool: True if connected.
+        """
+        return self.__connected
+
+    def set_connected(self, connected: bool) -> None:
+        """
+        Change the connection state and notify the connection state handler.
+
+        Args:
+            connected (bool): New connection state.
+        """
+        if connected == self.__connected:
+            return
+        self.__connected = connected
+        self.dispatch("on_connection_state_change")
+
+    def dispatch(self, handler_name: str, *args: Any) -> None:
+        """
+        Call a handler of the client from the handler thread, if set.
+
+        Args:
+            handler_name (str): Handler attribute name, e.g. on_message_received.
+            *args (Any): Handler arguments.
+        """
+        handler = getattr(self, handler_name)
+        if handler is not None:
+            self.__hub.call_handler(handler, *args)
+
+    async def connect(self) -> None:
+        """
+        Connect to the fake IoT Hub.
+
+        Raises:
+            ConnectionFailedError: If the hub refuses connections or the client was shut down.
+            CredentialError: If the hub rejects the credentials.
+        """
+        await asyncio.sleep(0)
+        if self.__hub.reject_credentials:
+            raise CredentialError("Credentials rejected by the fake IoT Hub")
+        if self.__hub.refuse_connections or self.shut_down:
+            raise ConnectionFailedError("Connection refused by the fake IoT Hub")
+        if not self.__connected:
+            self.__hub.connections += 1
+        self.set_connected(True)
+
+    async def disconnect(self) -> None:
+        """
+        Disconnect from the fake IoT Hub.
+        """
+        self.set_connected(False)
+
+    async def shutdown(self) -> None:
+        """
+        Disconnect and release the client for good.
+        """
+        self.shut_down = True
+        self.set_connected(False)
+
+    async def send_message(self, message: Message | str) -> None:
+        """
+        Send a device-to-cloud message.
+
+        Args:
+            message (Message | str): Message to send.
+        """
+        self.__check_connected()
+        self.__hub.record_message(message)
+
+    async def patch_twin_reported_properties(self, patch: Dict[str, Any]) -> None:
+        """
+        Patch the reported properties of the device twin.
+
+        Args:
+            patch (Dict[str, Any]): Reported properties patch.
+        """
+        self.__check_connected()
+        self.__hub.record_reported_patch(patch)
+
+    async def get_twin(self) -> Dict[str, Any]:
+        """
+        Get the device twin.
+
+        Returns:
+            Dict[str, Any]: Desired and reported properties.
+        """
+        self.__check_connected()
+        return self.__hub.get_twin()
+
+    async def send_method_response(self, method_response: MethodResponse) -> None:
+        """
+        Send the response of a direct method.
+
+        Args:
+            method_response (MethodResponse): Method response.
+        """
+        self.__check_connected()
+        self.__hub.record_method_response(method_response)
+
+    def __check_connected(self) -> None:
+        """
+        Check that the client is connected, as the SDK does before sending.
+
+        Raises:
+            NoConnectionError: If the client is not connected.
+        """
+        if not self.__connected:
+            raise NoConnectionError("Client is not connected")
+
+
+def apply_twin_patch(target: Dict[str, Any], patch: Dict[str, Any]) -> None:
+    """
+    Merge a twin patch into properties, deleting the properties patched to None.
+
+    Args:
+        target (Dict[str, Any]): Properties to update.
+        patch (Dict[str, Any]): Twin patch.
+    """
+    for name, value in patch.items():
+        if value is None:
+            target.pop(name, None)
+        elif isinstance(value, dict) and isinstance(target.get(name), dict):
+            apply_twin_patch(target[name], value)
+        else:
+            target[name] = copy.deepcopy(value)
@@ -0,0 +1,158 @@
+"""
+Tests for admission control module
+"""
+
+import asyncio
+import pytest
+from iot_hub_module.admission_control import (
+    AdmissionController,
+    MAX_RETRY_AFTER,
+    get_admission_controller,
+)
+
+
+def test_try_admit() -> None:
+    """
+    Test AdmissionController.try_admit() and AdmissionController.release().
+    """
+    controller = AdmissionController(max_pending_jobs=2, max_running_jobs=1)
+
+    assert controller.try_admit()
+    assert controller.try_admit()
+    assert not controller.try_admit()
+    assert controller.pending_jobs == 2
+
+    controller.release()
+    assert controller.try_admit()
+    assert controller.pending_jobs == 2
+
+
+def test_retry_after() -> None:
+    """
+    Test AdmissionController.retry_after().
+    """
+    controller = AdmissionController(max_pending_jobs=4, max_running_jobs=2, min_retry_after=3)
+
+    # No job durations known yet
+    assert controller.retry_after() == 3
+
+    controller.try_admit()
+    controller.release(20.0)
+    for _ in range(4):
+        controller.try_admit()
+
+    # Two batches of two jobs of 20 seconds
+    assert controller.retry_after() == 40
+
+    controller.release(10000.0)
+    assert controller.retry_after() == MAX_RETRY_AFTER
+
+
+@pytest.mark.asyncio
+async def test_execution_slot() -> None:
+    """
+    Test AdmissionController.execution_slot() limiting running jobs.
+    """
+    controller = AdmissionController(max_pending_jobs=3, max_running_jobs=1)
+    running = []
+    max_running = 0
+
+    async def job() -> None:
+        nonlocal max_running
+        assert controller.try_admit()
+        async with controller.execution_slot():
+            running.append(None)
+            max_running = max(max_running, len(running))
+            await asyncio.sleep(0.01)
+            running.pop()
+
+    await asyncio.gather(job(), job(), job())
+
+    assert max_running == 1
+    assert controller.pending_jobs == 0
+    assert controller.running_jobs == 0
+
+
+@pytest.mark.asyncio
+async def test_execution_slot_exception() -> None:
+    """
+    Test AdmissionController.execution_slot() releasing jobs that raised.
+    """
+    controller = AdmissionController(max_pending_jobs=1, max_running_jobs=1)
+
+    assert controller.try_admit()
+    with pytest.raises(ValueError):
+        async with controller.execution_slot():
+            raise ValueError()
+
+    assert controller.pending_jobs == 0
+    assert controller.running_jobs == 0
+
+
+@pytest.mark.asyncio
+async def test_execution_slot_leave() -> None:
+    """
+    Test AdmissionController.execution_slot() letting jobs leave their running slot early.
+    """
+    controller = AdmissionController(max_pending_jobs=2, max_running_jobs=1)
+    left = asyncio.Event()
+    release = asyncio.Event()
+
+    async def follow() -> None:
+        assert controller.try_admit()
+        async with controller.execution_slot() as leave_slot:
+            await leave_slot()
+            await leave_slot()
+            left.set()
+            await release.wait()
+
+    follower = asyncio.create_task(follow())
+    await left.wait()
+    assert controller.running_jobs == 0
+    assert controller.pending_jobs == 1
+
+    # Another job runs while the first one is still accepted
+    assert controller.try_admit()
+    async with controller.execution_slot():
+        assert controller.running_jobs == 1
+    assert controller.pending_jobs == 1
+
+    release.set()
+    await follower
+    assert controller.running_jobs == 0
+
+
+def test_configure() -> None:
+    """
+    Test AdmissionController.configure() keeping the accepted jobs.
+    """
+    controller = AdmissionController(max_pending_jobs=1)
+    assert controller.try_admit()
+
+    controller.configure(max_pending_jobs=2, max_running_jobs=0)
+    assert controller.max_running_jobs == 1
+    assert controller.try_admit()
+    assert not controller.try_admit()
+
+    controller.configure(min_retry_after=9)
+    assert controller.max_pending_jobs == 2
+    assert controller.retry_after() == 9
+
+    assert get_admission_controller("org") is get_admission_controller("org")
+    assert get_admission_controller("org") is not get_admission_controller("other org")
+
+
+def test_execution_slot_new_loop() -> None:
+    """
+    Test AdmissionController.execution_slot() used from successive event loops.
+    """
+    controller = AdmissionController()
+
+    async def run_job() -> None:
+        assert controller.try_admit()
+        async with controller.execution_slot():
+            pass
+
+    asyncio.run(run_job())
+    asyncio.run(run_job())
+    assert controller.pending_jobs == 0
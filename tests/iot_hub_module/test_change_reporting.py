@@ -0,0 +1,145 @@
+"""
+Tests for change reporting module
+"""
+
+from typing import Any, Dict
+
+from iot_hub_module.change_reporting import (
+    ChangeReporter,
+    compute_output_digest,
+    get_change_reporter,
+)
+
+# Constants
+JOB_KEY = "inventory"
+
+
+def deliver(reporter: ChangeReporter, job_key: str, result: Dict[str, Any],
+            include_diff: bool = False) -> Dict[str, Any]:
+    """
+    Build the report of a result and record it as delivered.
+
+    Args:
+        reporter (ChangeReporter): Change reporter.
+        job_key (str): Key identifying the recurring job.
+        result (Dict[str, Any]): Result of the job execution.
+        include_diff (bool, optional): Send a unified diff for changed text outputs. Defaults to False.
+
+    Returns:
+        Dict[str, Any]: Report of the result.
+    """
+    report = reporter.build_report(job_key, result, include_diff)
+    reporter.record(job_key, result, report["digest"])
+    return report
+
+
+def test_compute_output_digest() -> None:
+    """
+    Test compute_output_digest().
+    """
+    first = compute_output_digest({"output": "hello", "error": ""})
+    assert first == compute_output_digest({"error": "", "output": "hello"})
+    assert first != compute_output_digest({"output": "hello", "error": "failed"})
+
+
+def test_build_report_unchanged() -> None:
+    """
+    Test ChangeReporter.build_report() with unchanged outputs.
+    """
+    reporter = ChangeReporter()
+    result = {"output": "hello", "error": ""}
+
+    first = deliver(reporter, JOB_KEY, result)
+    assert first["unchanged"] is False
+    assert first["output"] == "hello"
+
+    second = deliver(reporter, JOB_KEY, dict(result))
+    assert second["unchanged"] is True
+    assert second["digest"] == first["digest"]
+    assert "output" not in second
+
+    # Timestamp refers to the first time the output was seen
+    third = deliver(reporter, JOB_KEY, dict(result))
+    assert third["unchanged_since"] == second["unchanged_since"]
+
+    # Other job keys are tracked separately
+    assert deliver(reporter, "other", result)["unchanged"] is False
+
+    reporter.forget(JOB_KEY)
+    assert deliver(reporter, JOB_KEY, result)["unchanged"] is False
+
+
+def test_build_report_diff() -> None:
+    """
+    Test ChangeReporter.build_report() with text diffs.
+    """
+    reporter = ChangeReporter()
+    lines = [f"line {i}\n" for i in range(100)]
+
+    deliver(reporter, JOB_KEY, {"output": "".join(lines), "error": ""}, True)
+
+    lines[50] = "changed\n"
+    report = deliver(reporter, JOB_KEY, {"output": "".join(lines), "error": ""}, True)
+    assert report["unchanged"] is False
+    assert "output" not in report
+    assert "+changed" in report["diff"]
+    assert report["base_digest"] != report["digest"]
+
+    # Diffs are not sent when not requested
+    lines[51] = "changed again\n"
+    report = deliver(reporter, JOB_KEY, {"output": "".join(lines), "error": ""})
+    assert "diff" not in report
+    assert report["output"] == "".join(lines)
+
+
+def test_build_report_diff_not_smaller() -> None:
+    """
+    Test ChangeReporter.build_report() sending full output if the diff is not smaller.
+    """
+    reporter = ChangeReporter(max_diff_base_size=10)
+
+    deliver(reporter, JOB_KEY, {"output": "a", "error": ""}, True)
+    report = deliver(reporter, JOB_KEY, {"output": "b", "error": ""}, True)
+    assert report["output"] == "b"
+    assert "diff" not in report
+
+    # Outputs larger than the limit are never diffed
+    deliver(reporter, JOB_KEY, {"output": "x" * 20, "error": ""}, True)
+    report = deliver(reporter, JOB_KEY, {"output": "y" * 20, "error": ""}, True)
+    assert report["output"] == "y" * 20
+
+
+def test_build_report_not_delivered() -> None:
+    """
+    Test ChangeReporter.build_report() reporting results again until they are recorded as delivered.
+    """
+    reporter = ChangeReporter()
+    result = {"output": "hello", "error": ""}
+
+    assert reporter.build_report(JOB_KEY, result)["unchanged"] is False
+    assert reporter.build_report(JOB_KEY, result)["unchanged"] is False
+
+    reporter.record(JOB_KEY, result)
+    assert reporter.build_report(JOB_KEY, result)["unchanged"] is True
+
+
+def test_record_eviction() -> None:
+    """
+    Test ChangeReporter.record() evicting the least recently used job keys.
+    """
+    reporter = ChangeReporter(max_jobs=2, max_diff_base_total=10)
+    deliver(reporter, "a", {"output": "1234", "error": ""})
+    deliver(reporter, "b", {"output": "1234", "error": ""})
+    deliver(reporter, "a", {"output": "1234", "error": ""})
+
+    deliver(reporter, "c", {"output": "1234", "error": ""})
+    assert len(reporter) == 2
+    assert reporter.build_report("b", {"output": "1234", "error": ""})["unchanged"] is False
+    assert reporter.build_report("a", {"output": "1234", "error": ""})["unchanged"] is True
+
+    # Total size of the kept text outputs is bounded
+    deliver(reporter, "d", {"output": "123456789", "error": ""})
+    assert len(reporter) == 1
+
+    assert get_change_reporter("org") is get_change_reporter("org")
+    assert get_change_reporter("org") is not get_change_reporter("other org")
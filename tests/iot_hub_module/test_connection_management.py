@@ -2,6 +2,7 @@
 Tests for connection management module
 """
 
+import logging
 import signal
 import uuid
 import asyncio
@@ -11,9 +12,14 @@ from base64 import b64encode
 import httpx
 import pytest
 from pytest_mock import MockerFixture
+from azure.iot.device import MethodRequest, MethodResponse
+from azure.iot.device.exceptions import ConnectionFailedError
+from iot_hub_module.admission_control import AdmissionController, get_admission_controller
+from iot_hub_module.change_reporting import ChangeReporter, get_change_reporter
 from iot_hub_module.connection_management import (
     ConnectionManager,
     iot_hub_connection_loop,
+    multi_org_connection_loop,
 )
 
 # Constants
@@ -30,6 +36,54 @@ CONFIG_DATA = {
 }
 
 
+@pytest.fixture(autouse=True)
+def data_directory(mocker: MockerFixture, tmp_path) -> str:
+    """
+    Keep the agent state written by the tests in a temporary directory.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+        tmp_path (Path): Temporary directory.
+
+    Returns:
+        str: Data directory path.
+    """
+    mocker.patch(f"{MODULE}.get_data_directory", return_value=str(tmp_path))
+    return str(tmp_path)
+
+
+@pytest.fixture(autouse=True)
+def change_reporter(mocker: MockerFixture) -> ChangeReporter:
+    """
+    Isolate the digests of reported outputs between the tests.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+
+    Returns:
+        ChangeReporter: Change reporter of the test.
+    """
+    reporter = ChangeReporter()
+    mocker.patch(f"{MODULE}.get_change_reporter", return_value=reporter)
+    return reporter
+
+
+@pytest.fixture(autouse=True)
+def admission_controller(mocker: MockerFixture) -> AdmissionController:
+    """
+    Isolate the jobs counted by the admission controller between the tests.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+
+    Returns:
+        AdmissionController: Admission controller of the test.
+    """
+    controller = AdmissionController()
+    mocker.patch(f"{MODULE}.get_admission_controller", return_value=controller)
+    return controller
+
+
 @pytest.mark.parametrize("platform", ("Windows", "Linux", "Darwin"))
 def test_get_connection_string(mocker: MockerFixture, platform: str) -> None:
     """
@@ -75,6 +129,102 @@ async def test_connect(mocker: MockerFixture, platform: str) -> None:
     assert await conn.connect() is None
 
 
+@pytest.mark.asyncio
+async def test_connect_transport(mocker: MockerFixture, data_directory: str) -> None:
+    """
+    Test ConnectionManager.connect() falls back to websockets and tries it first next time.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+        data_directory (str): Data directory path.
+    """
+    clients = [mocker.AsyncMock() for _ in range(4)]
+    mqtt_client, websockets_client = clients[:2]
+    mqtt_client.connect.side_effect = ConnectionFailedError
+    create_client = mocker.patch(
+        f"{MODULE}.IoTHubDeviceClient.create_from_connection_string",
+        side_effect=clients,
+    )
+
+    conn = ConnectionManager(CONFIG_DATA, False)
+    await conn.connect()
+
+    assert conn.client is websockets_client
+    assert create_client.call_args.kwargs["websockets"]
+    mqtt_client.shutdown.assert_awaited_once()
+    websockets_client.connect.assert_awaited_once()
+
+    # A restarted agent connects over websockets directly
+    conn = ConnectionManager(CONFIG_DATA, False)
+    await conn.connect()
+
+    assert conn.client is clients[3]
+    assert create_client.call_args.kwargs["websockets"]
+    clients[2].connect.assert_not_awaited()
+    clients[3].connect.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_race_transports(mocker: MockerFixture) -> None:
+    """
+    Test ConnectionManager.connect() races MQTT and websockets while no transport is known.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+    """
+    mqtt_client, websockets_client = mocker.AsyncMock(), mocker.AsyncMock()
+    create_client = mocker.patch(
+        f"{MODULE}.IoTHubDeviceClient.create_from_connection_string",
+        side_effect=[mqtt_client, websockets_client],
+    )
+    mqtt_cancelled = asyncio.Event()
+
+    async def hanging_connect() -> None:
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            mqtt_cancelled.set()
+            raise
+
+    mqtt_client.connect.side_effect = hanging_connect
+
+    conn = ConnectionManager({**CONFIG_DATA, "transport_race_head_start": 0.05}, False)
+    await conn.set_message_handler()
+    await asyncio.wait_for(conn.connect(), 5)
+
+    # Websockets started after the head start and won, MQTT was cancelled and cleaned up
+    assert create_client.call_args.kwargs["websockets"]
+    assert conn.client is websockets_client
+    assert websockets_client.on_message_received == conn.handle_message
+    assert mqtt_cancelled.is_set()
+    mqtt_client.shutdown.assert_awaited_once()
+    websockets_client.shutdown.assert_not_awaited()
+    assert conn.get_transport_state().preferred == "websockets"
+
+
+@pytest.mark.asyncio
+async def test_race_transports_head_start(mocker: MockerFixture) -> None:
+    """
+    Test ConnectionManager.connect() does not start websockets when MQTT connects within the head start.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+    """
+    mqtt_client = mocker.AsyncMock()
+    create_client = mocker.patch(
+        f"{MODULE}.IoTHubDeviceClient.create_from_connection_string",
+        return_value=mqtt_client,
+    )
+
+    conn = ConnectionManager(CONFIG_DATA, False)
+    await conn.connect()
+
+    create_client.assert_called_once()
+    assert conn.client is mqtt_client
+    assert conn.get_transport_state().known
+    assert conn.get_transport_state().preferred == "mqtt"
+
+
 @pytest.mark.asyncio
 @pytest.mark.parametrize("platform", ("Windows", "Linux", "Darwin"))
 async def test_disconnect(mocker: MockerFixture, platform: str) -> None:
@@ -151,6 +301,208 @@ async def test_set_message_handler(mocker: MockerFixture, platform: str) -> None
     assert await conn.set_message_handler() is None
 
 
+@pytest.mark.asyncio
+async def test_reconnect(mocker: MockerFixture) -> None:
+    """
+    Test ConnectionManager.reconnect() reuses the client unless the credentials changed.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+    """
+    first_client, second_client = mocker.AsyncMock(), mocker.AsyncMock()
+    create_client = mocker.patch(
+        f"{MODULE}.IoTHubDeviceClient.create_from_connection_string",
+        side_effect=[first_client, second_client],
+    )
+
+    conn = ConnectionManager(CONFIG_DATA, False)
+    await conn.set_connection_state_handler()
+    await conn.set_message_handler()
+
+    await conn.reconnect(dict(CONFIG_DATA))
+    assert conn.client is first_client
+    assert create_client.call_count == 1
+    first_client.connect.assert_awaited_once()
+
+    await conn.reconnect({**CONFIG_DATA, "shared_access_key": "changed"})
+    assert conn.client is second_client
+    assert create_client.call_count == 2
+    assert "SharedAccessKey=changed" in create_client.call_args.args[0]
+    first_client.shutdown.assert_awaited_once()
+    second_client.connect.assert_awaited_once()
+
+    # The handlers are attached to the new client
+    assert second_client.on_message_received == conn.handle_message
+    assert second_client.on_connection_state_change == conn.handle_connection_state_change
+
+
+@pytest.mark.asyncio
+async def test_desired_properties(mocker: MockerFixture, admission_controller: AdmissionController) -> None:
+    """
+    Test ConnectionManager applies the agent settings of desired properties patches live.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+        admission_controller (AdmissionController): Admission controller of the test.
+    """
+    mocked_client = mocker.AsyncMock()
+    mocker.patch(
+        f"{MODULE}.IoTHubDeviceClient.create_from_connection_string",
+        return_value=mocked_client,
+    )
+    mocked_pool = mocker.patch(f"{MODULE}.get_process_pool")
+    root_logger = logging.getLogger()
+    mocker.patch.object(root_logger, "level", root_logger.level)
+
+    conn = ConnectionManager(CONFIG_DATA, False)
+    await conn.set_desired_properties_handler()
+    assert mocked_client.on_twin_desired_properties_patch_received == conn.handle_desired_properties_patch
+
+    # The SDK calls the handler from its own thread
+    patch = {
+        "agent_settings": {
+            "max_running_jobs": 3,
+            "log_level": "warning",
+            "result_cache_max_entries": 7,
+            "heartbeat_max_interval": 30,
+            "process_pool_workers": 2,
+            "post_timeout": 20,
+            "rewst_engine_host": "evil.example.com",
+        },
+        "$version": 4,
+    }
+    await asyncio.to_thread(mocked_client.on_twin_desired_properties_patch_received, patch)
+    await asyncio.sleep(0.01)
+
+    assert admission_controller.max_running_jobs == 3
+    assert root_logger.level == logging.WARNING
+    assert conn.result_cache.max_entries == 7
+    assert conn.heartbeat.max_interval == 30
+    mocked_pool.return_value.resize.assert_called_once_with(2)
+    assert conn.config_data["post_timeout"] == 20
+    assert conn.config_data["rewst_engine_host"] == CONFIG_DATA["rewst_engine_host"]
+    assert "post_timeout" not in CONFIG_DATA
+    assert conn.reported_properties.pending == {
+        "agent_settings": {
+            "applied_version": 4,
+            "rejected": ["rewst_engine_host: cannot be changed live"],
+        }
+    }
+
+    # The same version is not applied twice, and live settings survive a configuration reload
+    conn.apply_desired_properties({**patch, "agent_settings": {"max_running_jobs": 5}})
+    assert admission_controller.max_running_jobs == 3
+    await conn.reconnect(dict(CONFIG_DATA))
+    assert conn.config_data["post_timeout"] == 20
+
+    # Desired properties changed while disconnected are applied on connection
+    mocked_client.get_twin.return_value = {
+        "desired": {"agent_settings": {"max_running_jobs": 5}, "$version": 5},
+        "reported": {},
+    }
+    await conn.sync_desired_properties()
+    assert admission_controller.max_running_jobs == 5
+
+    await conn.reported_properties.close()
+
+
+@pytest.mark.asyncio
+async def test_direct_methods(mocker: MockerFixture) -> None:
+    """
+    Test ConnectionManager answers direct methods over the IoT Hub connection.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+    """
+    mocked_client = mocker.AsyncMock()
+    mocker.patch(
+        f"{MODULE}.IoTHubDeviceClient.create_from_connection_string",
+        return_value=mocked_client,
+    )
+    answered = asyncio.Queue()
+    mocked_client.send_method_response.side_effect = answered.put
+
+    conn = ConnectionManager(CONFIG_DATA, False)
+    mocker.patch.object(conn, "get_installation_info", return_value={"config_file_path": "config.json"})
+    await conn.set_method_handler()
+    assert mocked_client.on_method_request_received == conn.handle_method_request
+
+    async def call(name: str, payload=None) -> MethodResponse:
+        # The SDK calls the handler from its own thread
+        request = MethodRequest(str(uuid.uuid4()), name, payload)
+        await asyncio.to_thread(mocked_client.on_method_request_received, request)
+        response = await asyncio.wait_for(answered.get(), 1)
+        assert response.request_id == request.request_id
+        return response
+
+    response = await call("ping", "hello")
+    assert response.status == 200
+    assert response.payload["pong"] == "hello"
+
+    response = await call("get_installation")
+    assert response.payload == {"config_file_path": "config.json"}
+
+    response = await call("agent_status")
+    assert response.status == 200
+    assert response.payload["transport"] == "mqtt"
+    assert response.payload["running_jobs"] == 0
+
+    response = await call("reboot")
+    assert response.status == 404
+
+    async def failing(payload) -> None:
+        raise ValueError("broken")
+
+    conn.register_direct_method("failing", failing)
+    response = await call("failing")
+    assert response.status == 500
+    assert response.payload == {"error": "broken"}
+
+
+@pytest.mark.asyncio
+async def test_wait_for_disconnection(mocker: MockerFixture) -> None:
+    """
+    Test ConnectionManager.wait_for_disconnection() wakes up on connection state changes.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+    """
+    mocked_client = mocker.AsyncMock()
+    mocked_client.connected = True
+    mocker.patch(
+        f"{MODULE}.IoTHubDeviceClient.create_from_connection_string",
+        return_value=mocked_client,
+    )
+
+    conn = ConnectionManager(CONFIG_DATA)
+    await conn.set_connection_state_handler()
+    assert mocked_client.on_connection_state_change == conn.handle_connection_state_change
+
+    stop_event = asyncio.Event()
+    waiter = asyncio.create_task(conn.wait_for_disconnection(stop_event))
+
+    # A state change that keeps the client connected does not end the wait
+    await asyncio.to_thread(mocked_client.on_connection_state_change)
+    await asyncio.sleep(0.05)
+    assert not waiter.done()
+
+    # The SDK reports the disconnection from its own thread
+    def disconnect() -> None:
+        mocked_client.connected = False
+        mocked_client.on_connection_state_change()
+
+    await asyncio.to_thread(disconnect)
+    await asyncio.wait_for(waiter, 1)
+
+    # The stop event ends the wait as well
+    mocked_client.connected = True
+    waiter = asyncio.create_task(conn.wait_for_disconnection(stop_event))
+    await asyncio.sleep(0.05)
+    assert not waiter.done()
+    stop_event.set()
+    await asyncio.wait_for(waiter, 1)
+
+
 @pytest.mark.asyncio
 @pytest.mark.parametrize("platform", ("Windows", "Linux", "Darwin"))
 async def test_execute_commands(mocker: MockerFixture, platform: str) -> None:
@@ -243,6 +595,46 @@ async def test_execute_commands(mocker: MockerFixture, platform: str) -> None:
     assert result == {"output": "", "error": "An unexpected error occurred: "}
 
 
+@pytest.mark.asyncio
+async def test_execute_commands_report_changes_only(mocker: MockerFixture) -> None:
+    """
+    Test ConnectionManager.execute_commands() only reporting changed outputs.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+    """
+    mocker.patch(f"{MODULE}.IoTHubDeviceClient.create_from_connection_string")
+    mocker.patch("os.fsync")
+    mocker.patch("tempfile.NamedTemporaryFile")
+    mocker.patch("os.path.exists", return_value=False)
+    mocked_process = mocker.PropertyMock()
+    mocked_process.communicate.return_value = ("same output", "")
+    mocked_process.returncode = 0
+    mocker.patch("subprocess.Popen", return_value=mocked_process)
+
+    conn = ConnectionManager(CONFIG_DATA)
+    mocked_post = mocker.patch.object(conn, "post_results")
+    test_command_b64 = b64encode("echo same output".encode("utf-8"))
+
+    expected = {"output": "same output", "error": ""}
+    # Outputs that failed to be delivered are reported again in full
+    mocked_post.return_value = False
+    assert await conn.execute_commands(test_command_b64, "URL", "/bin/bash", "job") == expected
+    assert mocked_post.call_args.args[1]["output"] == "same output"
+
+    mocked_post.return_value = True
+    assert await conn.execute_commands(test_command_b64, "URL", "/bin/bash", "job") == expected
+    assert mocked_post.call_args.args[1]["output"] == "same output"
+
+    assert await conn.execute_commands(test_command_b64, "URL", "/bin/bash", "job") == expected
+    assert mocked_post.call_args.args[1]["unchanged"] is True
+    assert "output" not in mocked_post.call_args.args[1]
+
+    # Without a job key every result is posted in full
+    assert await conn.execute_commands(test_command_b64, "URL", "/bin/bash") == expected
+    mocked_post.assert_called_with("URL", expected)
+
+
 @pytest.mark.asyncio
 @pytest.mark.parametrize("platform", ("Windows", "Linux", "Darwin"))
 async def test_handle_message(mocker: MockerFixture, platform: str) -> None:
@@ -313,6 +705,27 @@ async def test_handle_message(mocker: MockerFixture, platform: str) -> None:
         is None
     )
 
+    # Report changes only with and without an explicit job key
+    mocked_execute = mocker.patch(f"{MODULE}.ConnectionManager.execute_commands")
+    for job_key in ("inventory", None):
+        assert (
+            await conn.handle_message(
+                mocker.MagicMock(
+                    data=json.dumps(
+                        {
+                            "commands": str(test_command_b64),
+                            "post_id": ORG_ID,
+                            "report_changes_only": True,
+                            "job_key": job_key,
+                        }
+                    )
+                )
+            )
+            is None
+        )
+        assert mocked_execute.call_args.args[3] == (job_key or mocker.ANY)
+        assert mocked_execute.call_args.args[3]
+
     # Missing post_id
     assert (
         await conn.handle_message(
@@ -352,6 +765,259 @@ async def test_handle_message(mocker: MockerFixture, platform: str) -> None:
     )
 
 
+@pytest.mark.asyncio
+async def test_execute_action(mocker: MockerFixture) -> None:
+    """
+    Test ConnectionManager.execute_action().
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+    """
+    mocker.patch(f"{MODULE}.IoTHubDeviceClient.create_from_connection_string")
+
+    conn = ConnectionManager(CONFIG_DATA)
+    mocked_post = mocker.patch.object(conn, "post_results")
+
+    result = await conn.execute_action("file_exists", {"path": "/not/a/real/path"}, "URL")
+    assert result == {"output": {"path": "/not/a/real/path", "exists": False}, "error": ""}
+    mocked_post.assert_awaited_with("URL", result)
+
+    result = await conn.execute_action("unknown_action")
+    assert result["error"] == "Action unknown_action failed: Unknown action: unknown_action"
+
+    # Run through the message handler
+    mocked_execute = mocker.patch(f"{MODULE}.ConnectionManager.execute_action")
+    message = {"action": "process_list", "parameters": {"name": "python"}, "post_id": ORG_ID}
+    assert await conn.handle_message(mocker.MagicMock(data=json.dumps(message))) is None
+    mocked_execute.assert_awaited_with(
+        "process_list", {"name": "python"}, mocker.ANY, None, False, post_id=ORG_ID, leave_slot=mocker.ANY
+    )
+
+    message["report_changes_only"] = True
+    assert await conn.handle_message(mocker.MagicMock(data=json.dumps(message))) is None
+    assert mocked_execute.call_args.args[3]
+
+    mocked_execute.side_effect = Exception
+    assert await conn.handle_message(mocker.MagicMock(data=json.dumps(message))) is None
+
+    # Reject native actions when busy
+    mocked_busy = mocker.patch.object(conn, "send_busy_response")
+    mocker.patch.object(conn.admission_controller, "try_admit", return_value=False)
+    assert await conn.handle_message(mocker.MagicMock(data=json.dumps(message))) is None
+    mocked_busy.assert_awaited()
+
+
+@pytest.mark.asyncio
+async def test_execute_action_pages(mocker: MockerFixture, tmp_path) -> None:
+    """
+    Test ConnectionManager.execute_action() streaming pages of results.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+        tmp_path (Path): Temporary directory of the test.
+    """
+    mocker.patch(f"{MODULE}.IoTHubDeviceClient.create_from_connection_string")
+    for index in range(3):
+        (tmp_path / f"file{index}.txt").write_text("hello")
+
+    conn = ConnectionManager(CONFIG_DATA)
+    mocked_post = mocker.patch.object(conn, "post_results")
+
+    result = await conn.execute_action("file_search", {"root": str(tmp_path), "page_size": 1}, "URL")
+    assert result["output"]["pages_sent"] == 3
+    assert [call.args[1].get("page") for call in mocked_post.call_args_list] == [1, 2, 3, None]
+    assert mocked_post.call_args_list[0].args[1]["partial"] is True
+
+
+@pytest.mark.asyncio
+async def test_post_results(mocker: MockerFixture) -> None:
+    """
+    Test ConnectionManager.post_results() encoding large nested results in the process pool.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+    """
+    mocker.patch(f"{MODULE}.IoTHubDeviceClient.create_from_connection_string")
+    mocker.patch(f"{MODULE}.LARGE_RESULT_ITEMS", 10)
+    mocked_client = mocker.AsyncMock()
+    mocked_client.post.return_value = mocker.MagicMock(status_code=200)
+    mocked_async_client = mocker.patch("httpx.AsyncClient")
+    mocked_async_client.return_value.__aenter__.return_value = mocked_client
+    mocked_pool = mocker.patch(f"{MODULE}.get_process_pool")
+    mocked_pool.return_value.run = mocker.AsyncMock(return_value=b"{}")
+
+    conn = ConnectionManager(CONFIG_DATA)
+
+    await conn.post_results("URL", {"output": "small", "error": ""})
+    mocked_client.post.assert_awaited_with("URL", json={"output": "small", "error": ""})
+
+    await conn.post_results("URL", {"output": list(range(11)), "error": ""})
+    mocked_client.post.assert_awaited_with(
+        "URL", content=b"{}", headers={"Content-Type": "application/json"}
+    )
+
+    # Plain strings are always encoded in place
+    await conn.post_results("URL", {"output": "x" * 11, "error": ""})
+    mocked_client.post.assert_awaited_with("URL", json={"output": "x" * 11, "error": ""})
+    assert mocked_pool.return_value.run.await_count == 1
+
+    # Webhook already fulfilled and error responses
+    mocked_client.post.return_value = mocker.MagicMock(status_code=400, text="Fulfilled")
+    assert await conn.post_results("URL", {"output": "", "error": ""}) is True
+    mocked_client.post.return_value = mocker.MagicMock(status_code=500, text="Error")
+    assert await conn.post_results("URL", {"output": "", "error": ""}) is False
+
+
+@pytest.mark.asyncio
+async def test_handle_message_busy(mocker: MockerFixture) -> None:
+    """
+    Test ConnectionManager.handle_message() rejecting jobs when the agent is busy.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+    """
+    mocker.patch(f"{MODULE}.IoTHubDeviceClient.create_from_connection_string")
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def slow_execute(*args, **kwargs) -> None:
+        started.set()
+        await release.wait()
+
+    mocked_execute = mocker.patch(
+        f"{MODULE}.ConnectionManager.execute_commands", side_effect=slow_execute
+    )
+
+    conn = ConnectionManager({**CONFIG_DATA, "max_pending_jobs": 1, "busy_retry_after": 7})
+    mocked_post = mocker.patch.object(conn, "post_results")
+    message = mocker.MagicMock(
+        data=json.dumps({"commands": "ZWNobw==", "post_id": ORG_ID})
+    )
+
+    first = asyncio.create_task(conn.handle_message(message))
+    await started.wait()
+
+    assert await conn.handle_message(message) is None
+    busy_message = mocked_post.call_args.args[1]
+    assert busy_message["busy"] is True
+    assert busy_message["retry_after"] == 7
+    assert mocked_execute.call_count == 1
+
+    # A new connection manager keeps counting the jobs in flight
+    reconnected = ConnectionManager({**CONFIG_DATA, "max_pending_jobs": 1})
+    assert reconnected.admission_controller.pending_jobs == 1
+    assert not reconnected.admission_controller.try_admit()
+
+    release.set()
+    await first
+    assert conn.admission_controller.pending_jobs == 0
+
+    # Busy response without post url
+    assert (await conn.send_busy_response(None))["busy"] is True
+
+
+@pytest.mark.asyncio
+async def test_handle_message_cacheable(mocker: MockerFixture, tmp_path) -> None:
+    """
+    Test ConnectionManager.handle_message() serving cacheable jobs from the result cache.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+        tmp_path (Path): Temporary directory of the cached results.
+    """
+    mocker.patch(f"{MODULE}.IoTHubDeviceClient.create_from_connection_string")
+    mocker.patch(f"{MODULE}.get_data_directory", return_value=str(tmp_path))
+    mocked_execute = mocker.patch(
+        f"{MODULE}.ConnectionManager.execute_commands",
+        return_value={"output": "build 1234", "error": ""},
+    )
+
+    conn = ConnectionManager(CONFIG_DATA)
+    mocked_post = mocker.patch.object(conn, "post_results")
+    message = mocker.MagicMock(
+        data=json.dumps({"commands": "ZWNobw==", "post_id": ORG_ID, "cacheable": True, "ttl": 60})
+    )
+
+    assert await conn.handle_message(message) is None
+    assert mocked_execute.call_count == 1
+    mocked_post.assert_not_called()
+
+    assert await conn.handle_message(message) is None
+    assert mocked_execute.call_count == 1
+    cached_result = mocked_post.call_args.args[1]
+    assert cached_result["output"] == "build 1234"
+    assert cached_result["cached"] is True
+    assert cached_result["cache_age"] >= 0
+    assert len(list(tmp_path.iterdir())) == 1
+
+    # Another interpreter is not served from the cache
+    message.data = json.dumps({"commands": "ZWNobw==", "interpreter_override": "pwsh", "cacheable": True, "ttl": 60})
+    assert await conn.handle_message(message) is None
+    assert mocked_execute.call_count == 2
+
+    # Failed and non cacheable jobs are always executed
+    mocked_execute.return_value = {"output": "", "error": "failed"}
+    message.data = json.dumps({"commands": "ZXhpdCAx", "cacheable": True, "ttl": 60})
+    assert await conn.handle_message(message) is None
+    assert await conn.handle_message(message) is None
+    message.data = json.dumps({"commands": "ZWNobw=="})
+    assert await conn.handle_message(message) is None
+    assert mocked_execute.call_count == 5
+
+
+@pytest.mark.asyncio
+async def test_handle_message_cacheable_in_flight(mocker: MockerFixture) -> None:
+    """
+    Test ConnectionManager.handle_message() running identical cacheable jobs received together once.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+    """
+    mocker.patch(f"{MODULE}.IoTHubDeviceClient.create_from_connection_string")
+    release = asyncio.Event()
+
+    async def slow_execute(*args, **kwargs):
+        await release.wait()
+        return {"output": "build 1234", "error": ""}
+
+    mocked_execute = mocker.patch(
+        f"{MODULE}.ConnectionManager.execute_commands", side_effect=slow_execute
+    )
+
+    conn = ConnectionManager(CONFIG_DATA)
+    mocked_post = mocker.patch.object(conn, "post_results")
+
+    # Cacheable jobs without a ttl are cached for the default time to live
+    assert conn.get_cache_ttl({"cacheable": True}) == 300
+    assert conn.get_cache_ttl({"cacheable": True, "ttl": "invalid"}) == 300
+    assert conn.get_cache_ttl({"ttl": 60}) == 0
+
+    message = mocker.MagicMock(
+        data=json.dumps({"commands": "ZWNobw==", "post_id": ORG_ID, "cacheable": True})
+    )
+    tasks = [asyncio.create_task(conn.handle_message(message)) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    release.set()
+    await asyncio.gather(*tasks)
+
+    assert mocked_execute.call_count == 1
+    served = [call.args[1] for call in mocked_post.call_args_list]
+    assert len(served) == 2
+    assert all(result["cached"] is True and result["output"] == "build 1234" for result in served)
+
+    # Identical jobs of a failed job get its failure
+    async def slow_failure(*args, **kwargs):
+        await asyncio.sleep(0.01)
+        raise Exception
+
+    mocked_execute.side_effect = slow_failure
+    message.data = json.dumps({"commands": "ZXhpdA==", "post_id": ORG_ID, "cacheable": True})
+    tasks = [asyncio.create_task(conn.handle_message(message)) for _ in range(2)]
+    await asyncio.gather(*tasks)
+    assert mocked_execute.call_count == 2
+    assert mocked_post.call_args.args[1]["error"] == "Identical cacheable job failed"
+
+
 @pytest.mark.asyncio
 @pytest.mark.parametrize("platform", ("Windows", "Linux", "Darwin"))
 async def test_get_installation(mocker: MockerFixture, platform: str) -> None:
@@ -427,3 +1093,102 @@ async def test_iot_hub_connection_loop(mocker: MockerFixture, platform: str) ->
         iot_hub_connection_loop(CONFIG_DATA, stop_event), trigger_signal(0.5)
     )
     assert result is None
+
+
+@pytest.mark.asyncio
+async def test_iot_hub_connection_loop_reconnect(mocker: MockerFixture) -> None:
+    """
+    Test iot_hub_connection_loop() reconnects with the same client after the connection dropped.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+    """
+    mocked_client = mocker.AsyncMock()
+    mocked_client.connected = False
+    create_client = mocker.patch(
+        f"{MODULE}.IoTHubDeviceClient.create_from_connection_string",
+        return_value=mocked_client,
+    )
+    mocker.patch(f"{MODULE}.reload_configuration", side_effect=lambda config_data: config_data)
+
+    async def connect() -> None:
+        mocked_client.connected = True
+
+    mocked_client.connect.side_effect = connect
+
+    stop_event = asyncio.Event()
+
+    async def drop_then_stop() -> None:
+        await asyncio.sleep(0.1)
+
+        def drop() -> None:
+            mocked_client.connected = False
+            mocked_client.on_connection_state_change()
+
+        await asyncio.to_thread(drop)
+        await asyncio.sleep(0.1)
+        stop_event.set()
+
+    await asyncio.wait_for(
+        asyncio.gather(iot_hub_connection_loop(CONFIG_DATA, stop_event, False), drop_then_stop()), 5
+    )
+
+    create_client.assert_called_once()
+    assert mocked_client.connect.await_count == 2
+    mocked_client.shutdown.assert_not_awaited()
+    mocked_client.disconnect.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_multi_org_connection_loop(mocker: MockerFixture) -> None:
+    """
+    Test multi_org_connection_loop() runs one connection loop per organization on the shared event loop.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+    """
+    other_config = {**CONFIG_DATA, "rewst_org_id": str(uuid.uuid4())}
+    mocked_loop = mocker.patch(
+        f"{MODULE}.iot_hub_connection_loop", side_effect=[None, Exception("broken")]
+    )
+    stop_event = asyncio.Event()
+
+    assert await multi_org_connection_loop([CONFIG_DATA, other_config], stop_event, False) is None
+
+    assert mocked_loop.await_args_list == [
+        mocker.call(CONFIG_DATA, stop_event, False),
+        mocker.call(other_config, stop_event, False),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_multi_org_isolation(mocker: MockerFixture) -> None:
+    """
+    Test the connection managers of several organizations keep their own queues, limits and results.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+    """
+    mocker.patch(f"{MODULE}.IoTHubDeviceClient.create_from_connection_string")
+    mocker.patch(f"{MODULE}.get_admission_controller", side_effect=get_admission_controller)
+    mocker.patch(f"{MODULE}.get_change_reporter", side_effect=get_change_reporter)
+    first_config = {**CONFIG_DATA, "rewst_org_id": str(uuid.uuid4()), "max_pending_jobs": 1}
+    first = ConnectionManager(first_config, False)
+    second = ConnectionManager({**CONFIG_DATA, "rewst_org_id": str(uuid.uuid4()), "max_pending_jobs": 4}, False)
+
+    assert first.telemetry is not second.telemetry
+    assert first.reported_properties is not second.reported_properties
+    assert first.result_cache is not second.result_cache
+    assert first.change_reporter is not second.change_reporter
+    assert first.admission_controller is not second.admission_controller
+
+    # Limits and jobs of an organization do not apply to another one
+    assert first.admission_controller.try_admit()
+    second.apply_settings({"max_running_jobs": 7})
+    assert first.admission_controller.max_pending_jobs == 1
+    assert first.admission_controller.max_running_jobs != 7
+    assert second.admission_controller.pending_jobs == 0
+
+    # A reconnecting organization keeps counting its jobs in flight
+    assert ConnectionManager(first_config, False).admission_controller.pending_jobs == 1
+    first.admission_controller.release()
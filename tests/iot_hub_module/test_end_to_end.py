@@ -0,0 +1,282 @@
+"""
+End-to-end tests of the IoT Hub connection loop against a local IoT Hub and webhook sink
+"""
+
+import asyncio
+import os
+import uuid
+from base64 import b64encode
+from typing import AsyncIterator, Iterator
+import pytest
+import pytest_asyncio
+from pytest_mock import MockerFixture
+from iot_hub_module.admission_control import AdmissionController
+from iot_hub_module.change_reporting import ChangeReporter
+from iot_hub_module.connection_management import ConnectionManager, iot_hub_connection_loop
+from iot_hub_module.reconnect_policy import ReconnectPolicy
+from iot_hub_module.telemetry import TelemetryChannel
+from tests.fakes.http_sink import WebhookSink
+from tests.fakes.iot_hub import FakeIoTHub
+
+# Constants
+MODULE = "iot_hub_module.connection_management"
+ORG_ID = str(uuid.uuid4())
+CONFIG_DATA = {
+    "azure_iot_hub_host": "azure.com",
+    "device_id": ORG_ID,
+    "shared_access_key": ORG_ID,
+    "rewst_engine_host": "engine.rewst.io",
+    "rewst_org_id": ORG_ID,
+    "offline_buffer": False,
+    "execution_journal": False,
+    "heartbeat": False,
+    "reconnect_initial_delay": 0.01,
+    "reported_properties_debounce": 0.01,
+}
+
+
+@pytest.fixture(autouse=True)
+def isolated_agent(mocker: MockerFixture, tmp_path) -> None:
+    """
+    Keep the agent state of the tests in a temporary directory, with their own reporter and admission controller.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+        tmp_path (Path): Temporary directory.
+    """
+    mocker.patch(f"{MODULE}.get_data_directory", return_value=str(tmp_path))
+    mocker.patch(f"{MODULE}.get_change_reporter", return_value=ChangeReporter())
+    mocker.patch(f"{MODULE}.get_admission_controller", return_value=AdmissionController())
+    mocker.patch(f"{MODULE}.reload_configuration", side_effect=lambda config_data: config_data)
+
+
+@pytest.fixture
+def hub(mocker: MockerFixture) -> Iterator[FakeIoTHub]:
+    """
+    Make the agent connect to a local IoT Hub.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+
+    Yields:
+        FakeIoTHub: IoT Hub of the agent.
+    """
+    fake_hub = FakeIoTHub()
+    fake_hub.install(mocker)
+    yield fake_hub
+    fake_hub.close()
+
+
+@pytest.fixture
+def sink(mocker: MockerFixture) -> Iterator[WebhookSink]:
+    """
+    Make the agent post its webhooks to a local sink.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+
+    Yields:
+        WebhookSink: Webhook sink of the agent.
+    """
+    webhook_sink = WebhookSink()
+    webhook_sink.install(mocker)
+    yield webhook_sink
+    webhook_sink.close()
+
+
+@pytest_asyncio.fixture(loop_scope="function")
+async def stop_event(hub: FakeIoTHub, sink: WebhookSink) -> AsyncIterator[asyncio.Event]:
+    """
+    Run the IoT Hub connection loop until it is online, and stop it when the test ends.
+
+    Args:
+        hub (FakeIoTHub): IoT Hub of the agent.
+        sink (WebhookSink): Webhook sink of the agent.
+
+    Yields:
+        asyncio.Event: Stop event of the loop.
+    """
+    event = asyncio.Event()
+    loop_task = asyncio.create_task(iot_hub_connection_loop(CONFIG_DATA, event, False))
+    try:
+        await hub.wait_for(lambda: hub.reported.get("connectivity", {}).get("status") == "online")
+        yield event
+    finally:
+        event.set()
+        await asyncio.wait_for(loop_task, 5)
+
+
+@pytest.mark.asyncio
+async def test_connect_and_stop(hub: FakeIoTHub, stop_event: asyncio.Event) -> None:
+    """
+    Test the agent reports itself online after connecting, and offline before disconnecting when stopped.
+
+    Args:
+        hub (FakeIoTHub): IoT Hub of the agent.
+        stop_event (asyncio.Event): Stop event of the agent.
+    """
+    [client] = hub.clients
+    assert client.connected
+    assert hub.reported_patches[0]["connectivity"] == {"status": "online"}
+
+    stop_event.set()
+    await hub.wait_for(lambda: not client.connected)
+    assert hub.reported["connectivity"] == {"status": "offline"}
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(os.name == "nt", reason="Runs a bash script")
+async def test_commands_posted_to_webhook(hub: FakeIoTHub, sink: WebhookSink, stop_event: asyncio.Event) -> None:
+    """
+    Test a cloud to device message runs its commands and posts the results to the webhook.
+
+    Args:
+        hub (FakeIoTHub): IoT Hub of the agent.
+        sink (WebhookSink): Webhook sink of the agent.
+        stop_event (asyncio.Event): Stop event of the agent.
+    """
+    hub.inject_message({
+        "commands": b64encode(b"echo hello").decode(),
+        "post_id": "action:123",
+        "interpreter_override": "/bin/bash",
+    })
+
+    [request] = await hub.wait_for(lambda: sink.get_requests("/webhooks/custom/action/action/123"))
+    assert request.json()["output"] == "hello\n"
+    assert request.json()["error"] == ""
+
+
+@pytest.mark.asyncio
+async def test_get_installation_posted_to_webhook(mocker: MockerFixture, hub: FakeIoTHub, sink: WebhookSink,
+                                                  stop_event: asyncio.Event) -> None:
+    """
+    Test a get_installation message posts the installation data to the webhook.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+        hub (FakeIoTHub): IoT Hub of the agent.
+        sink (WebhookSink): Webhook sink of the agent.
+        stop_event (asyncio.Event): Stop event of the agent.
+    """
+    mocker.patch(f"{MODULE}.build_host_tags", return_value={"agent_version": "test"})
+    hub.inject_message({"get_installation": True, "post_id": "install:1"})
+
+    [request] = await hub.wait_for(lambda: sink.get_requests("/webhooks/custom/action/install/1"))
+    assert ORG_ID in request.json()["config_file_path"]
+    assert request.json()["tags"] == {"agent_version": "test"}
+
+
+@pytest.mark.asyncio
+async def test_reconnect_after_dropped_connection(hub: FakeIoTHub, stop_event: asyncio.Event) -> None:
+    """
+    Test the agent reconnects with the same client after the connection drops, and keeps handling messages.
+
+    Args:
+        hub (FakeIoTHub): IoT Hub of the agent.
+        stop_event (asyncio.Event): Stop event of the agent.
+    """
+    hub.drop_connection()
+    await hub.wait_for(lambda: hub.connections == 2)
+    assert len(hub.clients) == 1
+
+    request_id = hub.invoke_method("ping", "again")
+    response = await hub.wait_for(lambda: hub.get_method_response(request_id))
+    assert response.payload["pong"] == "again"
+
+
+@pytest.mark.asyncio
+async def test_reconnect_while_hub_unreachable(hub: FakeIoTHub, stop_event: asyncio.Event) -> None:
+    """
+    Test the agent keeps trying to reconnect while the IoT Hub refuses connections.
+
+    Args:
+        hub (FakeIoTHub): IoT Hub of the agent.
+        stop_event (asyncio.Event): Stop event of the agent.
+    """
+    hub.refuse_connections = True
+    hub.drop_connection()
+    await asyncio.sleep(0.1)
+    assert hub.connected_client is None
+
+    hub.refuse_connections = False
+    client = await hub.wait_for(lambda: hub.connected_client)
+    assert client.on_message_received is not None
+    assert hub.connections == 2
+
+
+@pytest.mark.asyncio
+async def test_desired_properties_and_direct_methods(hub: FakeIoTHub, stop_event: asyncio.Event) -> None:
+    """
+    Test the agent applies desired properties patches and answers direct methods.
+
+    Args:
+        hub (FakeIoTHub): IoT Hub of the agent.
+        stop_event (asyncio.Event): Stop event of the agent.
+    """
+    hub.patch_desired_properties({"agent_settings": {"max_running_jobs": 3, "device_id": "other"}})
+
+    settings = await hub.wait_for(lambda: hub.reported.get("agent_settings"))
+    assert settings["applied_version"] == hub.desired["$version"]
+    assert settings["rejected"] == ["device_id: cannot be changed live"]
+
+    request_id = hub.invoke_method("agent_status")
+    response = await hub.wait_for(lambda: hub.get_method_response(request_id))
+    assert response.status == 200
+    assert response.payload["max_running_jobs"] == 3
+    assert response.payload["settings_version"] == hub.desired["$version"]
+
+
+@pytest.mark.asyncio
+async def test_backoff_until_connected(mocker: MockerFixture, hub: FakeIoTHub) -> None:
+    """
+    Test the agent keeps backing off without going online while no transport connects.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+        hub (FakeIoTHub): IoT Hub of the agent.
+    """
+    connected = mocker.spy(ReconnectPolicy, "connected")
+    resume = mocker.spy(TelemetryChannel, "resume")
+    hub.refuse_connections = True
+    stop_event = asyncio.Event()
+    loop_task = asyncio.create_task(iot_hub_connection_loop(CONFIG_DATA, stop_event, False))
+    try:
+        await asyncio.sleep(0.2)
+        assert len(hub.clients) >= 2
+        connected.assert_not_called()
+        resume.assert_not_called()
+        assert hub.reported_patches == []
+
+        hub.refuse_connections = False
+        await hub.wait_for(lambda: hub.reported.get("connectivity", {}).get("status") == "online")
+        connected.assert_called_once()
+        resume.assert_called_once()
+    finally:
+        stop_event.set()
+        await asyncio.wait_for(loop_task, 5)
+
+
+@pytest.mark.asyncio
+async def test_rebuild_client_after_credentials_rejected(mocker: MockerFixture, hub: FakeIoTHub) -> None:
+    """
+    Test the agent rebuilds its client after the IoT Hub rejected its credentials.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+        hub (FakeIoTHub): IoT Hub of the agent.
+    """
+    reconnect = mocker.spy(ConnectionManager, "reconnect")
+    hub.reject_credentials = True
+    stop_event = asyncio.Event()
+    loop_task = asyncio.create_task(iot_hub_connection_loop(CONFIG_DATA, stop_event, False))
+    try:
+        await hub.wait_for(lambda: reconnect.call_count)
+        assert reconnect.call_args.args[2] is True
+
+        hub.reject_credentials = False
+        await hub.wait_for(lambda: hub.reported.get("connectivity", {}).get("status") == "online")
+        assert hub.connected_client is not hub.clients[0]
+        assert hub.clients[0].shut_down
+    finally:
+        stop_event.set()
+        await asyncio.wait_for(loop_task, 5)
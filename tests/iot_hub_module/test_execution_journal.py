@@ -0,0 +1,157 @@
+"""
+Tests for execution journal module
+"""
+
+import os
+import sqlite3
+import time
+import pytest
+from pytest_mock import MockerFixture
+from iot_hub_module.execution_journal import (
+    ExecutionJournal,
+    get_result_size,
+    get_script_hash,
+)
+
+# Constants
+MODULE = "iot_hub_module.execution_journal"
+NOW = time.time()
+
+
+def count_rows(database_path: str) -> int:
+    """
+    Count the executions written to a journal database.
+
+    Args:
+        database_path (str): Database file path.
+
+    Returns:
+        int: Number of executions.
+    """
+    if not os.path.exists(database_path):
+        return 0
+    with sqlite3.connect(database_path) as connection:
+        return connection.execute("SELECT COUNT(*) FROM executions").fetchone()[0]
+
+
+def test_get_script_hash() -> None:
+    """
+    Test the get_script_hash() function.
+    """
+    assert get_script_hash("ZWNobw==") == get_script_hash(b"ZWNobw==")
+    assert get_script_hash("ZWNobw==") != get_script_hash("ZXhpdA==")
+
+
+def test_get_result_size() -> None:
+    """
+    Test the get_result_size() function.
+    """
+    assert get_result_size(None) == 0
+    assert get_result_size({"output": "abc", "error": "de"}) == 5
+    assert get_result_size({"output": {"a": 1}, "error": ""}) == len('{"a": 1}')
+
+
+def test_execution_journal_batches(tmp_path) -> None:
+    """
+    Test ExecutionJournal writing executions in batches, in WAL mode.
+
+    Args:
+        tmp_path (Path): Temporary directory of the database.
+    """
+    database_path = str(tmp_path / "journal.sqlite3")
+    journal = ExecutionJournal(database_path, batch_size=3, flush_interval=3600)
+
+    journal.record("commands", NOW, 1.5, post_id="a", script_hash="x", interpreter="/bin/bash", exit_code=0)
+    journal.record("commands", NOW + 1, 2.5, post_id="b", script_hash="x", interpreter="/bin/bash", exit_code=1,
+                   failed=True)
+    assert count_rows(database_path) == 0
+
+    journal.record("action", NOW + 2, 0.5, name="disk_usage", result_size=10)
+    assert count_rows(database_path) == 3
+
+    with sqlite3.connect(database_path) as connection:
+        assert connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    # Pending executions are written on close
+    journal.record("action", NOW + 3, 0.5, name="disk_usage")
+    journal.close()
+    assert count_rows(database_path) == 4
+
+
+def test_execution_journal_flush_interval(mocker: MockerFixture, tmp_path) -> None:
+    """
+    Test ExecutionJournal writing pending executions once they are old enough.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+        tmp_path (Path): Temporary directory of the database.
+    """
+    mocked_monotonic = mocker.patch(f"{MODULE}.time.monotonic", return_value=100.0)
+    database_path = str(tmp_path / "journal.sqlite3")
+    journal = ExecutionJournal(database_path, batch_size=100, flush_interval=5)
+
+    journal.record("commands", NOW, 1.0)
+    assert count_rows(database_path) == 0
+
+    mocked_monotonic.return_value = 106.0
+    journal.record("commands", NOW + 1, 1.0)
+    assert count_rows(database_path) == 2
+
+
+def test_execution_journal_prune(mocker: MockerFixture, tmp_path) -> None:
+    """
+    Test ExecutionJournal pruning executions older than the retention period.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+        tmp_path (Path): Temporary directory of the database.
+    """
+    mocker.patch(f"{MODULE}.time.time", return_value=10 * 86400.0)
+    journal = ExecutionJournal(str(tmp_path / "journal.sqlite3"), retention_days=2, batch_size=1)
+
+    # Old executions are pruned on the first write
+    journal.record("commands", 1 * 86400.0, 1.0)
+    journal.record("commands", 9 * 86400.0, 1.0)
+    assert [row["started_at"] for row in journal.query()] == [9 * 86400.0]
+
+    assert journal.prune(now=12 * 86400.0) == 1
+    assert journal.query() == []
+
+
+def test_execution_journal_query(tmp_path) -> None:
+    """
+    Test ExecutionJournal querying recent executions and statistics.
+
+    Args:
+        tmp_path (Path): Temporary directory of the database.
+    """
+    journal = ExecutionJournal(str(tmp_path / "journal.sqlite3"), batch_size=100, flush_interval=3600)
+    for i in range(5):
+        journal.record("commands", NOW + i, 1.0 + i, script_hash="slow", interpreter="/bin/bash",
+                       exit_code=i % 2, failed=bool(i % 2), result_size=100)
+    journal.record("action", NOW + 1000, 0.5, name="disk_usage", result_size=10)
+
+    # Pending executions are visible to queries
+    executions = journal.query(limit=3)
+    assert [execution["started_at"] for execution in executions] == [NOW + 1000, NOW + 4, NOW + 3]
+    assert executions[0]["name"] == "disk_usage"
+    assert len(journal.query(since=NOW + 3)) == 3
+    assert len(journal.query(filters={"script_hash": "slow", "exit_code": 1})) == 2
+
+    aggregates = journal.aggregate("script_hash")
+    assert aggregates[0] == {
+        "script_hash": "slow",
+        "executions": 5,
+        "failures": 2,
+        "avg_duration": 3.0,
+        "max_duration": 5.0,
+        "total_duration": 15.0,
+        "avg_result_size": 100.0,
+        "last_started_at": NOW + 4,
+    }
+    assert aggregates[1]["executions"] == 1
+
+    with pytest.raises(ValueError):
+        journal.aggregate("post_id")
+    with pytest.raises(ValueError):
+        journal.query(filters={"1=1; DROP TABLE executions; --": 1})
@@ -0,0 +1,104 @@
+"""
+Tests for heartbeat module
+"""
+
+import asyncio
+import pytest
+from iot_hub_module.heartbeat import (
+    Heartbeat,
+    sample_host_health,
+)
+
+SAMPLE = {"cpu_percent": 20.0, "memory_percent": 50.0, "disk_percent": 70.0, "load_1": 1.0}
+
+
+def test_sample_host_health() -> None:
+    """
+    Test sample_host_health().
+    """
+    sample = sample_host_health()
+
+    assert set(sample) >= {"cpu_percent", "memory_percent", "swap_percent", "disk_percent", "load_1"}
+    assert all(isinstance(value, float) for value in sample.values())
+
+
+def test_build_message() -> None:
+    """
+    Test Heartbeat.build_message() only carries the metrics that changed beyond their threshold.
+    """
+    heartbeat = Heartbeat(print, full_snapshot_interval=100)
+
+    message = heartbeat.build_message(SAMPLE, 1000)
+    assert message == {"type": "heartbeat", "timestamp": 1000, "full": True, **SAMPLE}
+
+    message = heartbeat.build_message({**SAMPLE, "cpu_percent": 25.0, "memory_percent": 60.0}, 1010)
+    assert message == {"type": "heartbeat", "timestamp": 1010, "full": False, "memory_percent": 60.0}
+
+    # Changes are measured against the last full snapshot
+    message = heartbeat.build_message({**SAMPLE, "cpu_percent": 31.0}, 1020)
+    assert message == {"type": "heartbeat", "timestamp": 1020, "full": False, "cpu_percent": 31.0}
+
+    message = heartbeat.build_message({**SAMPLE, "cpu_percent": 31.0}, 1100)
+    assert message["full"]
+    message = heartbeat.build_message({**SAMPLE, "cpu_percent": 31.0}, 1110)
+    assert message == {"type": "heartbeat", "timestamp": 1110, "full": False}
+
+
+def test_next_interval() -> None:
+    """
+    Test Heartbeat.next_interval() slows down while stable and speeds up on changes.
+    """
+    heartbeat = Heartbeat(print, min_interval=10, max_interval=60)
+    assert heartbeat.interval == 10
+
+    assert [heartbeat.next_interval(False) for _ in range(6)] == [15, 22.5, 33.75, 50.625, 60, 60]
+    assert heartbeat.next_interval(True) == 30
+    assert heartbeat.next_interval(True) == 15
+    assert heartbeat.next_interval(True) == 10
+
+
+def test_has_changed() -> None:
+    """
+    Test Heartbeat.has_changed() compares each sample with the previous one.
+    """
+    heartbeat = Heartbeat(print)
+
+    assert not heartbeat.has_changed(SAMPLE)
+    assert heartbeat.has_changed({**SAMPLE, "cpu_percent": 40.0})
+    assert not heartbeat.has_changed({**SAMPLE, "cpu_percent": 45.0})
+    assert heartbeat.has_changed({**SAMPLE, "cpu_percent": 45.0, "swap_percent": 0.0})
+
+
+@pytest.mark.asyncio
+async def test_beat_after_step_change() -> None:
+    """
+    Test Heartbeat.beat() slows down again once the metrics are stable after a step change, while the messages
+    keep carrying the change since the last full snapshot.
+    """
+    samples = iter([SAMPLE] * 3 + [{**SAMPLE, "cpu_percent": 80.0}] * 4)
+    messages = []
+    heartbeat = Heartbeat(messages.append, sample=lambda: next(samples), min_interval=10, max_interval=60)
+
+    assert [await heartbeat.beat() for _ in range(7)] == [15, 22.5, 33.75, 16.875, 25.3125, 37.96875, 56.953125]
+    assert all(message["cpu_percent"] == 80.0 for message in messages[3:])
+
+
+@pytest.mark.asyncio
+async def test_start() -> None:
+    """
+    Test Heartbeat.start() sends heartbeats until closed.
+    """
+    messages = []
+    heartbeat = Heartbeat(messages.append, sample=lambda: SAMPLE, min_interval=0.01, max_interval=0.02)
+
+    heartbeat.start()
+    heartbeat.start()
+    await asyncio.sleep(0.1)
+    await heartbeat.close()
+    count = len(messages)
+    await asyncio.sleep(0.05)
+
+    assert count >= 3
+    assert len(messages) == count
+    assert messages[0]["full"]
+    assert messages[1] == {"type": "heartbeat", "timestamp": messages[1]["timestamp"], "full": False}
@@ -0,0 +1,34 @@
+"""
+Tests for live settings module
+"""
+
+from iot_hub_module.live_settings import parse_settings
+
+
+def test_parse_settings() -> None:
+    """
+    Test parse_settings().
+    """
+    valid, rejected = parse_settings({
+        "max_running_jobs": 8,
+        "post_timeout": 12.5,
+        "log_level": "debug",
+        "result_cache_max_entries": 0,
+        "process_pool_workers": True,
+        "shared_access_key": "secret",
+        "busy_retry_after": None,
+    })
+
+    assert valid == {"max_running_jobs": 8, "post_timeout": 12.5, "log_level": "DEBUG"}
+    assert set(rejected) == {"result_cache_max_entries", "process_pool_workers", "shared_access_key"}
+    assert rejected["shared_access_key"] == "cannot be changed live"
+
+
+def test_parse_settings_heartbeat() -> None:
+    """
+    Test parse_settings() rejects a heartbeat interval range upside down.
+    """
+    valid, rejected = parse_settings({"heartbeat_min_interval": 60, "heartbeat_max_interval": 30})
+
+    assert valid == {"heartbeat_max_interval": 30}
+    assert "heartbeat_min_interval" in rejected
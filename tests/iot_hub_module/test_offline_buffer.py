@@ -0,0 +1,104 @@
+"""
+Tests for offline buffer module
+"""
+
+import os
+from iot_hub_module.offline_buffer import OfflineBuffer
+
+
+def records(start: int, stop: int) -> list:
+    """
+    Make JSON encoded records.
+
+    Args:
+        start (int): First record number.
+        stop (int): Record number after the last.
+
+    Returns:
+        list: Records.
+    """
+    return [b'{"i": %d}' % i for i in range(start, stop)]
+
+
+def drain(buffer: OfflineBuffer, max_size: int = 1024) -> list:
+    """
+    Read and consume all the records of a buffer.
+
+    Args:
+        buffer (OfflineBuffer): Offline buffer.
+        max_size (int, optional): Maximum size read at once. Defaults to 1024.
+
+    Returns:
+        list: Records.
+    """
+    result = []
+    while buffer:
+        batch = buffer.peek(max_size)
+        buffer.consume(len(batch))
+        result.extend(batch)
+    return result
+
+
+def test_append_peek_consume(tmp_path) -> None:
+    """
+    Test OfflineBuffer.append(), OfflineBuffer.peek() and OfflineBuffer.consume().
+
+    Args:
+        tmp_path (Path): Temporary directory.
+    """
+    buffer = OfflineBuffer(str(tmp_path), segment_size=64)
+    assert not buffer
+
+    buffer.append(records(0, 10))
+    buffer.append(records(10, 20))
+    assert buffer
+
+    batch = buffer.peek(30)
+    assert batch == records(0, 3)
+
+    # Records are only consumed when asked to
+    assert buffer.peek(30) == batch
+    buffer.consume(len(batch))
+
+    # Appends while draining go after the records being read
+    buffer.append(records(20, 25))
+    assert drain(buffer) == records(3, 25)
+    assert os.listdir(tmp_path) == []
+
+
+def test_reopen(tmp_path) -> None:
+    """
+    Test OfflineBuffer picks up the records of a previous run, skipping a record cut short.
+
+    Args:
+        tmp_path (Path): Temporary directory.
+    """
+    buffer = OfflineBuffer(str(tmp_path), segment_size=64)
+    buffer.append(records(0, 20))
+    buffer.append(records(20, 30))
+    with open(tmp_path / os.listdir(tmp_path)[-1], "ab") as f:
+        f.write(b'{"i": 3')
+
+    buffer = OfflineBuffer(str(tmp_path), segment_size=64)
+    assert drain(buffer) == records(0, 30)
+
+    # Numbering goes on after the previous segments
+    buffer.append(records(30, 31))
+    assert drain(buffer) == records(30, 31)
+
+
+def test_drop_oldest(tmp_path) -> None:
+    """
+    Test OfflineBuffer.append() drops the oldest segment when full.
+
+    Args:
+        tmp_path (Path): Temporary directory.
+    """
+    buffer = OfflineBuffer(str(tmp_path), segment_size=1, max_segments=3)
+
+    for i in range(5):
+        buffer.append(records(i, i + 1))
+
+    assert buffer.dropped_segments == 2
+    assert len(os.listdir(tmp_path)) == 3
+    assert drain(buffer) == records(2, 5)
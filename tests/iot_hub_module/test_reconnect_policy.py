@@ -0,0 +1,90 @@
+"""
+Tests for reconnect policy module
+"""
+
+from iot_hub_module.reconnect_policy import (
+    DEFAULT_MAX_DELAY,
+    ReconnectPolicy,
+)
+
+
+class FakeClock:
+    """
+    Clock advanced by the tests.
+    """
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_next_delay() -> None:
+    """
+    Test ReconnectPolicy.next_delay() grows exponentially up to the cap.
+    """
+    policy = ReconnectPolicy(initial_delay=1, max_delay=10, multiplier=2,
+                             clock=FakeClock(), rand=lambda: 1.0)
+
+    assert [policy.next_delay() for _ in range(7)] == [0, 1, 2, 4, 8, 10, 10]
+    assert policy.attempts == 7
+
+
+def test_next_delay_jitter() -> None:
+    """
+    Test ReconnectPolicy.next_delay() picks the delay at random below the upper bound.
+    """
+    values = iter([0.5, 0.25, 0.0])
+    policy = ReconnectPolicy(initial_delay=4, max_delay=100, multiplier=2,
+                             clock=FakeClock(), rand=lambda: next(values))
+
+    assert [policy.next_delay() for _ in range(4)] == [0, 2, 2, 0]
+
+
+def test_next_delay_long_outage() -> None:
+    """
+    Test ReconnectPolicy.next_delay() stays at the cap during long outages.
+    """
+    policy = ReconnectPolicy(clock=FakeClock(), rand=lambda: 1.0)
+
+    for _ in range(5000):
+        delay = policy.next_delay()
+
+    assert delay == DEFAULT_MAX_DELAY
+
+
+def test_stable_connection() -> None:
+    """
+    Test ReconnectPolicy.connected() resets the backoff only after a stable period.
+    """
+    clock = FakeClock()
+    policy = ReconnectPolicy(initial_delay=1, max_delay=10, multiplier=2, stable_period=60,
+                             clock=clock, rand=lambda: 1.0)
+
+    assert [policy.next_delay() for _ in range(4)] == [0, 1, 2, 4]
+
+    # The connection dropped before being stable
+    policy.connected()
+    clock.now += 59
+    assert policy.next_delay() == 8
+
+    # The connection was stable, retry immediately
+    policy.connected()
+    clock.now += 60
+    assert policy.next_delay() == 0
+    assert policy.next_delay() == 1
+
+    policy.reset()
+    assert policy.next_delay() == 0
+
+
+def test_from_config() -> None:
+    """
+    Test ReconnectPolicy.from_config().
+    """
+    policy = ReconnectPolicy.from_config({"reconnect_max_delay": 30, "reconnect_stable_period": 5})
+
+    assert policy.max_delay == 30
+    assert policy.stable_period == 5
+    assert policy.initial_delay == 1
@@ -0,0 +1,116 @@
+"""
+Tests for reported properties module
+"""
+
+import asyncio
+import pytest
+from pytest_mock import MockerFixture
+from iot_hub_module.reported_properties import (
+    ReportedPropertiesWriter,
+    diff_patch,
+    merge_patch,
+)
+
+
+def test_merge_patch() -> None:
+    """
+    Test merge_patch().
+    """
+    document = {"connectivity": {"status": "online"}, "version": "1.0"}
+
+    merge_patch(document, {"connectivity": {"transport": "mqtt"}, "version": "1.1"})
+
+    assert document == {"connectivity": {"status": "online", "transport": "mqtt"}, "version": "1.1"}
+
+
+def test_diff_patch() -> None:
+    """
+    Test diff_patch().
+    """
+    document = {"connectivity": {"status": "online", "transport": "mqtt"}, "version": "1.0"}
+
+    assert diff_patch(document, {"connectivity": {"status": "online"}, "version": "1.0"}) == {}
+    assert diff_patch(document, {"connectivity": {"status": "offline"}, "capacity": 4}) == {
+        "connectivity": {"status": "offline"},
+        "capacity": 4,
+    }
+
+
+@pytest.mark.asyncio
+async def test_update_coalesces(mocker: MockerFixture) -> None:
+    """
+    Test ReportedPropertiesWriter.update() writes the patches of a debounce interval together.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+    """
+    patch_properties = mocker.AsyncMock()
+    writer = ReportedPropertiesWriter(patch_properties, debounce_interval=0.05)
+
+    writer.update({"version": "1.0"})
+    writer.update({"capacity": {"running": 1}})
+    writer.update({"capacity": {"pending": 2}})
+    patch_properties.assert_not_awaited()
+
+    await asyncio.sleep(0.1)
+    patch_properties.assert_awaited_once_with({"version": "1.0", "capacity": {"running": 1, "pending": 2}})
+
+    # Unchanged values are not written again
+    writer.update({"version": "1.0", "capacity": {"running": 1}})
+    assert writer.pending == {}
+    await asyncio.sleep(0.1)
+    patch_properties.assert_awaited_once()
+
+    await writer.close()
+
+
+@pytest.mark.asyncio
+async def test_update_critical(mocker: MockerFixture) -> None:
+    """
+    Test ReportedPropertiesWriter.update() writes critical fields immediately.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+    """
+    patch_properties = mocker.AsyncMock()
+    writer = ReportedPropertiesWriter(patch_properties, debounce_interval=60)
+
+    writer.update({"version": "1.0"})
+    writer.update({"connectivity": {"status": "online"}})
+    await asyncio.sleep(0.01)
+
+    patch_properties.assert_awaited_once_with({"version": "1.0", "connectivity": {"status": "online"}})
+
+    # A value changed back before being written is still written
+    writer.update({"connectivity": {"status": "offline"}})
+    writer.update({"connectivity": {"status": "online"}})
+    assert writer.pending == {"connectivity": {"status": "online"}}
+
+    await writer.close()
+
+
+@pytest.mark.asyncio
+async def test_flush_retry(mocker: MockerFixture) -> None:
+    """
+    Test ReportedPropertiesWriter.flush() keeps and retries failed patches.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+    """
+    patch_properties = mocker.AsyncMock(side_effect=[Exception("offline"), None])
+    writer = ReportedPropertiesWriter(patch_properties, debounce_interval=0.01)
+
+    writer.update({"connectivity": {"status": "online"}})
+    await asyncio.sleep(0.01)
+    assert writer.pending == {"connectivity": {"status": "online"}}
+
+    # Properties queued meanwhile are written with the retry
+    writer.update({"version": "1.0"})
+    await asyncio.sleep(0.1)
+
+    assert patch_properties.await_count == 2
+    patch_properties.assert_awaited_with({"connectivity": {"status": "online"}, "version": "1.0"})
+    assert writer.pending == {}
+    assert await writer.flush()
+
+    await writer.close()
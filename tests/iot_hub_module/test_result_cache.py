@@ -0,0 +1,93 @@
+"""
+Tests for result cache module
+"""
+
+import os
+from pytest_mock import MockerFixture
+from iot_hub_module.result_cache import ResultCache, get_cache_key
+
+# Constants
+MODULE = "iot_hub_module.result_cache"
+RESULT = {"output": "build 1234", "error": ""}
+
+
+def test_get_cache_key() -> None:
+    """
+    Test the get_cache_key() function.
+    """
+    key = get_cache_key("/bin/bash", "ZWNobw==")
+    assert key == get_cache_key("/bin/bash", b"ZWNobw==")
+    assert key != get_cache_key("/bin/zsh", "ZWNobw==")
+    assert key != get_cache_key("/bin/bash", "ZXhpdA==")
+
+
+def test_result_cache_ttl(mocker: MockerFixture) -> None:
+    """
+    Test ResultCache expiring results after their time to live.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+    """
+    mocked_time = mocker.patch(f"{MODULE}.time.time", return_value=1000.0)
+    cache = ResultCache()
+
+    assert cache.get("key") is None
+    cache.put("key", RESULT, 60)
+
+    mocked_time.return_value = 1030.0
+    assert cache.get("key") == (RESULT, 30.0)
+
+    mocked_time.return_value = 1060.0
+    assert cache.get("key") is None
+    assert len(cache) == 0
+
+
+def test_result_cache_lru() -> None:
+    """
+    Test ResultCache evicting the least recently used results from memory.
+    """
+    cache = ResultCache(max_entries=2)
+    cache.put("a", RESULT, 60)
+    cache.put("b", RESULT, 60)
+    assert cache.get("a") is not None
+
+    cache.put("c", RESULT, 60)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+    cache.resize(max_entries=1)
+    assert len(cache) == 1
+    assert cache.get("c") is not None
+
+
+def test_result_cache_disk(tmp_path) -> None:
+    """
+    Test ResultCache keeping results on disk.
+
+    Args:
+        tmp_path (Path): Temporary cache directory.
+    """
+    cache = ResultCache(max_disk_entries=2, cache_directory=str(tmp_path))
+    cache.put("a", RESULT, 60)
+    os.utime(tmp_path / "a.json", (0, 0))
+    cache.put("b", RESULT, 60)
+
+    # Results survive a restart
+    restarted = ResultCache(max_disk_entries=2, cache_directory=str(tmp_path))
+    result, age = restarted.get("a")
+    assert result == RESULT
+    assert age >= 0
+
+    # Least recently used results are evicted from disk
+    os.utime(tmp_path / "b.json", (0, 0))
+    restarted.put("c", RESULT, 60)
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["a.json", "c.json"]
+
+    restarted.remove("a")
+    assert restarted.get("a") is None
+    assert not (tmp_path / "a.json").exists()
+
+    # Invalid results are ignored
+    (tmp_path / "d.json").write_text("not a json")
+    assert restarted.get("d") is None
@@ -0,0 +1,172 @@
+"""
+Tests for telemetry module
+"""
+
+import asyncio
+import gzip
+import json
+import pytest
+from pytest_mock import MockerFixture
+from iot_hub_module.offline_buffer import OfflineBuffer
+from iot_hub_module.telemetry import (
+    BATCH_PROPERTY,
+    MAX_MESSAGE_SIZE,
+    TelemetryChannel,
+    build_batch_message,
+)
+
+
+def decode(message) -> list:
+    """
+    Decode the records of a batch message.
+
+    Args:
+        message (Message): Batch message.
+
+    Returns:
+        list: Records of the batch.
+    """
+    data = message.data
+    if message.content_encoding == "gzip":
+        data = gzip.decompress(data)
+    return json.loads(data)
+
+
+def test_build_batch_message() -> None:
+    """
+    Test build_batch_message().
+    """
+    records = [b'{"a": 1}', b'{"b": 2}']
+
+    message = build_batch_message(records)
+    assert decode(message) == [{"a": 1}, {"b": 2}]
+    assert message.custom_properties[BATCH_PROPERTY] == "2"
+
+    message = build_batch_message(records, compression=True)
+    assert message.content_encoding == "gzip"
+    assert decode(message) == [{"a": 1}, {"b": 2}]
+
+
+@pytest.mark.asyncio
+async def test_enqueue_flush_interval(mocker: MockerFixture) -> None:
+    """
+    Test TelemetryChannel.enqueue() sends the records of a flush interval in one batch.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+    """
+    send_message = mocker.AsyncMock()
+    channel = TelemetryChannel(send_message, flush_interval=0.05)
+
+    for i in range(10):
+        assert channel.enqueue({"i": i})
+    send_message.assert_not_awaited()
+
+    await asyncio.sleep(0.1)
+    send_message.assert_awaited_once()
+    assert decode(send_message.await_args.args[0]) == [{"i": i} for i in range(10)]
+    assert len(channel) == 0
+
+    await channel.close()
+
+
+@pytest.mark.asyncio
+async def test_enqueue_batch_size(mocker: MockerFixture) -> None:
+    """
+    Test TelemetryChannel.enqueue() sends full batches without waiting and keeps them below the size limit.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+    """
+    send_message = mocker.AsyncMock()
+    channel = TelemetryChannel(send_message, max_batch_size=1024, flush_interval=60)
+
+    for i in range(100):
+        channel.enqueue({"i": i, "padding": "x" * 50})
+    await asyncio.sleep(0.01)
+
+    assert send_message.await_count >= 5
+    for call in send_message.await_args_list:
+        assert len(call.args[0].data) <= 1024
+
+    # The records left are sent when the channel is closed
+    assert await channel.close()
+    records = [record for call in send_message.await_args_list for record in decode(call.args[0])]
+    assert [record["i"] for record in records] == list(range(100))
+
+
+@pytest.mark.asyncio
+async def test_enqueue_oversized(mocker: MockerFixture) -> None:
+    """
+    Test TelemetryChannel.enqueue() drops records that do not fit in a message.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+    """
+    channel = TelemetryChannel(mocker.AsyncMock(), max_batch_size=MAX_MESSAGE_SIZE * 2)
+
+    assert channel.max_batch_size == MAX_MESSAGE_SIZE
+    assert not channel.enqueue({"data": "x" * MAX_MESSAGE_SIZE})
+    assert channel.dropped_records == 1
+    assert len(channel) == 0
+
+
+@pytest.mark.asyncio
+async def test_flush_failure(mocker: MockerFixture) -> None:
+    """
+    Test TelemetryChannel.flush() keeps the records that failed to be sent, dropping the oldest.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+    """
+    send_message = mocker.AsyncMock(side_effect=Exception("offline"))
+    channel = TelemetryChannel(send_message, flush_interval=60, max_queued_records=3)
+
+    for i in range(5):
+        channel.enqueue({"i": i})
+    assert not await channel.flush()
+    assert len(channel) == 3
+    assert channel.dropped_records == 2
+
+    send_message.side_effect = None
+    assert await channel.close()
+    assert decode(send_message.await_args.args[0]) == [{"i": 2}, {"i": 3}, {"i": 4}]
+
+
+@pytest.mark.asyncio
+async def test_offline_buffer(mocker: MockerFixture, tmp_path) -> None:
+    """
+    Test TelemetryChannel keeps the records on disk while offline and drains them after resuming.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+        tmp_path (Path): Temporary directory.
+    """
+    send_message = mocker.AsyncMock(side_effect=Exception("offline"))
+    buffer = OfflineBuffer(str(tmp_path))
+    channel = TelemetryChannel(send_message, max_batch_size=64, flush_interval=0.01,
+                               offline_buffer=buffer, drain_interval=0.05)
+
+    for i in range(10):
+        channel.enqueue({"i": i})
+    await asyncio.sleep(0.05)
+
+    assert len(channel) == 0
+    assert buffer
+
+    # Drained one batch per drain interval, live records go first
+    send_message.side_effect = None
+    send_message.reset_mock()
+    channel.resume()
+    await asyncio.sleep(0.02)
+    assert send_message.await_count == 1
+    channel.enqueue({"live": True})
+    await asyncio.sleep(0.03)
+    assert decode(send_message.await_args_list[1].args[0]) == [{"live": True}]
+
+    await asyncio.sleep(0.5)
+    assert not buffer
+    records = [record for call in send_message.await_args_list for record in decode(call.args[0])]
+    assert [record["i"] for record in records if "i" in record] == list(range(10))
+
+    await channel.close()
@@ -0,0 +1,86 @@
+"""
+Tests for transport state module
+"""
+
+import json
+from iot_hub_module.transport_state import (
+    MQTT,
+    WEBSOCKETS,
+    TransportState,
+)
+
+
+def test_get_order(tmp_path) -> None:
+    """
+    Test TransportState.get_order() tries the transport that last connected first.
+
+    Args:
+        tmp_path (Path): Temporary directory.
+    """
+    state_file = str(tmp_path / "transport.json")
+    now = [1000.0]
+    state = TransportState(state_file, reprobe_interval=100, clock=lambda: now[0])
+
+    assert state.preferred == MQTT
+    assert state.get_order() == [MQTT, WEBSOCKETS]
+
+    state.record_success(WEBSOCKETS)
+    assert state.get_order() == [WEBSOCKETS, MQTT]
+
+    # The state is kept across restarts
+    state = TransportState(state_file, reprobe_interval=100, clock=lambda: now[0])
+    assert state.preferred == WEBSOCKETS
+    assert state.get_order() == [WEBSOCKETS, MQTT]
+
+    # MQTT is re-probed once per interval
+    now[0] += 100
+    assert state.get_order() == [MQTT, WEBSOCKETS]
+    assert state.get_order() == [WEBSOCKETS, MQTT]
+
+    state.record_success(MQTT)
+    assert state.get_order() == [MQTT, WEBSOCKETS]
+    with open(state_file, encoding="utf-8") as f:
+        assert json.load(f)["transport"] == MQTT
+
+
+def test_invalid_state_file(tmp_path) -> None:
+    """
+    Test TransportState ignores an invalid state file.
+
+    Args:
+        tmp_path (Path): Temporary directory.
+    """
+    state_file = tmp_path / "transport.json"
+    state_file.write_text("{not json")
+
+    assert TransportState(str(state_file)).preferred == MQTT
+
+    state_file.write_text(json.dumps({"transport": "carrier pigeon"}))
+    assert TransportState(str(state_file)).preferred == MQTT
+
+
+def test_memory_only() -> None:
+    """
+    Test TransportState without a state file.
+    """
+    state = TransportState()
+    assert not state.known
+
+    state.record_success(WEBSOCKETS)
+    assert state.known
+    assert state.preferred == WEBSOCKETS
+
+
+def test_known(tmp_path) -> None:
+    """
+    Test TransportState.known is kept across restarts, even for the default transport.
+
+    Args:
+        tmp_path (Path): Temporary directory.
+    """
+    state_file = str(tmp_path / "transport.json")
+    state = TransportState(state_file)
+    assert not state.known
+
+    state.record_success(MQTT)
+    assert TransportState(state_file).known
@@ -2,10 +2,20 @@
 Tests for rewst remote agent
 """
 
+import asyncio
+import sys
+import types
 import uuid
 import pytest
 from pytest_mock import MockerFixture
-from rewst_remote_agent import main, signal_handler
+from azure.iot.device.iothub.aio import loop_management
+from rewst_remote_agent import (
+    EVENT_LOOP_ENV_VAR,
+    get_event_loop_name,
+    get_event_loop_policy,
+    main,
+    signal_handler,
+)
 
 # Constants
 MODULE = "rewst_remote_agent"
@@ -56,6 +66,40 @@ async def test_main(mocker: MockerFixture, platform: str) -> None:
     assert await main() is None
 
 
+@pytest.mark.asyncio
+async def test_main_multi_org(mocker: MockerFixture) -> None:
+    """
+    Test for main() hosting several organizations.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+    """
+    other_org_id = str(uuid.uuid4())
+    mocker.patch(f"{MODULE}.os_type", "windows")
+    mocker.patch("sys.argv", ["rewst_remote_agent", "--org-id", ORG_ID, "--org-id", other_org_id])
+    mocked_load = mocker.patch(
+        f"{MODULE}.load_configuration", side_effect=lambda org_id: {"rewst_org_id": org_id}
+    )
+    mocked_setup = mocker.patch(f"{MODULE}.setup_file_logging")
+    mocked_loop = mocker.patch(f"{MODULE}.iot_hub_connection_loop")
+    mocked_multi_org_loop = mocker.patch(f"{MODULE}.multi_org_connection_loop")
+
+    assert await main() is None
+
+    mocked_multi_org_loop.assert_awaited_once()
+    assert mocked_multi_org_loop.await_args.args[0] == [
+        {"rewst_org_id": ORG_ID}, {"rewst_org_id": other_org_id}
+    ]
+    mocked_loop.assert_not_awaited()
+    assert mocked_setup.call_args_list == [mocker.call(ORG_ID), mocker.call(other_org_id)]
+
+    # Every hosted organization must be configured
+    mocked_multi_org_loop.reset_mock()
+    mocked_load.side_effect = lambda org_id: None if org_id == other_org_id else {"rewst_org_id": org_id}
+    assert await main() is None
+    mocked_multi_org_loop.assert_not_awaited()
+
+
 @pytest.mark.parametrize("platform", ("Windows", "Linux", "Darwin"))
 def test_signal_handler(mocker: MockerFixture, platform: str) -> None:
     """
@@ -74,3 +118,104 @@ def test_signal_handler(mocker: MockerFixture, platform: str) -> None:
     signal_handler()
 
     mocked_stop.set.assert_called()
+
+
+def test_get_event_loop_name(mocker: MockerFixture, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test for get_event_loop_name()
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+        monkeypatch (pytest.MonkeyPatch): Fixture instance for patching the environment.
+    """
+    monkeypatch.delenv(EVENT_LOOP_ENV_VAR, raising=False)
+    mocked_load = mocker.patch(f"{MODULE}.load_configuration", return_value={"event_loop": "uvloop"})
+    argv = [f"rewst_remote_agent_{ORG_ID}.exe"]
+
+    # From the configuration of the organization
+    assert get_event_loop_name(argv) == "uvloop"
+    mocked_load.assert_called_once_with(ORG_ID)
+    assert get_event_loop_name(["rewst_remote_agent", "--org-id", ORG_ID]) == "uvloop"
+
+    # The environment takes precedence
+    monkeypatch.setenv(EVENT_LOOP_ENV_VAR, "AsyncIO")
+    assert get_event_loop_name(argv) == "asyncio"
+    monkeypatch.delenv(EVENT_LOOP_ENV_VAR)
+
+    # Default loop without organization or configuration
+    assert get_event_loop_name(["rewst_remote_agent"]) == "asyncio"
+    mocked_load.return_value = None
+    assert get_event_loop_name(argv) == "asyncio"
+    mocked_load.side_effect = Exception
+    assert get_event_loop_name(argv) == "asyncio"
+
+
+class FakeUVLoop(asyncio.SelectorEventLoop):
+    """
+    Event loop standing in for the loop of uvloop.
+    """
+
+
+class FakeUVLoopPolicy(asyncio.DefaultEventLoopPolicy):
+    """
+    Event loop policy standing in for the policy of uvloop.
+    """
+
+    def new_event_loop(self) -> asyncio.AbstractEventLoop:
+        """
+        Create a new event loop.
+
+        Returns:
+            asyncio.AbstractEventLoop: Fake uvloop event loop.
+        """
+        return FakeUVLoop()
+
+
+@pytest.mark.parametrize("platform", ("Windows", "Linux", "Darwin"))
+def test_get_event_loop_policy(mocker: MockerFixture, platform: str) -> None:
+    """
+    Test for get_event_loop_policy()
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+        platform (str): Current platform tested.
+    """
+    mocker.patch(f"{MODULE}.os_type", platform.lower())
+    uvloop = types.ModuleType("uvloop")
+    uvloop.EventLoopPolicy = FakeUVLoopPolicy
+    mocker.patch.dict(sys.modules, {"uvloop": uvloop})
+
+    assert get_event_loop_policy("asyncio") is None
+    assert get_event_loop_policy("trio") is None
+    if platform == "Windows":
+        assert get_event_loop_policy("uvloop") is None
+    else:
+        assert isinstance(get_event_loop_policy("uvloop"), FakeUVLoopPolicy)
+
+    # Falls back to the default loop when uvloop is not installed
+    mocker.patch.dict(sys.modules, {"uvloop": None})
+    assert get_event_loop_policy("uvloop") is None
+
+
+def test_event_loop_policy_of_sdk_handlers(mocker: MockerFixture) -> None:
+    """
+    Test the handler loops of the IoT Hub SDK run on the event loop of the installed policy.
+
+    Args:
+        mocker (MockerFixture): Fixture instance for mocking.
+    """
+    mocker.patch(f"{MODULE}.os_type", "linux")
+    uvloop = types.ModuleType("uvloop")
+    uvloop.EventLoopPolicy = FakeUVLoopPolicy
+    mocker.patch.dict(sys.modules, {"uvloop": uvloop})
+    mocker.patch.dict(loop_management.loops, {name: None for name in loop_management.loops})
+
+    previous_policy = asyncio.get_event_loop_policy()
+    asyncio.set_event_loop_policy(get_event_loop_policy("uvloop"))
+    try:
+        handler_loop = loop_management.get_client_handler_loop()
+    finally:
+        asyncio.set_event_loop_policy(previous_policy)
+
+    assert isinstance(handler_loop, FakeUVLoop)
+    handler_loop.call_soon_threadsafe(handler_loop.stop)